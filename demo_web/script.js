@@ -179,6 +179,10 @@ async function checkProcessingStatus() {
                 clearInterval(statusCheckInterval);
                 showNotification('Processing failed: ' + result.error, 'error');
                 resetProcessing();
+            } else if (result.status === 'cancelled') {
+                clearInterval(statusCheckInterval);
+                showNotification('Processing was cancelled', 'error');
+                resetProcessing();
             }
         }
     } catch (error) {
@@ -191,7 +195,10 @@ function updateProcessingProgress(result) {
     updateProgress(progress);
     progressPercent.textContent = `${progress}%`;
     
-    if (result.status === 'processing') {
+    if (result.status === 'queued') {
+        const position = result.queue && result.queue.position;
+        statusText.textContent = position ? `Waiting in queue (position ${position})...` : 'Waiting in queue...';
+    } else if (result.status === 'processing') {
         if (progress > 20 && progress < 80) {
             statusText.textContent = 'AI is separating audio tracks...';
             updateProcessingStep(1, 'active');
@@ -418,16 +425,20 @@ function displayJobsHistory(jobs) {
         
         const statusColor = {
             'uploaded': 'text-blue-500',
+            'queued': 'text-gray-400',
             'processing': 'text-yellow-500',
             'completed': 'text-green-500',
-            'failed': 'text-red-500'
+            'failed': 'text-red-500',
+            'cancelled': 'text-gray-500'
         }[job.status] || 'text-gray-500';
         
         const statusIcon = {
             'uploaded': 'fa-upload',
+            'queued': 'fa-clock',
             'processing': 'fa-spinner fa-spin',
             'completed': 'fa-check-circle',
-            'failed': 'fa-exclamation-circle'
+            'failed': 'fa-exclamation-circle',
+            'cancelled': 'fa-ban'
         }[job.status] || 'fa-question-circle';
         
         jobItem.innerHTML = `
@@ -468,7 +479,7 @@ async function checkAPIHealth() {
             if (result.status === 'healthy') {
                 healthStatus.innerHTML = `
                     <div class="w-3 h-3 bg-green-400 rounded-full"></div>
-                    <span class="text-sm">API Online - ${result.device}</span>
+                    <span class="text-sm">API Online - ${result.ready === false ? 'warming up' : result.device}</span>
                 `;
                 return;
             }
@@ -27,6 +27,9 @@ class Stem {
     this.isSolo = false,
   });
 
+  /// Streamed stems point at an HLS playlist URL instead of a local file
+  bool get isStreamed => filePath.startsWith('http://') || filePath.startsWith('https://');
+
   String get displayName {
     switch (type) {
       case StemType.vocals:
@@ -1,3 +1,4 @@
+import 'dart:async';
 import 'package:flutter/foundation.dart';
 import 'package:just_audio/just_audio.dart';
 import '../models/song_model.dart';
@@ -6,14 +7,17 @@ import '../models/stem_model.dart';
 class AudioPlayerService extends ChangeNotifier {
   final Map<String, AudioPlayer> _stemPlayers = {};
   AudioPlayer? _mainPlayer;
+  final List<StreamSubscription> _stemSubscriptions = [];
   
   Song? _currentSong;
   bool _isPlaying = false;
+  bool _isBuffering = false;
   Duration _position = Duration.zero;
   Duration _duration = Duration.zero;
   
   Song? get currentSong => _currentSong;
   bool get isPlaying => _isPlaying;
+  bool get isBuffering => _isBuffering;
   Duration get position => _position;
   Duration get duration => _duration;
 
@@ -59,21 +63,54 @@ class AudioPlayerService extends ChangeNotifier {
 
   Future<void> _loadStems(List<Stem> stems) async {
     // Clear existing stem players
+    for (final subscription in _stemSubscriptions) {
+      await subscription.cancel();
+    }
+    _stemSubscriptions.clear();
     for (final player in _stemPlayers.values) {
       await player.dispose();
     }
     _stemPlayers.clear();
 
-    // Create new players for each stem
-    for (final stem in stems) {
+    // Create new players for each stem, loading them concurrently; streamed
+    // stems only fetch their playlist and first segment here
+    await Future.wait(stems.map((stem) async {
       final player = AudioPlayer();
       try {
-        await player.setFilePath(stem.filePath);
+        if (stem.isStreamed) {
+          await player.setAudioSource(HlsAudioSource(Uri.parse(stem.filePath)));
+        } else {
+          await player.setFilePath(stem.filePath);
+        }
         await player.setVolume(stem.volume);
         _stemPlayers[stem.id] = player;
       } catch (e) {
         print('Error loading stem ${stem.displayName}: $e');
       }
+    }));
+    _setupStemListeners();
+  }
+
+  void _setupStemListeners() {
+    if (_stemPlayers.isEmpty) return;
+
+    // The first stem drives the position; playback is buffering while any stem is
+    final leader = _stemPlayers.values.first;
+    _stemSubscriptions.add(leader.playbackEventStream.listen((event) {
+      _duration = event.duration ?? _duration;
+      _position = event.updatePosition;
+      notifyListeners();
+    }));
+    for (final player in _stemPlayers.values) {
+      _stemSubscriptions.add(player.processingStateStream.listen((_) {
+        final buffering = _stemPlayers.values.any((p) =>
+            p.processingState == ProcessingState.loading ||
+            p.processingState == ProcessingState.buffering);
+        if (buffering != _isBuffering) {
+          _isBuffering = buffering;
+          notifyListeners();
+        }
+      }));
     }
   }
 
@@ -82,9 +119,15 @@ class AudioPlayerService extends ChangeNotifier {
 
     try {
       if (_currentSong!.isProcessed && _stemPlayers.isNotEmpty) {
-        // Play all stems synchronously
-        final futures = _stemPlayers.values.map((player) => player.play());
-        await Future.wait(futures);
+        // Line all stems up on one position, then start them together (play()
+        // completes only when playback stops, so it is not awaited)
+        final position = _stemPlayers.values.first.position;
+        await Future.wait(_stemPlayers.values.map((player) => player.seek(position)));
+        for (final player in _stemPlayers.values) {
+          player.play();
+        }
+        _isPlaying = true;
+        notifyListeners();
       } else {
         // Play original audio
         await _mainPlayer?.play();
@@ -99,6 +142,8 @@ class AudioPlayerService extends ChangeNotifier {
       if (_currentSong?.isProcessed == true && _stemPlayers.isNotEmpty) {
         final futures = _stemPlayers.values.map((player) => player.pause());
         await Future.wait(futures);
+        _isPlaying = false;
+        notifyListeners();
       } else {
         await _mainPlayer?.pause();
       }
@@ -121,6 +166,7 @@ class AudioPlayerService extends ChangeNotifier {
   Future<void> seek(Duration position) async {
     try {
       if (_currentSong?.isProcessed == true && _stemPlayers.isNotEmpty) {
+        // Streamed stems fetch only the segments around the new position
         final futures = _stemPlayers.values.map((player) => player.seek(position));
         await Future.wait(futures);
       } else {
@@ -198,6 +244,9 @@ class AudioPlayerService extends ChangeNotifier {
 
   @override
   void dispose() {
+    for (final subscription in _stemSubscriptions) {
+      subscription.cancel();
+    }
     _mainPlayer?.dispose();
     for (final player in _stemPlayers.values) {
       player.dispose();
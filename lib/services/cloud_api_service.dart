@@ -107,6 +107,44 @@ class CloudApiService {
     }
   }
 
+  /// Per-stem HLS playlist URLs of a job, published while it is still separating
+  Future<Map<String, String>> getStemStreams(String jobId) async {
+    try {
+      final response = await _dio.get('/stream/$jobId');
+
+      if (response.statusCode == 200) {
+        final playlists = Map<String, String>.from(response.data['playlists']);
+        return playlists.map((stem, path) => MapEntry(stem, '$_baseUrl$path'));
+      } else {
+        throw Exception('Failed to get stem streams');
+      }
+    } catch (e) {
+      throw Exception('Stream lookup failed: $e');
+    }
+  }
+
+  /// Song whose stems play from the job's segmented streams instead of downloads
+  Future<Song> streamStems(Song song, String jobId) async {
+    final playlists = await getStemStreams(jobId);
+    final stems = <Stem>[];
+
+    for (final stemType in StemType.values) {
+      final url = playlists[stemType.name];
+      if (url == null) continue;
+      stems.add(Stem(
+        id: '$jobId-${stemType.name}',
+        type: stemType,
+        filePath: url,
+        duration: song.duration,
+      ));
+    }
+
+    return song.copyWith(
+      stems: stems,
+      isProcessed: true,
+    );
+  }
+
   /// Complete cloud separation workflow
   Future<Song> processAudioCloud(Song song) async {
     try {
@@ -121,7 +159,7 @@ class CloudApiService {
       do {
         await Future.delayed(const Duration(seconds: 5));
         status = await checkJobStatus(jobId);
-      } while (status.status == 'processing');
+      } while (status.status == 'queued' || status.status == 'processing');
 
       if (status.status != 'completed') {
         throw Exception('Separation failed: ${status.error}');
@@ -156,7 +194,7 @@ class CloudApiService {
 }
 
 class SeparationJobStatus {
-  final String status; // 'processing', 'completed', 'failed'
+  final String status; // 'queued', 'processing', 'completed', 'failed'
   final double progress;
   final String? error;
   final Map<String, dynamic>? metadata;
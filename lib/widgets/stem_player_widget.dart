@@ -43,6 +43,9 @@ class _StemPlayerWidgetState extends State<StemPlayerWidget> {
                   ),
                 ],
               ),
+              // Streamed stems are still fetching the segments to play
+              if (playerService.isBuffering)
+                const LinearProgressIndicator(minHeight: 2),
               const SizedBox(height: 16),
 
               // Stem controls
@@ -194,7 +197,9 @@ class _StemControlCard extends StatelessWidget {
                         ),
                       ),
                       Text(
-                        _formatDuration(stem.duration),
+                        stem.isStreamed
+                            ? '${_formatDuration(stem.duration)} · Streaming'
+                            : _formatDuration(stem.duration),
                         style: TextStyle(
                           color: Colors.grey[600],
                           fontSize: 12,
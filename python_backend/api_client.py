@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Python client for the Song Splitter API.
+One pooled HTTP session is shared by every call, so uploads, status checks and
+downloads reuse connections. Job progress is followed with long polls
+(/api/status?wait=), stems are downloaded in parallel and resumed with Range
+requests after an interruption, and many files can be separated concurrently.
+
+    from api_client import SongSplitterClient
+
+    with SongSplitterClient("http://localhost:5000") as client:
+        stems = client.separate_file("song.mp3", "out/", quality="high")
+
+AsyncSongSplitterClient offers the same calls as coroutines for asyncio code.
+"""
+
+import os
+import time
+import asyncio
+import functools
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_BASE_URL = os.environ.get("SONG_SPLITTER_API", "http://localhost:5000")
+POOL_SIZE = 32
+# Seconds the server may hold one status request while waiting for progress
+LONG_POLL_SECONDS = 20.0
+CHUNK_SIZE = 1024 * 1024
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+class ApiError(Exception):
+    """Error response from the API."""
+
+    def __init__(self, status_code: int, message: str, payload: Optional[Dict] = None):
+        super().__init__(f"{status_code}: {message}")
+        self.status_code = status_code
+        self.payload = payload or {}
+
+class SongSplitterClient:
+    """Thread-safe client; share one instance between threads to share its connection pool."""
+
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, pool_size: int = POOL_SIZE,
+                 timeout: float = 60.0, retries: int = 3, client_id: Optional[str] = None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.retries = retries
+        self.pool_size = pool_size
+        self.session = requests.Session()
+        # Connection errors are retried for every call; server errors only for idempotent ones
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=Retry(
+            total=retries, connect=retries, read=0, backoff_factor=0.5,
+            status_forcelist=(502, 504), allowed_methods=("GET", "HEAD")))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if client_id:
+            self.session.headers["X-Client-Id"] = client_id
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    def _url(self, path: str) -> str:
+        return f"{self.base_url}/api/{path.lstrip('/')}"
+
+    def _request(self, method: str, path: str, timeout: Optional[float] = None, **kwargs) -> requests.Response:
+        response = self.session.request(method, self._url(path), timeout=timeout or self.timeout, **kwargs)
+        if response.status_code >= 400:
+            try:
+                payload = response.json()
+            except ValueError:
+                payload = {}
+            raise ApiError(response.status_code, payload.get("error", response.reason), payload)
+        return response
+
+    def health(self) -> Dict:
+        return self._request("GET", "health").json()
+
+    def ready(self) -> bool:
+        """Whether the model is warm (the readiness probe returns 200)."""
+        try:
+            return self._request("GET", "health/ready").json()["ready"]
+        except ApiError as e:
+            if e.status_code == 503:
+                return False
+            raise
+
+    def jobs(self) -> List[Dict]:
+        return self._request("GET", "jobs").json()["jobs"]
+
+    def upload(self, path: str, quality: Optional[str] = None, priority: Optional[str] = None) -> str:
+        """
+        Upload an audio file and return its job id. Uploads the server turns
+        away as busy (503 with Retry-After) are retried after the advised delay.
+        """
+        data = {key: value for key, value in (("quality", quality), ("priority", priority)) if value}
+        for attempt in range(self.retries + 1):
+            try:
+                with open(path, "rb") as f:
+                    response = self._request("POST", "upload", files={"file": (Path(path).name, f)},
+                                             data=data, timeout=max(self.timeout, 600.0))
+                return response.json()["job_id"]
+            except ApiError as e:
+                if e.status_code != 503 or attempt == self.retries:
+                    raise
+                delay = float(e.payload.get("predicted_wait_seconds") or 5.0)
+            except requests.ConnectionError:
+                if attempt == self.retries:
+                    raise
+                delay = 2.0 ** attempt
+            time.sleep(min(delay, 60.0))
+
+    def separate(self, job_id: str, **options) -> Dict:
+        """Start separating an uploaded job (quality, priority, progressive, start, end, pack, stream...)."""
+        return self._request("POST", f"separate/{job_id}", json=options).json()
+
+    def cancel(self, job_id: str) -> Dict:
+        """Cancel a queued or running job; its partial outputs are removed."""
+        return self._request("POST", f"cancel/{job_id}").json()
+
+    def status(self, job_id: str, wait: float = 0.0, since: Optional[float] = None,
+               last_status: Optional[str] = None) -> Dict:
+        """
+        Job status. With wait, the server holds the request until the job
+        leaves last_status or its progress moves past since.
+        """
+        params = {}
+        if wait > 0:
+            params["wait"] = wait
+            if since is not None:
+                params["since"] = since
+            if last_status is not None:
+                params["status"] = last_status
+        return self._request("GET", f"status/{job_id}", params=params, timeout=self.timeout + wait).json()
+
+    def wait(self, job_id: str, timeout: Optional[float] = None,
+             on_progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """Follow a job with long polls until it completes; raises ApiError if it fails or is cancelled."""
+        deadline = None if timeout is None else time.time() + timeout
+        status = self.status(job_id)
+        while status["status"] not in TERMINAL_STATUSES:
+            if on_progress is not None:
+                on_progress(status)
+            remaining = LONG_POLL_SECONDS if deadline is None else min(LONG_POLL_SECONDS, deadline - time.time())
+            if remaining <= 0:
+                raise TimeoutError(f"Job {job_id} still {status['status']} after {timeout:.0f}s")
+            status = self.status(job_id, wait=remaining, since=status["progress"],
+                                 last_status=status["status"])
+        if status["status"] != "completed":
+            raise ApiError(500, f"Job {job_id} {status['status']}: {status.get('error')}", status)
+        return status
+
+    def download(self, job_id: str, stem: str, path: str, **params) -> str:
+        """
+        Download a stem to path (params: format, bitrate, sample_rate, start, end).
+
+        Data goes to path + ".part" first; an interrupted transfer, in this call
+        or a later one, continues from the bytes already there with a Range request.
+        """
+        part_path = Path(f"{path}.part")
+        for attempt in range(self.retries + 1):
+            offset = part_path.stat().st_size if part_path.exists() else 0
+            headers = {"Range": f"bytes={offset}-"} if offset else {}
+            try:
+                with self._request("GET", f"download/{job_id}/{stem}", params=params, headers=headers,
+                                   stream=True) as response:
+                    # 200 instead of 206: the server sent the whole file again
+                    mode = "ab" if response.status_code == 206 else "wb"
+                    with open(part_path, mode) as f:
+                        for chunk in response.iter_content(CHUNK_SIZE):
+                            f.write(chunk)
+                os.replace(part_path, path)
+                return str(path)
+            except ApiError as e:
+                if e.status_code != 416:
+                    raise
+                # Range past the end: the partial file is stale
+                part_path.unlink()
+            except (requests.ConnectionError, requests.exceptions.ChunkedEncodingError):
+                if attempt == self.retries:
+                    raise
+                time.sleep(2.0 ** attempt)
+        raise ApiError(416, f"Could not download {stem} of job {job_id}")
+
+    def download_stems(self, job_id: str, output_dir: str, stems: Optional[List[str]] = None,
+                       max_workers: int = 4, **params) -> Dict[str, str]:
+        """Download a completed job's stems in parallel; returns stem name -> local path."""
+        if stems is None:
+            stems = list(self.status(job_id)["stems"])
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+        extension = params.get("format", "wav")
+        with ThreadPoolExecutor(max_workers=min(max_workers, self.pool_size)) as executor:
+            futures = {stem: executor.submit(self.download, job_id, stem,
+                                             str(Path(output_dir) / f"{stem}.{extension}"), **params)
+                       for stem in stems}
+            return {stem: future.result() for stem, future in futures.items()}
+
+    def separate_file(self, path: str, output_dir: str, timeout: Optional[float] = None,
+                      download_params: Optional[Dict] = None, **options) -> Dict[str, str]:
+        """Upload, separate, wait for and download one file; returns stem name -> local path."""
+        job_id = self.upload(path, options.get("quality"), options.get("priority"))
+        self.separate(job_id, **options)
+        self.wait(job_id, timeout=timeout)
+        return self.download_stems(job_id, output_dir, **(download_params or {}))
+
+    def separate_files(self, paths: List[str], output_dir: str, max_workers: Optional[int] = None,
+                       poll_interval: float = 2.0, download_params: Optional[Dict] = None,
+                       **options) -> Dict[str, Dict]:
+        """
+        Separate many files, each into output_dir/<file name>/. Uploads and
+        downloads run max_workers at a time; all submitted jobs are followed
+        with one /api/jobs request per poll_interval instead of one poll each.
+
+        Returns:
+            Input path -> {"job_id", "stems": {...}} or {"error": "..."}
+        """
+        results = {path: {} for path in paths}
+        pending = {}
+
+        def submit(path):
+            job_id = self.upload(path, options.get("quality"), options.get("priority"))
+            self.separate(job_id, **options)
+            return job_id
+
+        def fetch(path, job_id):
+            return self.download_stems(job_id, str(Path(output_dir) / Path(path).stem),
+                                       **(download_params or {}))
+
+        with ThreadPoolExecutor(max_workers=min(max_workers or self.pool_size, self.pool_size)) as executor:
+            uploads = {executor.submit(submit, path): path for path in paths}
+            downloads = {}
+            while uploads or pending:
+                for future in [f for f in uploads if f.done()]:
+                    path = uploads.pop(future)
+                    try:
+                        pending[future.result()] = path
+                        results[path]["job_id"] = future.result()
+                    except (ApiError, requests.RequestException, OSError) as e:
+                        results[path]["error"] = str(e)
+                if pending:
+                    for job in self.jobs():
+                        path = pending.get(job["job_id"])
+                        if path is None or job["status"] not in TERMINAL_STATUSES:
+                            continue
+                        del pending[job["job_id"]]
+                        if job["status"] != "completed":
+                            results[path]["error"] = self.status(job["job_id"]).get("error") or job["status"]
+                        else:
+                            downloads[executor.submit(fetch, path, job["job_id"])] = path
+                if uploads or pending:
+                    time.sleep(poll_interval)
+            for future, path in downloads.items():
+                try:
+                    results[path]["stems"] = future.result()
+                except (ApiError, requests.RequestException, OSError) as e:
+                    results[path]["error"] = str(e)
+        return results
+
+class AsyncSongSplitterClient:
+    """
+    asyncio version of SongSplitterClient. Calls run on a thread pool the size
+    of the connection pool, so up to pool_size requests are in flight at once.
+    """
+
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, pool_size: int = POOL_SIZE, **kwargs):
+        self.client = SongSplitterClient(base_url, pool_size=pool_size, **kwargs)
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="song-splitter-client")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        self._executor.shutdown(wait=False)
+        self.client.close()
+
+    async def _call(self, name: str, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor,
+                                          functools.partial(getattr(self.client, name), *args, **kwargs))
+
+def _async_method(name: str):
+    async def method(self, *args, **kwargs):
+        return await self._call(name, *args, **kwargs)
+    method.__name__ = name
+    method.__doc__ = getattr(SongSplitterClient, name).__doc__
+    return method
+
+for _name in ("health", "ready", "jobs", "upload", "separate", "cancel", "status", "wait",
+              "download", "download_stems", "separate_file", "separate_files"):
+    setattr(AsyncSongSplitterClient, _name, _async_method(_name))
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Cooperative cancellation and deadlines for separation jobs.
+A job runs inside cancel_scope(token). The separation, analysis and export
+code calls check_cancelled() between sections and stages, and models get a
+forward pre-hook that checks before every segment Demucs runs, so a cancelled
+or overdue job stops within one segment. The check raises JobCancelled, which
+unwinds the job and frees its worker.
+
+Tokens are per thread: several jobs can share one model, and each forward
+call checks only the token of the thread running it.
+"""
+
+import time
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+_local = threading.local()
+
+class JobCancelled(Exception):
+    """Raised inside a job that was cancelled or ran past its deadline."""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Job {reason}")
+        self.reason = reason
+
+class CancelToken:
+    """Cancellation flag plus an optional deadline (absolute time.time() seconds)."""
+
+    def __init__(self, deadline: Optional[float] = None):
+        self.deadline = deadline
+        self._event = threading.Event()
+        self._reason = None
+
+    @classmethod
+    def with_timeout(cls, seconds: Optional[float]) -> "CancelToken":
+        return cls(None if not seconds else time.time() + seconds)
+
+    def cancel(self, reason: str = "cancelled"):
+        if not self._event.is_set():
+            self._reason = reason
+            self._event.set()
+
+    @property
+    def reason(self) -> Optional[str]:
+        """Why the job must stop ("cancelled" or "deadline exceeded"), or None."""
+        if not self._event.is_set() and self.deadline is not None and time.time() > self.deadline:
+            self.cancel("deadline exceeded")
+        return self._reason
+
+    @property
+    def cancelled(self) -> bool:
+        return self.reason is not None
+
+    def check(self):
+        reason = self.reason
+        if reason is not None:
+            raise JobCancelled(reason)
+
+@contextmanager
+def cancel_scope(token: Optional[CancelToken]):
+    """Make token the one check_cancelled() consults on this thread."""
+    previous = getattr(_local, "token", None)
+    _local.token = token
+    try:
+        yield token
+    finally:
+        _local.token = previous
+
+def current_token() -> Optional[CancelToken]:
+    return getattr(_local, "token", None)
+
+def check_cancelled():
+    """Raise JobCancelled if the job running on this thread must stop."""
+    token = getattr(_local, "token", None)
+    if token is not None:
+        token.check()
+
+def _pre_forward_check(module, inputs):
+    check_cancelled()
+
+def install_cancel_hook(model):
+    """Check for cancellation before each forward of a model (and each model of a bag)."""
+    for module in [model, *getattr(model, "models", [])]:
+        if hasattr(module, "register_forward_pre_hook") and not getattr(module, "_cancel_hook", False):
+            module.register_forward_pre_hook(_pre_forward_check)
+            module._cancel_hook = True
+    return model
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Separation cost model for Song Splitter.
+Predicts how long a separation takes from the audio duration, per model and
+quality tier, with a linear fit over past runs:
+
+    seconds = overhead + per_second * duration
+
+Every finished separation is appended to a JSONL timing log and the fit for
+its (model, tier) is refreshed, so predictions follow the hardware the API
+actually runs on. Until a tier has enough runs, its real-time factor is used
+(or the mean of other tiers', or real time if nothing is known).
+"""
+
+import json
+import time
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Runs kept per (model, tier); older ones no longer reflect the machine
+MAX_SAMPLES = 200
+# Real-time factor assumed before anything was measured
+DEFAULT_RTF = 1.0
+
+def fit_linear(durations: List[float], seconds: List[float]) -> Tuple[float, float]:
+    """Least-squares (overhead, per_second), falling back to a pure ratio."""
+    x = np.asarray(durations, dtype=np.float64)
+    y = np.asarray(seconds, dtype=np.float64)
+    if len(x) >= 3 and np.ptp(x) > 1.0:
+        per_second, overhead = np.polyfit(x, y, 1)
+        if per_second > 0 and overhead >= 0:
+            return float(overhead), float(per_second)
+    # Too few or too similar durations (or a nonsensical fit): time ~ duration
+    return 0.0, float(y.sum() / max(x.sum(), 1e-6))
+
+class CostModel:
+    """Fitted separation-time predictions, backed by a JSONL log of past runs."""
+
+    def __init__(self, log_path: Optional[str] = None):
+        self.log_path = Path(log_path) if log_path else None
+        self._lock = threading.Lock()
+        self._samples: Dict[Tuple[str, str], List[Tuple[float, float]]] = {}
+        self._fits: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        if self.log_path is not None and self.log_path.exists():
+            self._load()
+
+    def _load(self):
+        with open(self.log_path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    key = (entry["model"], entry["quality"])
+                    sample = (float(entry["audio_seconds"]), float(entry["separation_time"]))
+                except (ValueError, KeyError, TypeError):
+                    continue
+                self._samples.setdefault(key, []).append(sample)
+        for key in self._samples:
+            self._samples[key] = self._samples[key][-MAX_SAMPLES:]
+            self._refit(key)
+
+    def _refit(self, key: Tuple[str, str]):
+        durations, seconds = zip(*self._samples[key])
+        self._fits[key] = fit_linear(durations, seconds)
+
+    def record(self, model: str, quality: str, audio_seconds: float, separation_time: float):
+        """Add one finished separation to the log and the fit."""
+        if audio_seconds <= 0 or separation_time <= 0:
+            return
+        key = (model, quality)
+        with self._lock:
+            samples = self._samples.setdefault(key, [])
+            samples.append((audio_seconds, separation_time))
+            del samples[:-MAX_SAMPLES]
+            self._refit(key)
+            if self.log_path is not None:
+                with open(self.log_path, 'a') as f:
+                    f.write(json.dumps({
+                        "model": model,
+                        "quality": quality,
+                        "audio_seconds": audio_seconds,
+                        "separation_time": separation_time,
+                        "timestamp": time.time()
+                    }) + "\n")
+
+    def predict(self, model: str, quality: str, audio_seconds: float) -> float:
+        """Expected separation time in seconds."""
+        with self._lock:
+            fit = self._fits.get((model, quality))
+            if fit is None:
+                # Borrow the mean real-time factor of what has been measured
+                rates = [per_second for overhead, per_second in self._fits.values()]
+                fit = (0.0, sum(rates) / len(rates) if rates else DEFAULT_RTF)
+        overhead, per_second = fit
+        return overhead + per_second * max(audio_seconds, 0.0)
+
+    def coefficients(self) -> Dict[str, Dict]:
+        """Current fit per "model/tier", for health reporting."""
+        with self._lock:
+            return {
+                f"{model}/{quality}": {
+                    "overhead_seconds": overhead,
+                    "seconds_per_audio_second": per_second,
+                    "runs": len(self._samples[(model, quality)])
+                }
+                for (model, quality), (overhead, per_second) in self._fits.items()
+            }
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Core-aware placement for Song Splitter worker processes.
+Every torch process starts as many intra-op threads as the machine has cores,
+so N workers side by side run N x cores threads that fight over the CPU. Here
+the cores this process may use are split into disjoint sets, one per worker;
+each worker is pinned to its set (sched_setaffinity, where available) and
+sizes its thread pools to match. Hyperthread siblings stay in the same set so
+two workers never share a physical core.
+"""
+
+import os
+import queue
+import multiprocessing
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+def available_cpus() -> List[int]:
+    """CPU ids this process may run on."""
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return list(range(os.cpu_count() or 1))
+
+def _physical_groups(cpus: List[int]) -> List[List[int]]:
+    """Group CPUs that are hyperthreads of one physical core."""
+    groups = []
+    seen = set()
+    for cpu in cpus:
+        if cpu in seen:
+            continue
+        siblings = [cpu]
+        path = Path(f"/sys/devices/system/cpu/cpu{cpu}/topology/thread_siblings_list")
+        try:
+            listed = []
+            for part in path.read_text().strip().split(','):
+                first, _, last = part.partition('-')
+                listed.extend(range(int(first), int(last or first) + 1))
+            siblings = [sibling for sibling in listed if sibling in cpus and sibling not in seen] or [cpu]
+        except (OSError, ValueError):
+            pass
+        seen.update(siblings)
+        groups.append(siblings)
+    return groups
+
+def split_cores(workers: int, cpus: Optional[List[int]] = None) -> List[List[int]]:
+    """
+    Split CPUs into one disjoint set per worker, as evenly as whole physical
+    cores allow. With more workers than physical cores, sets are reused
+    round-robin.
+    """
+    cpus = available_cpus() if cpus is None else sorted(cpus)
+    groups = _physical_groups(cpus)
+    workers = max(1, workers)
+    if workers > len(groups):
+        return [groups[index % len(groups)] for index in range(workers)]
+
+    sets = []
+    start = 0
+    for index in range(workers):
+        count = len(groups) // workers + (1 if index < len(groups) % workers else 0)
+        sets.append(sorted(cpu for group in groups[start:start + count] for cpu in group))
+        start += count
+    return sets
+
+def pin_to_cores(cores: List[int]):
+    """Pin the calling process to cores and size torch's thread pools to match."""
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(len(cores))
+    import torch
+    torch.set_num_threads(len(cores))
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Only possible before the first parallel op
+        pass
+
+def thread_env(cores: List[int], env: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Environment for a subprocess that should use len(cores) threads."""
+    env = dict(os.environ if env is None else env)
+    for name in THREAD_ENV_VARS:
+        env[name] = str(len(cores))
+    return env
+
+def affinity_preexec(cores: List[int]) -> Optional[Callable[[], None]]:
+    """preexec_fn that pins a subprocess to cores (None where unsupported)."""
+    if not hasattr(os, "sched_setaffinity"):
+        return None
+    return lambda: os.sched_setaffinity(0, cores)
+
+def core_slots(workers: int, context=None):
+    """Queue of per-worker core sets, for pool initializers to take one each."""
+    slots = (context or multiprocessing).Queue()
+    for cores in split_cores(workers):
+        slots.put(cores)
+    return slots
+
+def pin_from_slots(slots):
+    """Pool initializer: take this worker's core set and pin to it."""
+    try:
+        cores = slots.get(timeout=10)
+    except queue.Empty:
+        # More processes than slots (a replaced worker); keep the default placement
+        return None
+    pin_to_cores(cores)
+    return cores
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Perceptual audio fingerprints for Song Splitter.
+Recognizes the same recording across encodings (MP3, M4A, FLAC, ...) so that
+existing stems can be reused instead of running Demucs again.
+
+The fingerprint is a sequence of 32-bit sub-fingerprints, one per ~93 ms frame,
+whose bits encode the sign of energy differences between neighbouring bands
+and frames (Haitsma & Kalker). Those signs survive lossy encoding, so two
+encodings of one song differ in only a small fraction of bits.
+"""
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import librosa
+import soundfile as sf
+
+FINGERPRINT_SAMPLE_RATE = 5512
+FRAME_LENGTH = 2048
+HOP_LENGTH = 512
+NUM_BANDS = 33  # 33 bands give 32 bits per frame
+MIN_FREQ = 300.0
+MAX_FREQ = 2000.0
+
+# Maximum bit error rate for two fingerprints to count as the same recording
+MATCH_BER = 0.25
+# Query sub-fingerprints sampled for candidate lookup
+LOOKUP_SAMPLES = 64
+
+def compute_fingerprint(file_path: str) -> Dict:
+    """
+    Compute the fingerprint of an audio file.
+
+    Returns:
+        Dictionary with the duration (seconds) and the uint32 sub-fingerprints
+    """
+    audio, sr = librosa.load(file_path, sr=FINGERPRINT_SAMPLE_RATE, mono=True)
+    spectrum = np.abs(librosa.stft(audio, n_fft=FRAME_LENGTH, hop_length=HOP_LENGTH)) ** 2
+
+    # Energy in logarithmically spaced bands
+    freqs = librosa.fft_frequencies(sr=sr, n_fft=FRAME_LENGTH)
+    edges = np.geomspace(MIN_FREQ, MAX_FREQ, NUM_BANDS + 1)
+    band_index = np.digitize(freqs, edges) - 1
+    energy = np.stack([spectrum[band_index == band].sum(axis=0) for band in range(NUM_BANDS)])
+
+    # Bit m of frame n: sign of the band difference's change since frame n - 1
+    band_diff = energy[:-1] - energy[1:]
+    bits = (band_diff[:, 1:] - band_diff[:, :-1]) > 0
+    weights = (1 << np.arange(NUM_BANDS - 1, dtype=np.uint64)).astype(np.uint64)
+    hashes = (bits.T.astype(np.uint64) * weights).sum(axis=1).astype(np.uint32)
+
+    return {
+        "duration": len(audio) / sr,
+        "hashes": hashes
+    }
+
+def bit_error_rate(a: np.ndarray, b: np.ndarray, offset: int = 0) -> float:
+    """Fraction of differing bits where b, shifted by offset frames, overlaps a."""
+    start = max(0, offset)
+    end = min(len(a), len(b) + offset)
+    if end - start <= 0:
+        return 1.0
+    diff = np.bitwise_xor(a[start:end], b[start - offset:end - offset])
+    differing = np.unpackbits(diff.view(np.uint8)).sum()
+    return float(differing) / ((end - start) * 32)
+
+class FingerprintIndex:
+    """A local sqlite index from fingerprints to the stems already produced for them."""
+
+    def __init__(self, db_path: str):
+        self.db_path = str(db_path)
+        self._lock = threading.Lock()
+        with self._connect() as db:
+            db.execute("""CREATE TABLE IF NOT EXISTS tracks (
+                track_id INTEGER PRIMARY KEY,
+                job_id TEXT, model TEXT, quality TEXT,
+                duration REAL, sample_rate INTEGER,
+                stem_paths TEXT, hashes BLOB)""")
+            db.execute("CREATE TABLE IF NOT EXISTS lookup (hash INTEGER, track_id INTEGER, frame INTEGER)")
+            db.execute("CREATE INDEX IF NOT EXISTS lookup_hash ON lookup (hash)")
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def add(self, job_id: str, fingerprint: Dict, stem_paths: Dict[str, str],
+            sample_rate: int, model: str, quality: str):
+        """Register the stems produced for a fingerprinted input."""
+        hashes = fingerprint["hashes"]
+        with self._lock, self._connect() as db:
+            cursor = db.execute(
+                "INSERT INTO tracks (job_id, model, quality, duration, sample_rate, stem_paths, hashes) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, model, quality, fingerprint["duration"], sample_rate,
+                 json.dumps(stem_paths), hashes.astype("<u4").tobytes()))
+            track_id = cursor.lastrowid
+            db.executemany("INSERT INTO lookup VALUES (?, ?, ?)",
+                           [(int(h), track_id, frame) for frame, h in enumerate(hashes)])
+
+    def lookup(self, fingerprint: Dict, model: str, quality: str) -> Optional[Dict]:
+        """
+        Find an indexed near-duplicate separated with the same model and quality.
+
+        Returns:
+            Dictionary with job_id, stem_paths, sample_rate, offset_seconds and
+            bit_error_rate of the best match, or None
+        """
+        hashes = fingerprint["hashes"]
+        if len(hashes) == 0:
+            return None
+        # Exact sub-fingerprint hits vote for (track, alignment) candidates, among
+        # tracks separated the same way and of about the same length
+        step = max(1, len(hashes) // LOOKUP_SAMPLES)
+        votes = {}
+        with self._connect() as db:
+            for frame in range(0, len(hashes), step):
+                rows = db.execute(
+                    "SELECT lookup.track_id, lookup.frame FROM lookup "
+                    "JOIN tracks ON tracks.track_id = lookup.track_id "
+                    "WHERE lookup.hash = ? AND tracks.model = ? AND tracks.quality = ? "
+                    "AND ABS(tracks.duration - ?) <= 2.0",
+                    (int(hashes[frame]), model, quality, fingerprint["duration"])).fetchall()
+                for track_id, indexed_frame in rows:
+                    key = (track_id, indexed_frame - frame)
+                    votes[key] = votes.get(key, 0) + 1
+
+            best = None
+            for (track_id, offset), _ in sorted(votes.items(), key=lambda item: -item[1])[:5]:
+                job_id, sample_rate, stem_paths, blob = db.execute(
+                    "SELECT job_id, sample_rate, stem_paths, hashes FROM tracks WHERE track_id = ?",
+                    (track_id,)).fetchone()
+                indexed = np.frombuffer(blob, dtype="<u4")
+                ber = bit_error_rate(indexed, hashes, offset)
+                if ber <= MATCH_BER and (best is None or ber < best["bit_error_rate"]):
+                    stem_paths = json.loads(stem_paths)
+                    if not all(Path(path).exists() for path in stem_paths.values()):
+                        continue
+                    best = {
+                        "job_id": job_id,
+                        "stem_paths": stem_paths,
+                        "sample_rate": sample_rate,
+                        "offset_seconds": offset * HOP_LENGTH / FINGERPRINT_SAMPLE_RATE,
+                        "bit_error_rate": ber
+                    }
+        return best
+
+def reuse_stems(match: Dict, output_dir: str, stem_prefix: str, target_sample_rate: int,
+                duration: Optional[float] = None) -> Dict[str, str]:
+    """
+    Copy a match's stems for a new input, realigned and resampled if needed.
+
+    A positive offset means the new input starts later in the indexed
+    recording (e.g. a different encoder delay), so the stems are trimmed;
+    a negative one pads them with silence.
+
+    Returns:
+        Dictionary mapping stem names to the new file paths
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stem_paths = {}
+    for stem_name, source_path in match["stem_paths"].items():
+        audio, sample_rate = sf.read(source_path, dtype="float32", always_2d=True)
+        offset = int(round(match["offset_seconds"] * sample_rate))
+        if offset > 0:
+            audio = audio[offset:]
+        elif offset < 0:
+            audio = np.concatenate([np.zeros((-offset, audio.shape[1]), dtype=audio.dtype), audio])
+        if sample_rate != target_sample_rate:
+            audio = librosa.resample(audio.T, orig_sr=sample_rate, target_sr=target_sample_rate).T
+            sample_rate = target_sample_rate
+        if duration is not None:
+            audio = audio[:int(round(duration * sample_rate))]
+
+        stem_path = output_dir / f"{stem_prefix}_{stem_name}.wav"
+        sf.write(str(stem_path), audio, sample_rate, subtype="FLOAT")
+        stem_paths[stem_name] = str(stem_path)
+    return stem_paths
@@ -3,15 +3,36 @@
 Flask API for Song Splitter - Provides REST API for the Flutter app
 """
 
+# Taken before the other imports, so startup timings include them
+import time
+_import_started = time.time()
+
+import io
 import os
+import math
 import uuid
 import json
+import atexit
+import shutil
 import threading
 from pathlib import Path
-from flask import Flask, request, jsonify, send_file
+import soundfile as sf
+from flask import Flask, Response, request, jsonify, send_file
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
-from song_splitter import SongSplitter
+from song_splitter import SongSplitter, ProgressiveWavWriter, QUALITY_TIERS, audio_duration, resolve_quality, tier_model
+from cpu_backend import parse_backend_spec
+from fingerprint import FingerprintIndex, compute_fingerprint, reuse_stems
+from stem_store import StemStore
+from stem_pack import StemPack, pack_path_for, pack_stems
+from hls_stream import HlsStemWriter, read_manifest, segment_stems
+from cancellation import CancelToken, JobCancelled, cancel_scope, check_cancelled
+from inference_server import InferenceClient, RemoteJobTable
+from scheduler import JobScheduler, resolve_priority
+from cost_model import CostModel
+from cpu_affinity import available_cpus
+from memory_budget import GB, MemoryGate, default_budget, job_bytes, memory_profile, plan_workers
+from variant_cache import VARIANT_FORMATS, VariantCache, parse_variant, variant_name
 
 app = Flask(__name__)
 CORS(app)
@@ -24,26 +45,233 @@ ALLOWED_EXTENSIONS = {'mp3', 'wav', 'm4a', 'flac', 'aac'}
 UPLOAD_FOLDER.mkdir(exist_ok=True)
 OUTPUT_FOLDER.mkdir(exist_ok=True)
 
-# Global state for processing jobs
-processing_jobs = {}
-splitter = SongSplitter()
+# With SONG_SPLITTER_INFERENCE_ADDRESS set this process is one of several HTTP
+# workers (see serve.py): jobs and the model live in the inference process
+INFERENCE_ADDRESS = os.environ.get('SONG_SPLITTER_INFERENCE_ADDRESS')
+# Uploads whose predicted queue wait exceeds this many seconds are turned away (0: never)
+WAIT_SLO = float(os.environ.get('SONG_SPLITTER_WAIT_SLO', '0'))
+# Transcoded download variants (other formats, bitrates, sample rates) kept on disk,
+# shared by every HTTP worker, up to SONG_SPLITTER_VARIANT_CACHE_MB
+variant_cache = VariantCache(OUTPUT_FOLDER / 'variants',
+                             int(float(os.environ.get('SONG_SPLITTER_VARIANT_CACHE_MB', '2048')) * 1024 ** 2))
+# Also write every job's stems into one packed multitrack file, unless the job says otherwise
+PACK_DEFAULT = os.environ.get('SONG_SPLITTER_PACK', '0').lower() in ('1', 'true', 'yes')
+# Publish every job's stems as HLS segments while they are written, unless the job says otherwise
+STREAM_DEFAULT = os.environ.get('SONG_SPLITTER_STREAM', '0').lower() in ('1', 'true', 'yes')
+# Seconds after submission a job is given up on, unless it sets its own deadline (0: none)
+DEFAULT_DEADLINE = float(os.environ.get('SONG_SPLITTER_JOB_DEADLINE', '0'))
+# Longest a status request may be held waiting for a change (?wait=), and how often it checks
+MAX_STATUS_WAIT = 30.0
+STATUS_POLL_INTERVAL = 0.25
+# Seconds of probe audio the model is run on at startup (0: load the model on the first job)
+WARMUP_SECONDS = float(os.environ.get('SONG_SPLITTER_WARMUP_SECONDS', '2'))
+
+if INFERENCE_ADDRESS:
+    inference = InferenceClient(INFERENCE_ADDRESS)
+    processing_jobs = RemoteJobTable(inference)
+    splitter = None
+    fingerprint_index = None
+    scheduler = None
+    cancel_tokens = None
+    cost_model = None
+    memory = None
+else:
+    inference = None
+    # Global state for processing jobs
+    processing_jobs = {}
+    # Cancellation tokens of queued and running jobs
+    cancel_tokens = {}
+    # Per-model CPU backends, e.g. SONG_SPLITTER_CPU_BACKENDS="htdemucs=quantized",
+    # worker processes that split a single track across cores, and concurrent
+    # evaluation of bagged models
+    splitter = SongSplitter(backends=parse_backend_spec(os.environ.get('SONG_SPLITTER_CPU_BACKENDS')),
+                            workers=int(os.environ.get('SONG_SPLITTER_SEGMENT_WORKERS', '1')),
+                            parallel_bag=os.environ.get('SONG_SPLITTER_PARALLEL_BAG', '') == '1')
+    # Stop its worker processes with the server (including reloader restarts)
+    atexit.register(splitter.close)
+    # Fingerprints of separated inputs, to reuse stems for re-encoded duplicates
+    fingerprint_index = FingerprintIndex(OUTPUT_FOLDER / 'fingerprints.db')
+    # Separations run one at a time by default (each one uses every core);
+    # a client may hold at most SONG_SPLITTER_CLIENT_QUOTA of the slots.
+    # SONG_SPLITTER_MAX_JOBS=auto (or a SONG_SPLITTER_MEMORY_BUDGET in GB)
+    # sizes the slots from the measured model footprint and admits each job
+    # only while its working set fits the budget (sized during warm-up)
+    max_jobs = os.environ.get('SONG_SPLITTER_MAX_JOBS', '1')
+    memory = None
+    if max_jobs == 'auto' or os.environ.get('SONG_SPLITTER_MEMORY_BUDGET'):
+        memory = {'budget': default_budget(), 'profile': None, 'auto_jobs': max_jobs == 'auto'}
+        memory['gate'] = MemoryGate(memory['budget'])
+    scheduler = JobScheduler(max_running=1 if max_jobs == 'auto' else int(max_jobs),
+                             client_quota=int(os.environ.get('SONG_SPLITTER_CLIENT_QUOTA', '1')),
+                             memory=memory['gate'] if memory else None)
+    # Separation time predictions fitted on past runs
+    cost_model = CostModel(os.environ.get('SONG_SPLITTER_TIMINGS_LOG', str(OUTPUT_FOLDER / 'timings.jsonl')))
+
+# Liveness is the process answering; readiness is the model loaded and warm
+startup = {
+    'state': 'starting',
+    'import_seconds': time.time() - _import_started,
+    'ready_seconds': None,
+    'error': None
+}
+
+def warm_up():
+    """Load and run the model once, then size memory-based concurrency (background thread)."""
+    startup['state'] = 'warming'
+    try:
+        if WARMUP_SECONDS > 0:
+            splitter.warm_up(WARMUP_SECONDS)
+        if memory is not None:
+            plan_memory()
+        share_cores(scheduler.max_running)
+        startup['state'] = 'ready'
+        print(f"Ready in {time.time() - _import_started:.1f}s")
+    except Exception as e:
+        startup.update({'state': 'failed', 'error': str(e)})
+        print(f"Warm-up failed: {e}")
+    startup['ready_seconds'] = time.time() - _import_started
+
+def share_cores(jobs):
+    """
+    Split the cores between concurrent jobs. Every job thread runs torch's
+    intra-op pool, which spans all cores by default, so N jobs would run N
+    times as many threads as there are cores.
+    """
+    if jobs > 1:
+        import torch
+        torch.set_num_threads(max(1, len(available_cpus()) // jobs))
+        print(f"{jobs} concurrent jobs, {torch.get_num_threads()} torch threads each")
+
+def plan_memory():
+    """Fit the job slots and chunk length to the memory budget from measured footprints."""
+    profile = memory_profile(quality='standard', backends=splitter.backends)
+    auto_jobs, splitter.max_chunk_seconds = plan_workers(profile, memory['budget'], [],
+                                                         len(available_cpus()), shared_model=True)
+    memory['gate'].capacity = memory['budget'] - profile['process_bytes'] - profile['model_bytes']
+    memory['profile'] = profile
+    if memory['auto_jobs']:
+        scheduler.resize(auto_jobs)
+    print(f"Memory budget {memory['budget'] / GB:.1f} GB: {scheduler.max_running} concurrent jobs, "
+          f"chunks of up to {splitter.max_chunk_seconds:.0f}s")
+
+# Under the development server's reloader the module is imported by the file
+# watcher too; only the serving process (WERKZEUG_RUN_MAIN) warms up the model
+if inference is None and (__name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+    threading.Thread(target=warm_up, daemon=True).start()
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def process_audio_async(job_id, input_path, output_dir):
-    """Process audio separation in background thread."""
+def reuse_duplicate_stems(job_id, input_path, output_dir, model_name, quality):
+    """Copy stems from an already separated near-duplicate of the input, if any."""
+    fingerprint = processing_jobs[job_id].get('fingerprint')
+    if fingerprint is None:
+        return None
+    match = fingerprint_index.lookup(fingerprint, model_name, quality)
+    if match is None:
+        return None
+    
+    print(f"Reusing stems of job {match['job_id']} (bit error rate {match['bit_error_rate']:.3f})")
+    samplerate = splitter.load_model(tier_model(QUALITY_TIERS[quality], splitter.model_name)).samplerate
+    stems = reuse_stems(match, output_dir, Path(input_path).stem, samplerate, fingerprint['duration'])
+    processing_jobs[job_id]['deduplicated_from'] = match['job_id']
+    return stems
+
+def process_audio_async(job_id, input_path, output_dir, quality=None, progressive=False,
+                        preview_seconds=15.0, window=None, pack=False, stream=False):
+    """
+    Process audio separation in background thread; window=(start, end) separates an excerpt.
+    Run inside cancel_scope(): a cancelled or overdue job stops at the next check and its
+    partial outputs are removed.
+    """
+    hls = {}
     try:
+        check_cancelled()
         processing_jobs[job_id]['status'] = 'processing'
         processing_jobs[job_id]['progress'] = 0.1
         
-        # Separate audio
-        stems = splitter.separate_audio(input_path, output_dir)
+        quality = resolve_quality(quality)
+        model_name = tier_model(QUALITY_TIERS[quality], splitter.model_name)
+        
+        # With stream, stems are published as HLS segments as soon as they are written
+        stream_dir = Path(output_dir).absolute() / 'stream'
+        
+        # Separate audio, unless the same recording was separated before
+        separation_stats = {}
+        stems = None
+        if window is None:
+            stems = reuse_duplicate_stems(job_id, input_path, output_dir, model_name, quality)
+        if stems is not None:
+            separation_stats = {'quality': quality, 'model': model_name, 'separation_time': 0.0}
+        elif window is not None:
+            stems = splitter.separate_window(input_path, output_dir, window[0], window[1],
+                                             quality=quality, stats=separation_stats)
+        elif progressive:
+            def on_progress(available_seconds, total_seconds, stem_paths):
+                if stream:
+                    if 'writer' not in hls:
+                        info = sf.info(next(iter(stem_paths.values())))
+                        hls['writer'] = HlsStemWriter(stream_dir, list(stem_paths), info.samplerate, info.channels)
+                    hls['writer'].append_from_files(stem_paths, int(round(available_seconds * hls['writer'].sample_rate)))
+                    processing_jobs[job_id]['stream'] = str(stream_dir)
+                processing_jobs[job_id].update({
+                    'stem_store': separation_stats.get('stem_store'),
+                    'stems': stem_paths,
+                    'available_seconds': available_seconds,
+                    'duration_seconds': total_seconds,
+                    'progress': 0.1 + 0.7 * available_seconds / max(total_seconds, 1e-6)
+                })
+            
+            stems = splitter.separate_progressive(input_path, output_dir, quality=quality,
+                                                  preview_seconds=preview_seconds,
+                                                  on_progress=on_progress,
+                                                  stats=separation_stats, store=True)
+        else:
+            stems = splitter.separate_audio(input_path, output_dir, quality=quality,
+                                            stats=separation_stats, store=True)
+        check_cancelled()
+        
+        if 'deduplicated_from' not in processing_jobs[job_id]:
+            cost_model.record(model_name, quality, separation_stats['audio_seconds'],
+                              separation_stats['separation_time'])
+        
+        fingerprint = processing_jobs[job_id].get('fingerprint')
+        if fingerprint is not None and window is None and 'deduplicated_from' not in processing_jobs[job_id]:
+            fingerprint_index.add(job_id, fingerprint, stems, separation_stats['sample_rate'],
+                                  model_name, quality)
+        processing_jobs[job_id]['separation_stats'] = separation_stats
+        processing_jobs[job_id]['stem_store'] = separation_stats.get('stem_store')
+        
+        if stream:
+            if 'writer' in hls:
+                hls['writer'].append_from_files(stems)
+                hls['writer'].close()
+            else:
+                segment_stems(stems, str(stream_dir))
+            processing_jobs[job_id]['stream'] = str(stream_dir)
         processing_jobs[job_id]['progress'] = 0.8
         
         # Analyze quality
-        quality_metrics = splitter.analyze_quality(input_path, stems)
+        if window is not None:
+            quality_metrics = splitter.analyze_quality(
+                input_path, stems, offset=window[0],
+                duration=None if window[1] is None else window[1] - window[0])
+        else:
+            quality_metrics = splitter.analyze_quality(input_path, stems)
         processing_jobs[job_id]['progress'] = 0.9
+        check_cancelled()
+        
+        # All stems, interleaved in seekable blocks, with the job metadata in one file
+        if pack:
+            processing_jobs[job_id]['pack'] = pack_stems(
+                stems, pack_path_for(os.path.abspath(output_dir), Path(input_path).stem), metadata={
+                    'job_id': job_id,
+                    'filename': processing_jobs[job_id].get('filename', ''),
+                    'quality': quality,
+                    'window': window,
+                    'separation_stats': separation_stats,
+                    'quality_metrics': quality_metrics
+                })
         
         # Update job status
         processing_jobs[job_id].update({
@@ -53,6 +281,21 @@ def process_audio_async(job_id, input_path, output_dir):
             'quality_metrics': quality_metrics
         })
         
+    except JobCancelled as e:
+        print(f"Job {job_id} stopped: {e.reason}")
+        if 'writer' in hls:
+            hls['writer'].abort()
+        shutil.rmtree(output_dir, ignore_errors=True)
+        remove_upload(input_path)
+        processing_jobs[job_id].update({
+            'status': 'cancelled',
+            'error': e.reason,
+            'progress': 0.0,
+            'stems': {},
+            'stem_store': None,
+            'stream': None,
+            'pack': None
+        })
     except Exception as e:
         processing_jobs[job_id].update({
             'status': 'failed',
@@ -79,18 +322,48 @@ def upload_file():
         file_path = UPLOAD_FOLDER / f"{job_id}_{filename}"
         file.save(str(file_path))
         
+        # Admission control: turn the upload away if it would wait past the SLO
+        try:
+            quality = resolve_quality(request.form.get('quality'))
+            priority = resolve_priority(request.form.get('priority'))
+        except ValueError as e:
+            os.remove(file_path)
+            return jsonify({'error': str(e)}), 400
+        duration = audio_duration(file_path)
+        predicted = predicted_wait(quality, priority, duration)
+        if WAIT_SLO > 0 and predicted > WAIT_SLO:
+            os.remove(file_path)
+            response = jsonify({
+                'error': 'Server busy, try again later',
+                'predicted_wait_seconds': predicted,
+                'wait_slo_seconds': WAIT_SLO
+            })
+            response.headers['Retry-After'] = str(max(1, math.ceil(predicted - WAIT_SLO)))
+            return response, 503
+        
+        # Fingerprint the upload so re-encoded duplicates can reuse stems
+        try:
+            fingerprint = compute_fingerprint(str(file_path))
+        except Exception as e:
+            print(f"Could not fingerprint {filename}: {e}")
+            fingerprint = None
+        
         # Create job entry
         processing_jobs[job_id] = {
             'status': 'uploaded',
             'filename': filename,
             'file_path': str(file_path),
+            'fingerprint': fingerprint,
+            'duration_seconds': duration,
             'progress': 0.0
         }
         
         return jsonify({
             'job_id': job_id,
             'filename': filename,
-            'status': 'uploaded'
+            'status': 'uploaded',
+            'duration_seconds': duration,
+            'predicted_wait_seconds': predicted
         })
     
     return jsonify({'error': 'Invalid file type'}), 400
@@ -105,30 +378,217 @@ def start_separation(job_id):
     if job['status'] != 'uploaded':
         return jsonify({'error': 'Job already processed or in progress'}), 400
     
+    options = request.get_json(silent=True) or request.form
+    try:
+        quality = resolve_quality(options.get('quality') or request.args.get('quality'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    job['quality'] = quality
+    
+    # Priority class, and who to count the job against for fairness
+    try:
+        priority = resolve_priority(options.get('priority') or request.args.get('priority'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    client_id = request.headers.get('X-Client-Id') or request.remote_addr or ''
+    
+    # Progressive mode publishes the first seconds of every stem before the rest
+    progressive = str(options.get('progressive', request.args.get('progressive', ''))).lower()
+    progressive = progressive in ('1', 'true', 'yes')
+    try:
+        preview_seconds = float(options.get('preview_seconds', 15.0))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid preview_seconds'}), 400
+    
+    # Optional time window: only [start, end) seconds are decoded and separated
+    window = None
+    if options.get('start') is not None or options.get('end') is not None:
+        try:
+            start = float(options.get('start') or 0.0)
+            end = float(options['end']) if options.get('end') is not None else None
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Invalid start/end'}), 400
+        if start < 0 or (end is not None and end <= start):
+            return jsonify({'error': 'Invalid time window'}), 400
+        window = (start, end)
+    job['window'] = window
+    
+    pack = str(options.get('pack', request.args.get('pack', PACK_DEFAULT))).lower() in ('1', 'true', 'yes')
+    stream_option = options.get('stream', request.args.get('stream'))
+    stream = STREAM_DEFAULT if stream_option is None else str(stream_option).lower() in ('1', 'true', 'yes')
+    # Segments are cut while the stems are written, which only progressive separation does;
+    # excerpts are separated in one go, so they are not streamed
+    if stream and window is not None:
+        if stream_option is not None:
+            return jsonify({'error': 'stream cannot be combined with start/end'}), 400
+        stream = False
+    progressive = progressive or stream
+    job['progressive'] = progressive
+    
+    # Optional deadline: the job is stopped this many seconds after submission
+    deadline = options.get('deadline_seconds')
+    try:
+        deadline_seconds = float(deadline) if deadline not in (None, '') else DEFAULT_DEADLINE
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid deadline_seconds'}), 400
+    if deadline not in (None, '') and not deadline_seconds > 0:
+        return jsonify({'error': 'deadline_seconds must be positive'}), 400
+    deadline_seconds = deadline_seconds or None
+    
     # Create output directory
     output_dir = OUTPUT_FOLDER / job_id
     output_dir.mkdir(exist_ok=True)
     
-    # Start processing in background thread
-    thread = threading.Thread(
-        target=process_audio_async,
-        args=(job_id, job['file_path'], str(output_dir))
-    )
-    thread.start()
+    try:
+        submit_job(job_id, quality=quality, progressive=progressive,
+                   preview_seconds=preview_seconds, window=window,
+                   priority=priority, client_id=client_id, pack=pack, stream=stream,
+                   deadline_seconds=deadline_seconds)
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 400
     
     return jsonify({
         'job_id': job_id,
-        'status': 'processing',
-        'message': 'Separation started'
+        'status': 'queued',
+        'quality': quality,
+        'priority': priority,
+        'progressive': progressive,
+        'message': 'Separation queued'
     })
 
+def submit_job(job_id, quality=None, progressive=False, preview_seconds=15.0, window=None,
+               priority=None, client_id='', pack=False, stream=False, deadline_seconds=None):
+    """Queue an uploaded job for separation, in the inference process if there is one."""
+    if inference is not None:
+        inference.call('submit', job_id, {'quality': quality, 'progressive': progressive,
+                                          'preview_seconds': preview_seconds, 'window': window,
+                                          'priority': priority, 'client_id': client_id,
+                                          'pack': pack, 'stream': stream,
+                                          'deadline_seconds': deadline_seconds})
+        return
+    
+    job = processing_jobs[job_id]
+    output_dir = OUTPUT_FOLDER / job_id
+    quality = resolve_quality(quality)
+    priority = resolve_priority(priority)
+    token = CancelToken.with_timeout(deadline_seconds)
+    cancel_tokens[job_id] = token
+    job.update({
+        'status': 'queued',
+        'priority': priority,
+        'client_id': client_id,
+        'queued_at': time.time(),
+        'deadline': token.deadline
+    })
+    
+    def run():
+        job['queue_wait_seconds'] = time.time() - job['queued_at']
+        try:
+            with cancel_scope(token):
+                process_audio_async(job_id, job['file_path'], str(output_dir), quality,
+                                    progressive, preview_seconds, window, pack, stream)
+        finally:
+            cancel_tokens.pop(job_id, None)
+    
+    scheduler.submit(job_id, run, priority=priority, client_id=client_id,
+                     expected_seconds=expected_job_seconds(job.get('duration_seconds'), quality, window),
+                     memory_bytes=job_memory_bytes(job.get('duration_seconds'), window))
+
+def cancel_job(job_id):
+    """
+    Stop a job: a queued one is dropped at once, a running one stops at its
+    next check (between model segments and stages) and removes its outputs.
+    """
+    if inference is not None:
+        return inference.call('cancel', job_id)
+    
+    job = processing_jobs[job_id]
+    if job['status'] in ('completed', 'failed', 'cancelled'):
+        return {'job_id': job_id, 'status': job['status'], 'error': 'Job already finished'}
+    token = cancel_tokens.get(job_id)
+    if token is not None:
+        token.cancel()
+    if job['status'] == 'uploaded' or scheduler.cancel(job_id):
+        cancel_tokens.pop(job_id, None)
+        shutil.rmtree(OUTPUT_FOLDER / job_id, ignore_errors=True)
+        remove_upload(job['file_path'])
+        job.update({'status': 'cancelled', 'error': 'cancelled', 'progress': 0.0})
+        return {'job_id': job_id, 'status': 'cancelled'}
+    return {'job_id': job_id, 'status': 'cancelling'}
+
+def remove_upload(file_path):
+    """Delete the uploaded file of a job that will not be separated."""
+    try:
+        os.remove(file_path)
+    except OSError:
+        pass
+
+def job_seconds(duration, window=None):
+    """Seconds of audio a job separates (its window, if any)."""
+    if window is not None:
+        end = duration if window[1] is None else min(window[1], duration or window[1])
+        duration = end - window[0]
+    return max(duration or 0.0, 0.0)
+
+def job_memory_bytes(duration, window=None):
+    """Working set a job reserves under the memory budget (0 without one)."""
+    if memory is None or memory['profile'] is None:
+        return 0
+    seconds = job_seconds(duration, window)
+    if splitter.max_chunk_seconds:
+        seconds = min(seconds, splitter.max_chunk_seconds)
+    return job_bytes(memory['profile'], seconds)
+
+def expected_job_seconds(duration, quality, window=None):
+    """Predicted separation time of a job from the fitted cost model."""
+    model_name = tier_model(QUALITY_TIERS[quality], splitter.model_name)
+    return cost_model.predict(model_name, quality, job_seconds(duration, window))
+
+def predicted_wait(quality, priority, duration):
+    """How long a new job would queue before starting, in seconds."""
+    if inference is not None:
+        return inference.call('predicted_wait', quality, priority, duration)
+    return scheduler.predicted_wait(priority, expected_job_seconds(duration, quality))
+
+def queue_info(job_id):
+    """The scheduler's view of a job (priority class, queue position, waits)."""
+    if inference is not None:
+        return inference.call('queue_info', job_id)
+    return scheduler.queue_info(job_id)
+
+@app.route('/api/cancel/<job_id>', methods=['POST'])
+def cancel_separation(job_id):
+    """Cancel a queued or running job."""
+    if job_id not in processing_jobs:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    result = cancel_job(job_id)
+    if 'error' in result:
+        return jsonify(result), 409
+    return jsonify(result)
+
 @app.route('/api/status/<job_id>', methods=['GET'])
 def get_status(job_id):
-    """Get processing status for a job."""
+    """
+    Get processing status for a job. Long poll with ?wait=<seconds>&since=<progress>:
+    the response is held until the status or progress changes, or wait runs out.
+    """
     if job_id not in processing_jobs:
         return jsonify({'error': 'Job not found'}), 404
     
     job = processing_jobs[job_id]
+    wait = min(request.args.get('wait', 0.0, type=float), MAX_STATUS_WAIT)
+    since = request.args.get('since', type=float)
+    if wait > 0:
+        deadline = time.time() + wait
+        status = request.args.get('status', job['status'])
+        while (time.time() < deadline and job['status'] == status
+               and job['status'] not in ('completed', 'failed', 'cancelled')
+               and (since is None or job['progress'] == since)):
+            time.sleep(STATUS_POLL_INTERVAL)
+            job = processing_jobs[job_id]
+    
+    queue = queue_info(job_id) if job.get('priority') else None
     return jsonify({
         'job_id': job_id,
         'status': job['status'],
@@ -136,17 +596,33 @@ def get_status(job_id):
         'filename': job.get('filename', ''),
         'stems': job.get('stems', {}),
         'quality_metrics': job.get('quality_metrics', {}),
+        'quality': job.get('quality', ''),
+        'separation_stats': job.get('separation_stats', {}),
+        'available_seconds': job.get('available_seconds'),
+        'deduplicated_from': job.get('deduplicated_from'),
+        'duration_seconds': job.get('duration_seconds'),
+        'priority': job.get('priority'),
+        'queue_wait_seconds': job.get('queue_wait_seconds'),
+        'queue': queue,
+        'pack': bool(job.get('pack')),
+        'stream': bool(job.get('stream')),
+        'deadline': job.get('deadline'),
+        'eta_seconds': (queue or {}).get('eta_seconds', 0.0 if job['status'] in ('completed', 'failed', 'cancelled') else None),
         'error': job.get('error', '')
     })
 
 @app.route('/api/download/<job_id>/<stem_name>', methods=['GET'])
 def download_stem(job_id, stem_name):
-    """Download a separated stem."""
+    """
+    Download a separated stem, optionally only the ?start=&end= seconds of it,
+    or transcoded with ?format=wav|flac|mp3&bitrate=192&sample_rate=22050.
+    """
     if job_id not in processing_jobs:
         return jsonify({'error': 'Job not found'}), 404
     
     job = processing_jobs[job_id]
-    if job['status'] != 'completed':
+    partial = job['status'] == 'processing' and job.get('available_seconds')
+    if job['status'] != 'completed' and not partial:
         return jsonify({'error': 'Job not completed'}), 400
     
     stems = job.get('stems', {})
@@ -157,8 +633,163 @@ def download_stem(job_id, stem_name):
     if not os.path.exists(stem_path):
         return jsonify({'error': 'File not found'}), 404
     
+    try:
+        variant = parse_variant(request.args.get('format'), request.args.get('bitrate'),
+                                request.args.get('sample_rate'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    start = request.args.get('start', type=float)
+    end = request.args.get('end', type=float)
+    if variant is not None:
+        if partial or start is not None or end is not None:
+            return jsonify({'error': 'Format variants are only available for whole, completed stems'}), 400
+        return send_file(variant_cache.get(stem_path, variant), mimetype=VARIANT_FORMATS[variant['format']],
+                         as_attachment=True, download_name=variant_name(stem_path, variant))
+    
+    if start is not None or end is not None:
+        if partial:
+            end = min(end, job['available_seconds']) if end is not None else job['available_seconds']
+        return send_stem_slice(job, stem_name, stem_path, start or 0.0, end)
+    
+    if partial:
+        return send_partial_stem(stem_path, job['available_seconds'])
+    
     return send_file(stem_path, as_attachment=True)
 
+def send_stem_slice(job, stem_name, stem_path, start, end):
+    """Send the [start, end) seconds of a stem as a WAV file."""
+    if start < 0 or (end is not None and end <= start):
+        return jsonify({'error': 'Invalid time range'}), 400
+    
+    store_path = job.get('stem_store')
+    if store_path and os.path.exists(store_path):
+        # Zero-copy view straight from the memory-mapped stem store
+        store = StemStore(store_path)
+        audio = store.read(stem_name, start, end)
+        sample_rate = store.sample_rate
+    else:
+        with sf.SoundFile(stem_path) as f:
+            sample_rate = f.samplerate
+            f.seek(min(int(start * sample_rate), f.frames))
+            frames = -1 if end is None else int((end - start) * sample_rate)
+            audio = f.read(frames, dtype='float32', always_2d=True)
+    
+    buffer = io.BytesIO()
+    sf.write(buffer, audio, sample_rate, format='WAV', subtype='FLOAT')
+    buffer.seek(0)
+    end_label = f"{end:.2f}" if end is not None else "end"
+    return send_file(buffer, mimetype='audio/wav', as_attachment=True,
+                     download_name=f"{Path(stem_path).stem}_{start:.2f}-{end_label}.wav")
+
+def send_partial_stem(stem_path, available_seconds):
+    """Stream the committed part of a stem that is still being written."""
+    size = ProgressiveWavWriter.committed_size(stem_path)
+    
+    def generate():
+        remaining = size
+        with open(stem_path, 'rb') as f:
+            while remaining > 0:
+                chunk = f.read(min(65536, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+    
+    return Response(generate(), mimetype='audio/wav', headers={
+        'Content-Length': str(size),
+        'Content-Disposition': f'attachment; filename={Path(stem_path).name}',
+        'X-Available-Seconds': f'{available_seconds:.2f}'
+    })
+
+def job_pack(job_id):
+    """Stem pack of a completed job, or an error response."""
+    if job_id not in processing_jobs:
+        return None, (jsonify({'error': 'Job not found'}), 404)
+    job = processing_jobs[job_id]
+    if job['status'] != 'completed':
+        return None, (jsonify({'error': 'Job not completed'}), 400)
+    pack_path = job.get('pack')
+    if not pack_path or not os.path.exists(pack_path):
+        return None, (jsonify({'error': 'Job has no stem pack'}), 404)
+    return pack_path, None
+
+@app.route('/api/pack/<job_id>', methods=['GET'])
+def download_pack(job_id):
+    """Download a job's stem pack; supports HTTP Range requests for block ranges."""
+    pack_path, error = job_pack(job_id)
+    if error:
+        return error
+    return send_file(pack_path, mimetype='application/octet-stream', conditional=True,
+                     download_name=Path(pack_path).name)
+
+@app.route('/api/pack/<job_id>/index', methods=['GET'])
+def pack_index(job_id):
+    """Header, seek index ([start_frame, offset, length] per block) and metadata of a stem pack."""
+    pack_path, error = job_pack(job_id)
+    if error:
+        return error
+    return jsonify(StemPack(pack_path).info())
+
+@app.route('/api/pack/<job_id>/range', methods=['GET'])
+def pack_range(job_id):
+    """
+    The blocks holding ?start=&end= seconds of all stems, as one raw byte range.
+    X-Pack-Start-Frame is the first frame of the first block returned.
+    """
+    pack_path, error = job_pack(job_id)
+    if error:
+        return error
+    start = request.args.get('start', 0.0, type=float)
+    end = request.args.get('end', type=float)
+    if start < 0 or (end is not None and end <= start):
+        return jsonify({'error': 'Invalid time range'}), 400
+    
+    pack = StemPack(pack_path)
+    offset, length, first_frame = pack.byte_range(start, end)
+    with open(pack_path, 'rb') as f:
+        data = os.pread(f.fileno(), length, offset)
+    return Response(data, mimetype='application/octet-stream', headers={
+        'X-Pack-Start-Frame': str(first_frame),
+        'X-Pack-Blocks': str(length // pack.block_bytes),
+        'X-Pack-Block-Frames': str(pack.block_frames),
+        'X-Pack-Stems': ','.join(pack.stems),
+        'X-Pack-Channels': str(pack.channels),
+        'X-Pack-Dtype': pack.dtype,
+        'X-Pack-Sample-Rate': str(pack.sample_rate)
+    })
+
+@app.route('/api/stream/<job_id>', methods=['GET'])
+def stream_manifest(job_id):
+    """Per-stem HLS playlists of a job, available from its first published segment."""
+    if job_id not in processing_jobs:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    stream_dir = processing_jobs[job_id].get('stream')
+    manifest = read_manifest(stream_dir) if stream_dir else None
+    if manifest is None:
+        return jsonify({'error': 'No stream segments yet'}), 404
+    manifest['playlists'] = {stem: f"/api/stream/{job_id}/{name}" for stem, name in manifest.pop('stems').items()}
+    return jsonify({'job_id': job_id, **manifest})
+
+@app.route('/api/stream/<job_id>/<filename>', methods=['GET'])
+def stream_file(job_id, filename):
+    """A stem playlist (.m3u8) or segment (.mp3)."""
+    if job_id not in processing_jobs:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    stream_dir = processing_jobs[job_id].get('stream')
+    path = Path(stream_dir or '') / filename
+    if not stream_dir or secure_filename(filename) != filename or not path.is_file():
+        return jsonify({'error': 'File not found'}), 404
+    
+    if path.suffix == '.m3u8':
+        # Playlists grow until the job completes; players must re-fetch them
+        response = send_file(str(path), mimetype='application/vnd.apple.mpegurl')
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return send_file(str(path), mimetype='audio/mpeg', max_age=86400)
+
 @app.route('/api/jobs', methods=['GET'])
 def list_jobs():
     """List all processing jobs."""
@@ -176,15 +807,63 @@ def list_jobs():
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint."""
-    return jsonify({
-        'status': 'healthy',
+    if inference is not None:
+        try:
+            health = {**inference.call('health'), 'http_worker': os.getpid()}
+        except (OSError, EOFError, RuntimeError) as e:
+            return jsonify({'status': 'unavailable', 'live': True, 'ready': False, 'error': str(e)}), 503
+    else:
+        health = health_info()
+    # Downloads, and so their variants, are served by this process
+    health['variant_cache'] = variant_cache.stats()
+    return jsonify(health)
+
+@app.route('/api/health/live', methods=['GET'])
+def liveness_check():
+    """Liveness: this process serves requests (restart it if not)."""
+    return jsonify({'live': True})
+
+@app.route('/api/health/ready', methods=['GET'])
+def readiness_check():
+    """Readiness: the model is warm and jobs start without a cold load (503 until then)."""
+    if inference is not None:
+        try:
+            info = inference.call('readiness')
+        except (OSError, EOFError, RuntimeError) as e:
+            return jsonify({'ready': False, 'state': 'unavailable', 'error': str(e)}), 503
+    else:
+        info = readiness_info()
+    return jsonify(info), 200 if info['ready'] else 503
+
+def readiness_info():
+    """Warm-up state and startup timings of the process that runs separations."""
+    return {'ready': startup['state'] == 'ready', **startup}
+
+def health_info():
+    """Health of the process that runs separations."""
+    ready = startup['state'] == 'ready'
+    return {
+        'status': 'unhealthy' if startup['state'] == 'failed' else 'healthy',
+        'live': True,
+        'ready': ready,
+        'startup': dict(startup),
         'model_loaded': splitter.model is not None,
-        'device': splitter.device
-    })
+        # Reading the device imports torch, which the warm-up does first
+        'device': splitter.device if ready else None,
+        'cpu_backends': splitter.backend_reports,
+        'quality_tiers': splitter.get_quality_tiers(),
+        'scheduler': scheduler.stats(),
+        'cost_model': cost_model.coefficients(),
+        'memory_budget_bytes': memory['budget'] if memory else None,
+        'max_chunk_seconds': splitter.max_chunk_seconds,
+        'wait_slo_seconds': WAIT_SLO or None
+    }
 
 if __name__ == '__main__':
     print("Starting Song Splitter API...")
     print(f"Upload folder: {UPLOAD_FOLDER.absolute()}")
     print(f"Output folder: {OUTPUT_FOLDER.absolute()}")
     
+    print("Development server; use serve.py for production")
+    
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Segmented HLS streaming of separated stems.
+Each stem is MP3-encoded as one continuous stream while it is written, and the
+stream is cut at frame boundaries into short segments (HLS packed audio, each
+starting with an ID3 timestamp). All stems use the same encoder settings and
+the same number of MP3 frames per segment, so segment i of every stem covers
+exactly the same samples. Per-stem playlists list the segments published so
+far as an EVENT playlist (a type that must not change, RFC 8216 4.3.3.5) and are
+closed with #EXT-X-ENDLIST once the job completes, so a player can start all
+stems after the first segment and seek without fetching the rest.
+
+    <directory>/manifest.json         stems, playlists, segment duration, completeness
+    <directory>/<stem>.m3u8           playlist
+    <directory>/<stem>_00000.mp3 ...  segments
+"""
+
+import os
+import json
+import math
+import struct
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import soundfile as sf
+
+SEGMENT_SECONDS = 2.0
+DEFAULT_BITRATE = 192
+MANIFEST_NAME = "manifest.json"
+TIMESTAMP_OWNER = b"com.apple.streaming.transportStreamTimestamp\0"
+
+# MPEG audio Layer III frame header tables
+_BITRATES = {
+    3: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],  # MPEG-1
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],      # MPEG-2
+    0: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160]       # MPEG-2.5
+}
+_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+def mp3_frame_length(header: bytes) -> int:
+    """Byte length of the Layer III frame starting with this 4-byte header (0 if not a frame)."""
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return 0
+    version = (header[1] >> 3) & 3
+    layer = (header[1] >> 1) & 3
+    bitrate_index = header[2] >> 4
+    sample_rate_index = (header[2] >> 2) & 3
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return 0
+    bitrate = _BITRATES[version][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version][sample_rate_index]
+    padding = (header[2] >> 1) & 1
+    return (144 if version == 3 else 72) * bitrate // sample_rate + padding
+
+def timestamp_tag(seconds: float) -> bytes:
+    """ID3v2.4 tag with the segment's 90 kHz start time, which HLS packed audio requires."""
+    payload = TIMESTAMP_OWNER + struct.pack('>Q', int(round(seconds * 90000)) & ((1 << 33) - 1))
+    frame = b'PRIV' + _syncsafe(len(payload)) + b'\0\0' + payload
+    return b'ID3\x04\0\0' + _syncsafe(len(frame)) + frame
+
+def _syncsafe(value: int) -> bytes:
+    return bytes([(value >> 21) & 0x7F, (value >> 14) & 0x7F, (value >> 7) & 0x7F, value & 0x7F])
+
+class HlsStemWriter:
+    """Encodes appended stems and publishes them as aligned HLS segments."""
+
+    def __init__(self, directory: str, stems: List[str], sample_rate: int, channels: int,
+                 segment_seconds: float = SEGMENT_SECONDS, bitrate: int = DEFAULT_BITRATE):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.stems = list(stems)
+        self.sample_rate = sample_rate
+        self.frames = 0
+        self.complete = False
+        self.samples_per_frame = 1152 if sample_rate >= 32000 else 576
+        self.frames_per_segment = max(1, round(segment_seconds * sample_rate / self.samples_per_frame))
+        self.durations = []
+
+        # libsndfile's CBR bitrate is set through the compression level (0: 320 kbps, 1: 32 kbps)
+        level = (320 - bitrate) / (320 - 32)
+        self._encoders = {}
+        self._streams = {}
+        self._pending = {}
+        for stem in self.stems:
+            path = self.directory / f".{stem}.mp3"
+            self._encoders[stem] = sf.SoundFile(str(path), 'w', sample_rate, channels, format='MP3',
+                                                subtype='MPEG_LAYER_III', compression_level=level,
+                                                bitrate_mode='CONSTANT')
+            self._streams[stem] = open(path, 'rb')
+            self._pending[stem] = b''
+        self._frames = {stem: [] for stem in self.stems}
+        self._tag_skipped = {stem: False for stem in self.stems}
+        self._write_playlists()
+
+    @property
+    def segment_seconds(self) -> float:
+        return self.frames_per_segment * self.samples_per_frame / self.sample_rate
+
+    def append(self, sources):
+        """Encode (stems, channels, time) sources and publish every segment now complete."""
+        if hasattr(sources, "detach"):
+            sources = sources.detach().cpu().numpy()
+        for index, stem in enumerate(self.stems):
+            self._encoders[stem].write(np.ascontiguousarray(sources[index].T, dtype=np.float32))
+        self.frames += sources.shape[-1]
+        self._publish()
+
+    def append_from_files(self, stem_paths: Dict[str, str], end_frame: Optional[int] = None):
+        """Encode frames written to the stem WAV files since the last call, up to end_frame."""
+        audio = []
+        for stem in self.stems:
+            with sf.SoundFile(stem_paths[stem]) as f:
+                end = f.frames if end_frame is None else min(end_frame, f.frames)
+                f.seek(min(self.frames, end))
+                audio.append(f.read(end - self.frames, dtype='float32', always_2d=True).T)
+        length = min(a.shape[1] for a in audio)
+        if length > 0:
+            self.append(np.stack([a[:, :length] for a in audio]))
+
+    def _mp3_frames(self, stem: str) -> List[bytes]:
+        """Complete MP3 frames the encoder has emitted for a stem since the last call."""
+        data = self._pending[stem] + self._streams[stem].read()
+        frames = []
+        position = 0
+        while position + 4 <= len(data):
+            length = mp3_frame_length(data[position:position + 4])
+            if length == 0:
+                raise ValueError(f"Lost MP3 frame sync in stem {stem}")
+            if position + length > len(data):
+                break
+            frames.append(data[position:position + length])
+            position += length
+        self._pending[stem] = data[position:]
+        # The first frame is the encoder's placeholder for its Info tag, not audio
+        if frames and not self._tag_skipped[stem]:
+            frames = frames[1:]
+            self._tag_skipped[stem] = True
+        return frames
+
+    def _publish(self, final: bool = False):
+        for stem in self.stems:
+            self._frames[stem].extend(self._mp3_frames(stem))
+        available = min(len(self._frames[stem]) for stem in self.stems)
+        while available >= self.frames_per_segment or (final and available > 0):
+            count = min(available, self.frames_per_segment)
+            index = len(self.durations)
+            start = index * self.segment_seconds
+            for stem in self.stems:
+                frames = self._frames[stem]
+                segment = timestamp_tag(start) + b''.join(frames[:count])
+                del frames[:count]
+                self._write(self.directory / self.segment_name(stem, index), segment)
+            self.durations.append(count * self.samples_per_frame / self.sample_rate)
+            available -= count
+        self._write_playlists()
+
+    def close(self):
+        """Flush the encoders, publish the last segment and end the playlists."""
+        if self.complete:
+            return
+        for stem in self.stems:
+            self._encoders[stem].close()
+        self.complete = True
+        self._publish(final=True)
+        for stem in self.stems:
+            self._streams[stem].close()
+            (self.directory / f".{stem}.mp3").unlink(missing_ok=True)
+
+    def abort(self):
+        """Stop encoding without publishing more segments (the caller removes the directory)."""
+        for stem in self.stems:
+            self._encoders[stem].close()
+            self._streams[stem].close()
+        self.complete = True
+
+    @staticmethod
+    def segment_name(stem: str, index: int) -> str:
+        return f"{stem}_{index:05d}.mp3"
+
+    def _write(self, path: Path, data):
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with open(tmp_path, 'wb' if isinstance(data, bytes) else 'w') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _write_playlists(self):
+        target = math.ceil(max(self.durations, default=self.segment_seconds))
+        for stem in self.stems:
+            lines = ["#EXTM3U", "#EXT-X-VERSION:3", f"#EXT-X-TARGETDURATION:{target}",
+                     "#EXT-X-MEDIA-SEQUENCE:0", "#EXT-X-PLAYLIST-TYPE:EVENT"]
+            for index, duration in enumerate(self.durations):
+                lines += [f"#EXTINF:{duration:.5f},", self.segment_name(stem, index)]
+            if self.complete:
+                lines.append("#EXT-X-ENDLIST")
+            self._write(self.directory / f"{stem}.m3u8", "\n".join(lines) + "\n")
+        self._write(self.directory / MANIFEST_NAME, json.dumps(self.manifest(), indent=2))
+
+    def manifest(self) -> Dict:
+        return {
+            "stems": {stem: f"{stem}.m3u8" for stem in self.stems},
+            "segment_seconds": self.segment_seconds,
+            "segments": len(self.durations),
+            "available_seconds": sum(self.durations),
+            "complete": self.complete
+        }
+
+def segment_stems(stem_paths: Dict[str, str], directory: str, segment_seconds: float = SEGMENT_SECONDS,
+                  bitrate: int = DEFAULT_BITRATE) -> Dict:
+    """Publish finished stem files as HLS segments in one go; returns the manifest."""
+    first = sf.info(next(iter(stem_paths.values())))
+    writer = HlsStemWriter(directory, list(stem_paths), first.samplerate, first.channels,
+                           segment_seconds, bitrate)
+    block = int(30 * first.samplerate)
+    for end_frame in range(block, first.frames + block, block):
+        writer.append_from_files(stem_paths, end_frame)
+    writer.close()
+    return writer.manifest()
+
+def read_manifest(directory: str) -> Optional[Dict]:
+    """Manifest of a stream directory, or None before the first segment is published."""
+    path = Path(directory) / MANIFEST_NAME
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
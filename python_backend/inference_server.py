@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Dedicated inference process for Song Splitter.
+In production the HTTP front end runs as several lightweight worker processes
+(see serve.py) that never load a model. This process owns the model, the job
+table and the separation threads; HTTP workers reach it over a local socket
+(multiprocessing.connection, authenticated with a shared key):
+
+    HTTP worker  --(job table reads/writes, submit)-->  inference process
+
+Uploads and downloads are handled entirely by the HTTP workers straight from
+the shared upload/output folders, so slow clients never occupy the inference
+process.
+"""
+
+import os
+import sys
+import argparse
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from typing import Any, Dict, Optional
+
+DEFAULT_ADDRESS = "./inference.sock"
+AUTHKEY_ENV = "SONG_SPLITTER_INFERENCE_AUTHKEY"
+# Job fields the HTTP routes read; the rest (fingerprint arrays, file paths,
+# scheduling details) stay in the inference process
+HTTP_JOB_FIELDS = (
+    'status', 'progress', 'filename', 'duration_seconds', 'quality', 'priority',
+    'queue_wait_seconds', 'stems', 'quality_metrics', 'separation_stats',
+    'available_seconds', 'deduplicated_from', 'stem_store', 'pack', 'stream',
+    'deadline', 'error'
+)
+
+def parse_address(address: str):
+    """"host:port" for TCP on localhost, anything else is a Unix socket path."""
+    host, _, port = address.rpartition(':')
+    if host and port.isdigit():
+        return host, int(port)
+    return address
+
+def authkey_from_env() -> bytes:
+    key = os.environ.get(AUTHKEY_ENV)
+    if not key:
+        raise RuntimeError(f"{AUTHKEY_ENV} must be set to share the inference socket")
+    return key.encode()
+
+def http_fields(job: Dict) -> Dict:
+    """The part of a job the HTTP workers need, without the heavy internal fields."""
+    return {key: job[key] for key in HTTP_JOB_FIELDS if key in job}
+
+class InferenceServer:
+    """Serves the job table and job submission of the in-process API to HTTP workers."""
+
+    def __init__(self, address: str = DEFAULT_ADDRESS, authkey: Optional[bytes] = None):
+        import flask_api
+        self.api = flask_api
+        self.address = parse_address(address)
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.remove(self.address)
+        self.listener = Listener(self.address, authkey=authkey or authkey_from_env())
+        self._submit_lock = threading.Lock()
+
+    def serve_forever(self):
+        """Accept HTTP worker connections, one thread per connection."""
+        print(f"🤖 Inference process listening on {self.address}")
+        while True:
+            try:
+                conn = self.listener.accept()
+            except (OSError, EOFError, AuthenticationError) as e:
+                # e.g. a client with the wrong key, or a bare port probe
+                print(f"⚠️ Rejected inference connection: {e}")
+                continue
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        with conn:
+            while True:
+                try:
+                    method, args = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    reply = ('ok', getattr(self, f"rpc_{method}")(*args))
+                except Exception as e:
+                    reply = ('error', f"{type(e).__name__}: {e}")
+                conn.send(reply)
+
+    # Calls available to HTTP workers
+
+    def rpc_get_job(self, job_id: str) -> Optional[Dict]:
+        job = self.api.processing_jobs.get(job_id)
+        return http_fields(job) if job is not None else None
+
+    def rpc_set_job(self, job_id: str, job: Dict):
+        self.api.processing_jobs[job_id] = job
+
+    def rpc_update_job(self, job_id: str, fields: Dict):
+        self.api.processing_jobs[job_id].update(fields)
+
+    def rpc_list_jobs(self) -> Dict[str, Dict]:
+        return {job_id: http_fields(job) for job_id, job in list(self.api.processing_jobs.items())}
+
+    def rpc_submit(self, job_id: str, options: Dict):
+        # Two HTTP workers may race to start the same job; only the first wins
+        with self._submit_lock:
+            job = self.api.processing_jobs[job_id]
+            if job['status'] != 'uploaded':
+                raise ValueError("Job already processed or in progress")
+            job['status'] = 'queued'
+        try:
+            self.api.submit_job(job_id, **options)
+        except Exception:
+            # Let the job be started again rather than leave it queued forever
+            job['status'] = 'uploaded'
+            raise
+
+    def rpc_cancel(self, job_id: str) -> Dict:
+        return self.api.cancel_job(job_id)
+
+    def rpc_queue_info(self, job_id: str) -> Dict:
+        return self.api.queue_info(job_id)
+
+    def rpc_predicted_wait(self, quality: str, priority: str, duration: float) -> float:
+        return self.api.predicted_wait(quality, priority, duration)
+
+    def rpc_health(self) -> Dict:
+        return self.api.health_info()
+
+    def rpc_readiness(self) -> Dict:
+        return self.api.readiness_info()
+
+class InferenceClient:
+    """Connection from an HTTP worker to the inference process (one socket per thread)."""
+
+    def __init__(self, address: str = DEFAULT_ADDRESS, authkey: Optional[bytes] = None):
+        self.address = parse_address(address)
+        self.authkey = authkey or authkey_from_env()
+        self._local = threading.local()
+
+    def call(self, method: str, *args) -> Any:
+        """Run a call in the inference process, reconnecting once if the socket dropped."""
+        for attempt in range(2):
+            conn = getattr(self._local, 'conn', None)
+            try:
+                if conn is None:
+                    conn = self._local.conn = Client(self.address, authkey=self.authkey)
+                conn.send((method, args))
+                status, result = conn.recv()
+                break
+            except (EOFError, OSError):
+                self._local.conn = None
+                if attempt:
+                    raise
+        if status == 'error':
+            raise RuntimeError(f"Inference process: {result}")
+        return result
+
+class RemoteJob(dict):
+    """Snapshot of a job in the inference process; writes are forwarded to it."""
+
+    def __init__(self, client: InferenceClient, job_id: str, data: Dict):
+        super().__init__(data)
+        self._client = client
+        self._job_id = job_id
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._client.call('update_job', self._job_id, {key: value})
+
+    def update(self, fields=(), **kwargs):
+        fields = dict(fields, **kwargs)
+        super().update(fields)
+        self._client.call('update_job', self._job_id, fields)
+
+class RemoteJobTable:
+    """Stands in for the processing_jobs dict inside HTTP workers."""
+
+    def __init__(self, client: InferenceClient):
+        self._client = client
+
+    def __contains__(self, job_id) -> bool:
+        return self._client.call('get_job', job_id) is not None
+
+    def __getitem__(self, job_id) -> RemoteJob:
+        job = self._client.call('get_job', job_id)
+        if job is None:
+            raise KeyError(job_id)
+        return RemoteJob(self._client, job_id, job)
+
+    def get(self, job_id, default=None):
+        job = self._client.call('get_job', job_id)
+        return RemoteJob(self._client, job_id, job) if job is not None else default
+
+    def __setitem__(self, job_id, job: Dict):
+        self._client.call('set_job', job_id, dict(job))
+
+    def items(self):
+        return [(job_id, RemoteJob(self._client, job_id, job))
+                for job_id, job in self._client.call('list_jobs').items()]
+
+def main():
+    parser = argparse.ArgumentParser(description="Song Splitter inference process")
+    parser.add_argument("--address", default=os.environ.get("SONG_SPLITTER_INFERENCE_ADDRESS", DEFAULT_ADDRESS),
+                       help="Unix socket path or host:port to listen on")
+    parser.add_argument("--no-preload", action="store_true", help="Load the model on first use")
+    args = parser.parse_args()
+
+    # This process must run the API in local mode, whatever the environment says
+    os.environ.pop("SONG_SPLITTER_INFERENCE_ADDRESS", None)
+    if args.no_preload:
+        os.environ["SONG_SPLITTER_WARMUP_SECONDS"] = "0"
+    # Listens right away; the model warms up in the background (see /api/health/ready)
+    import flask_api
+    server = InferenceServer(args.address)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        sys.exit(0)
+
+if __name__ == "__main__":
+    main()
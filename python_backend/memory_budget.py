@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Memory-aware concurrency for Song Splitter.
+A separation worker costs a fixed amount (interpreter, torch, the model) plus
+a working set that grows with the length of the audio it holds (waveform,
+separated sources, Demucs buffers). Both are measured once per model, backend
+and tier in a clean subprocess and cached:
+
+    worker bytes = process_bytes + model_bytes
+    job bytes    = fixed_bytes + per_second_bytes * audio seconds
+
+plan_workers() turns a RAM budget into a worker count and the longest audio
+chunk one job may hold; MemoryGate makes concurrently running jobs reserve
+their working set, so a long file holds back others instead of overcommitting.
+"""
+
+import os
+import sys
+import json
+import time
+import resource
+import threading
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+GB = 1024 ** 3
+PROFILE_CACHE = Path(os.environ.get("SONG_SPLITTER_CACHE", Path.home() / ".cache" / "song_splitter")) / "memory_profiles.json"
+PROBE_SECONDS = (10.0, 30.0)
+# Share of available memory used when no budget is configured
+DEFAULT_BUDGET_FRACTION = 0.8
+# Never cut a file into chunks shorter than this
+MIN_CHUNK_SECONDS = 30.0
+
+def available_memory() -> int:
+    """Bytes of memory available for new work (MemAvailable on Linux)."""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_AVPHYS_PAGES")
+
+def default_budget() -> int:
+    """RAM budget: SONG_SPLITTER_MEMORY_BUDGET (GB) or most of what is available."""
+    configured = os.environ.get("SONG_SPLITTER_MEMORY_BUDGET")
+    if configured:
+        return int(float(configured) * GB)
+    return int(available_memory() * DEFAULT_BUDGET_FRACTION)
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return peak_rss()
+
+def peak_rss() -> int:
+    """Peak resident set size of this process in bytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def _measure(model_name: str, backends: Optional[Dict[str, str]], quality: str,
+             probe_seconds: Tuple[float, float]) -> Dict:
+    """Measure footprints in a fresh process (run through a spawn pool)."""
+    import torch
+    from song_splitter import SongSplitter, QUALITY_TIERS, tier_model
+    from cpu_backend import probe_mix
+
+    process_bytes = current_rss()
+    splitter = SongSplitter(model_name=model_name, backends=backends)
+    splitter.device = "cpu"
+    tier = QUALITY_TIERS[quality]
+    model = splitter.load_model(tier_model(tier, model_name))
+    # Snapshots are memory-mapped, so most weights are not resident yet after
+    # loading: the weights themselves are a floor for what each worker ends up holding
+    weight_bytes = sum(t.numel() * t.element_size()
+                       for t in list(model.parameters()) + list(model.buffers()))
+    model_bytes = max(current_rss() - process_bytes, weight_bytes)
+
+    peaks = []
+    for seconds in probe_seconds:
+        mix = probe_mix(model.samplerate, seconds)
+        sources = splitter._apply_tier(model, mix, tier)
+        peaks.append(peak_rss())
+        del mix, sources
+    loaded = process_bytes + model_bytes
+    short, long = probe_seconds
+    per_second = max(0.0, (peaks[1] - peaks[0]) / (long - short))
+    # Lower bound: the mix plus every separated source, as float32
+    per_second = max(per_second, 4.0 * 2 * (1 + len(model.sources)) * model.samplerate)
+    fixed = max(0.0, peaks[0] - loaded - per_second * short)
+    return {
+        "process_bytes": process_bytes,
+        "model_bytes": model_bytes,
+        "weight_bytes": weight_bytes,
+        "fixed_bytes": fixed,
+        "per_second_bytes": per_second,
+        "torch": torch.__version__,
+        "measured_at": time.time()
+    }
+
+def _profile_key(model_name: str, backends: Optional[Dict[str, str]], quality: str) -> str:
+    backend = (backends or {}).get(model_name, (backends or {}).get("*", "eager"))
+    return f"{model_name}/{backend}/{quality}"
+
+def memory_profile(model_name: str = "htdemucs", backends: Optional[Dict[str, str]] = None,
+                   quality: str = "standard", refresh: bool = False) -> Dict:
+    """Cached footprint of a model/backend/tier, measured on first use."""
+    key = _profile_key(model_name, backends, quality)
+    cache = {}
+    if PROFILE_CACHE.exists():
+        try:
+            cache = json.loads(PROFILE_CACHE.read_text())
+        except ValueError:
+            cache = {}
+    # Profiles without weight_bytes predate the resident-weights floor
+    if key in cache and "weight_bytes" in cache[key] and not refresh:
+        return cache[key]
+
+    print(f"📏 Measuring memory footprint of {key}...")
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        profile = executor.submit(_measure, model_name, backends, quality, PROBE_SECONDS).result()
+    print(f"📏 Model {profile['model_bytes'] / GB:.2f} GB per worker, "
+          f"{profile['per_second_bytes'] / 1024 ** 2:.1f} MB per second of audio")
+
+    cache[key] = profile
+    PROFILE_CACHE.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = PROFILE_CACHE.with_suffix(f".{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(cache, indent=2))
+    os.replace(tmp_path, PROFILE_CACHE)
+    return profile
+
+def job_bytes(profile: Dict, seconds: float) -> int:
+    """Working set of one job holding this many seconds of audio."""
+    return int(profile["fixed_bytes"] + profile["per_second_bytes"] * seconds)
+
+def plan_workers(profile: Dict, budget: int, durations: List[float], max_workers: int,
+                 shared_model: bool = False) -> Tuple[int, float]:
+    """
+    Choose a worker count and a chunk length that fit the budget.
+
+    Workers are sized for a typical (median) input; the chunk length is the
+    longest audio one job may hold when it has the job memory to itself, so
+    longer files are separated in pieces instead of overflowing. With
+    shared_model (threads in one process), the model is counted once.
+
+    Returns:
+        (workers, max_chunk_seconds)
+    """
+    durations = sorted(d for d in durations if d > 0) or [240.0]
+    typical = durations[len(durations) // 2]
+    worker_bytes = profile["process_bytes"] + profile["model_bytes"]
+
+    workers = 1
+    for count in range(max(1, max_workers), 0, -1):
+        fixed = worker_bytes if shared_model else worker_bytes * count
+        if fixed + count * job_bytes(profile, typical) <= budget:
+            workers = count
+            break
+
+    fixed = worker_bytes if shared_model else worker_bytes * workers
+    job_memory = max(0, budget - fixed)
+    chunk = (job_memory - profile["fixed_bytes"]) / profile["per_second_bytes"]
+    return workers, max(MIN_CHUNK_SECONDS, chunk)
+
+class MemoryGate:
+    """Budget of job memory that running jobs reserve from and give back to."""
+
+    def __init__(self, capacity: int, condition=None, reserved=None):
+        # Pass a multiprocessing Condition/Value to share one gate between processes
+        self.capacity = capacity
+        self._condition = condition or threading.Condition()
+        self._reserved = reserved
+        self._local_reserved = 0
+
+    @classmethod
+    def for_processes(cls, capacity: int, context=None) -> "MemoryGate":
+        context = context or multiprocessing
+        return cls(capacity, context.Condition(), context.Value('d', 0.0, lock=False))
+
+    def _get(self) -> float:
+        return self._reserved.value if self._reserved is not None else self._local_reserved
+
+    def _set(self, value: float):
+        if self._reserved is not None:
+            self._reserved.value = value
+        else:
+            self._local_reserved = value
+
+    def try_reserve(self, amount: int) -> bool:
+        """Reserve without waiting; a job that is alone always gets in."""
+        with self._condition:
+            reserved = self._get()
+            if reserved > 0 and reserved + amount > self.capacity:
+                return False
+            self._set(reserved + amount)
+            return True
+
+    def reserve(self, amount: int):
+        """Wait until amount fits next to the jobs already running."""
+        with self._condition:
+            while True:
+                reserved = self._get()
+                if reserved <= 0 or reserved + amount <= self.capacity:
+                    self._set(reserved + amount)
+                    return
+                self._condition.wait(timeout=5.0)
+
+    def release(self, amount: int):
+        with self._condition:
+            self._set(max(0.0, self._get() - amount))
+            self._condition.notify_all()
+
+    def reserved(self) -> float:
+        with self._condition:
+            return self._get()
+
+    def __getstate__(self):
+        if self._reserved is None:
+            raise TypeError("Only process-shared gates (MemoryGate.for_processes) can be pickled")
+        return {"capacity": self.capacity, "_condition": self._condition,
+                "_reserved": self._reserved, "_local_reserved": 0}
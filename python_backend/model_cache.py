@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Local model snapshots for fast cold starts.
+demucs.pretrained.get_model resolves, deserializes and rebuilds a model on every
+start, and the CPU backends then re-optimize and re-verify it. The first process
+on a host saves the prepared model whole (torch.save) under a key of model,
+backend, device and library versions; later processes torch.load it with
+mmap=True, so weights are paged in from the file on demand and sibling workers
+share the same read-only pages.
+
+    python model_cache.py htdemucs htdemucs_ft --backend quantized   # build ahead
+"""
+
+import os
+import json
+import time
+import fcntl
+import hashlib
+import argparse
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Tuple
+
+DEFAULT_CACHE_DIR = Path(os.environ.get("SONG_SPLITTER_CACHE", Path.home() / ".cache" / "song_splitter")) / "models"
+
+def _versions() -> Dict[str, str]:
+    import torch
+    import demucs
+    return {"torch": torch.__version__, "demucs": getattr(demucs, "__version__", "unknown")}
+
+@contextmanager
+def _build_lock(path: Path):
+    """Only one process on the host builds a snapshot; the others wait and load it."""
+    with open(f"{path}.lock", 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+class ModelCache:
+    """Directory of prepared model snapshots."""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR):
+        self.directory = Path(directory)
+
+    @classmethod
+    def from_env(cls) -> Optional["ModelCache"]:
+        """Cache at SONG_SPLITTER_MODEL_CACHE (default under ~/.cache; "0" disables)."""
+        directory = os.environ.get("SONG_SPLITTER_MODEL_CACHE", str(DEFAULT_CACHE_DIR))
+        return None if directory == "0" else cls(directory)
+
+    def snapshot_path(self, model_name: str, backend: str, device: str) -> Path:
+        key = json.dumps({"model": model_name, "backend": backend, "device": device, **_versions()},
+                         sort_keys=True)
+        digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+        return self.directory / f"{model_name}-{backend}-{device}-{digest}.pt"
+
+    def _read(self, path: Path, device: str):
+        """Load a snapshot with memory-mapped weights (plain load on older torch)."""
+        import torch
+        try:
+            return torch.load(path, map_location=device, mmap=True, weights_only=False)
+        except TypeError:
+            return torch.load(path, map_location=device)
+
+    def _write(self, path: Path, model, metadata: Dict):
+        import torch
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            torch.save(model, tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+        # Written last: a snapshot without metadata is never used
+        path.with_suffix(".json").write_text(json.dumps(metadata, indent=2))
+
+    def load(self, model_name: str, backend: str, device: str,
+             fetch: Callable[[], object],
+             prepare: Callable[[object], Tuple[object, Dict]]) -> Tuple[object, Dict]:
+        """
+        The prepared model for (model, backend, device), from its snapshot if
+        there is one. Otherwise fetch() builds the eager model, prepare() applies
+        the backend, and the result is saved. Backends whose models cannot be
+        pickled (e.g. compiled forwards) snapshot the eager model and are
+        re-applied on load.
+
+        Returns:
+            Tuple of (model, backend report)
+        """
+        path = self.snapshot_path(model_name, backend, device)
+        metadata_path = path.with_suffix(".json")
+        try:
+            if not metadata_path.exists():
+                self.directory.mkdir(parents=True, exist_ok=True)
+                with _build_lock(path):
+                    if not metadata_path.exists():
+                        return self._build(path, model_name, backend, device, fetch, prepare)
+
+            start = time.time()
+            metadata = json.loads(metadata_path.read_text())
+            model = self._read(path, device)
+        except OSError as e:
+            # Read-only or full cache directory: load the model the slow way
+            print(f"Model cache unavailable ({e}); loading {model_name} without it")
+            return prepare(fetch())
+        print(f"Loaded {model_name} snapshot in {time.time() - start:.2f}s")
+        if metadata["prepared"]:
+            return model, metadata["report"]
+        return prepare(model)
+
+    def _build(self, path: Path, model_name: str, backend: str, device: str, fetch, prepare):
+        """Build the prepared model and snapshot it; a snapshot that cannot be written is skipped."""
+        # prepare() optimizes a copy, so the eager model stays usable for the fallback snapshot
+        eager = fetch()
+        model, report = prepare(eager)
+        metadata = {"model": model_name, "backend": backend, "device": device, "report": report,
+                    "prepared": True, "created_at": time.time(), **_versions()}
+        try:
+            try:
+                self._write(path, model, metadata)
+            except (OSError, MemoryError):
+                raise
+            except Exception as e:
+                print(f"Snapshotting the {backend} model failed ({e}); caching the eager model")
+                metadata["prepared"] = False
+                self._write(path, eager, metadata)
+        except OSError as e:
+            print(f"Could not save the {model_name} snapshot ({e}); continuing without it")
+            return model, report
+        print(f"Saved {model_name} snapshot: {path}")
+        return model, report
+
+    def clear(self) -> int:
+        """
+        Delete every snapshot; returns the number removed. Lock files stay: a
+        process may be waiting on one, and a new file at the same path would
+        let a second process build at the same time.
+        """
+        removed = 0
+        for path in self.directory.glob("*.pt"):
+            path.unlink()
+            path.with_suffix(".json").unlink(missing_ok=True)
+            removed += 1
+        return removed
+
+    def entries(self):
+        """Metadata and size of every snapshot."""
+        for metadata_path in sorted(self.directory.glob("*.json")):
+            metadata = json.loads(metadata_path.read_text())
+            snapshot = metadata_path.with_suffix(".pt")
+            yield {**metadata, "path": str(snapshot),
+                   "size_bytes": snapshot.stat().st_size if snapshot.exists() else 0}
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect Song Splitter model snapshots")
+    parser.add_argument("models", nargs="*", help="Models to snapshot (e.g. htdemucs htdemucs_ft)")
+    parser.add_argument("--backend", "-b", default=None,
+                       help="CPU backend, optionally per model (e.g. quantized or htdemucs=quantized)")
+    parser.add_argument("--cache-dir", default=os.environ.get("SONG_SPLITTER_MODEL_CACHE", str(DEFAULT_CACHE_DIR)),
+                       help="Snapshot directory")
+    parser.add_argument("--list", action="store_true", help="List snapshots")
+    parser.add_argument("--clear", action="store_true", help="Delete all snapshots")
+    args = parser.parse_args()
+
+    cache = ModelCache(args.cache_dir)
+    if args.clear:
+        print(f"Removed {cache.clear()} snapshots")
+    if args.models:
+        from song_splitter import SongSplitter
+        from cpu_backend import parse_backend_spec
+        splitter = SongSplitter(model_name=args.models[0], backends=parse_backend_spec(args.backend),
+                                model_cache=cache)
+        for model_name in args.models:
+            splitter.load_model(model_name)
+    if args.list or not (args.models or args.clear):
+        for entry in cache.entries():
+            print(f"{entry['model']:<14}{entry['backend']:<15}{entry['device']:<6}"
+                  f"{entry['size_bytes'] / 1024 ** 2:8.1f} MB  torch {entry['torch']}  {entry['path']}")
+
+if __name__ == "__main__":
+    main()
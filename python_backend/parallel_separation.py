@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Intra-track parallel separation for Song Splitter.
+ParallelSeparator splits one track into fixed, overlapping segments, separates
+them in a pool of worker processes (each pinned to its own set of cores, see
+cpu_affinity.py) and stitches the results back together with linear crossfades.
+BagSeparator evaluates the members of a bagged model (e.g. htdemucs_ft) at
+the same time, one member per process, and combines them like apply_model.
+
+Segment boundaries depend only on the track length and the segment settings,
+random shifts are seeded by segment (or member) index, and results are summed
+in index order, so the output is bit-for-bit identical from run to run no
+matter which worker finishes first.
+
+Audio and separated sources travel through shared memory (shared_tensors.py):
+workers map the whole track and write their sources into segments allocated
+by the parent, so only small handles are pickled.
+"""
+
+import random
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
+
+from cpu_affinity import core_slots, pin_from_slots, pin_to_cores, split_cores
+from shared_tensors import SharedTensor
+
+DEFAULT_SEGMENT_SECONDS = 30.0
+DEFAULT_OVERLAP_SECONDS = 3.0
+
+# Per-process state of a pool worker
+_worker_splitter = None
+_worker_member = None
+
+def plan_segments(total_frames: int, segment_frames: int, overlap_frames: int) -> List[Tuple[int, int]]:
+    """Fixed [start, end) segment boundaries; neighbours share overlap_frames."""
+    overlap_frames = min(overlap_frames, segment_frames // 2)
+    stride = segment_frames - overlap_frames
+    segments = []
+    start = 0
+    while True:
+        end = min(total_frames, start + segment_frames)
+        segments.append((start, end))
+        if end >= total_frames:
+            return segments
+        start += stride
+
+def crossfade_weights(length: int, fade_in: int, fade_out: int) -> np.ndarray:
+    """Linear ramps over the overlaps; complementary ramps sum to one."""
+    weights = np.ones(length, dtype=np.float32)
+    if fade_in:
+        weights[:fade_in] = (np.arange(fade_in, dtype=np.float32) + 0.5) / fade_in
+    if fade_out:
+        weights[length - fade_out:] = 1.0 - (np.arange(fade_out, dtype=np.float32) + 0.5) / fade_out
+    return weights
+
+def _init_worker(model_name: str, backends: Optional[Dict[str, str]], cores: Optional[List[int]]):
+    """Pin to this worker's cores (thread budget included) and build a CPU splitter."""
+    global _worker_splitter
+    if cores:
+        pin_to_cores(cores)
+
+    from song_splitter import SongSplitter
+    _worker_splitter = SongSplitter(model_name=model_name, backends=backends)
+    _worker_splitter.device = "cpu"
+
+def _init_pool_worker(slots, model_name: str, backends: Optional[Dict[str, str]]):
+    """Pool initializer: take a core set from the shared slots, then set up."""
+    pin_from_slots(slots)
+    _init_worker(model_name, backends, None)
+
+def _separate_segment(index: int, model_name: Optional[str], tier: Dict, audio: SharedTensor,
+                      start: int, end: int, output: SharedTensor):
+    """Separate frames [start, end) of the shared (channels, time) track into output."""
+    model = _worker_splitter.load_model(model_name)
+    # apply_model draws its shift offsets from `random`
+    random.seed(index)
+    torch.manual_seed(index)
+    try:
+        sources = _worker_splitter._apply_tier(model, audio.tensor()[:, start:end], tier)
+        output.array()[...] = sources.numpy()
+    finally:
+        audio.close()
+        output.close()
+
+def _init_member_worker(model_name: str, backends: Optional[Dict[str, str]],
+                        member_index: int, cores: List[int]):
+    """Initializer for a bag worker: keep only one member of the bag in memory."""
+    global _worker_splitter, _worker_member
+    _init_worker(model_name, backends, cores)
+    bag = _worker_splitter.load_model()
+    _worker_member = bag.models[member_index]
+    _worker_splitter.models.clear()
+    _worker_splitter.model = None
+
+def _separate_member(member_index: int, tier: Dict, audio: SharedTensor, output: SharedTensor):
+    """Separate the whole shared (channels, time) mix with this worker's bag member."""
+    random.seed(member_index)
+    torch.manual_seed(member_index)
+    try:
+        sources = _worker_splitter._apply_tier(_worker_member, audio.tensor(), tier)
+        output.array()[...] = sources.numpy()
+    finally:
+        audio.close()
+        output.close()
+
+class ParallelSeparator:
+    """A warm pool of separation workers for splitting one track across cores."""
+
+    def __init__(self, model_name: str, backends: Optional[Dict[str, str]] = None,
+                 workers: int = 2, segment_seconds: float = DEFAULT_SEGMENT_SECONDS,
+                 overlap_seconds: float = DEFAULT_OVERLAP_SECONDS):
+        self.workers = workers
+        self.threads_per_worker = min(len(cores) for cores in split_cores(workers))
+        self.segment_seconds = segment_seconds
+        self.overlap_seconds = overlap_seconds
+        # spawn, not fork: forking after torch has started its thread pools can deadlock
+        context = multiprocessing.get_context("spawn")
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_pool_worker,
+            initargs=(core_slots(workers, context), model_name, backends)
+        )
+
+    def separate(self, waveform: torch.Tensor, samplerate: int, num_sources: int,
+                 tier: Dict, model_name: Optional[str] = None) -> torch.Tensor:
+        """
+        Separate a (channels, time) waveform across the pool.
+
+        Returns:
+            Tensor of shape (sources, channels, time)
+        """
+        channels, total_frames = waveform.shape
+        segment_frames = int(self.segment_seconds * samplerate)
+        overlap_frames = int(self.overlap_seconds * samplerate)
+        segments = plan_segments(total_frames, segment_frames, overlap_frames)
+
+        audio = SharedTensor.from_array(waveform.float())
+        results = [SharedTensor.empty((num_sources, channels, end - start)) for start, end in segments]
+        try:
+            futures = [
+                self._executor.submit(_separate_segment, index, model_name, tier, audio, start, end, result)
+                for index, ((start, end), result) in enumerate(zip(segments, results))
+            ]
+
+            output = np.zeros((num_sources, channels, total_frames), dtype=np.float32)
+            # Accumulate strictly in segment order so float sums are reproducible
+            for index, ((start, end), future) in enumerate(zip(segments, futures)):
+                future.result()
+                fade_in = segments[index - 1][1] - start if index > 0 else 0
+                fade_out = end - segments[index + 1][0] if index + 1 < len(segments) else 0
+                output[..., start:end] += results[index].array() * crossfade_weights(end - start, fade_in, fade_out)
+        finally:
+            for shared in [audio] + results:
+                shared.release()
+
+        return torch.from_numpy(output)
+
+    def shutdown(self):
+        self._executor.shutdown()
+
+class BagSeparator:
+    """Evaluates the members of a bagged model concurrently, one process per member."""
+
+    def __init__(self, model_name: str, bag, backends: Optional[Dict[str, str]] = None):
+        self.weights = [list(weights) for weights in bag.weights]
+        members = len(bag.models)
+        core_sets = split_cores(members)
+        self.threads_per_member = min(len(cores) for cores in core_sets)
+        context = multiprocessing.get_context("spawn")
+        # One single-process executor per member pins each member to its own process and cores
+        self._executors = [
+            ProcessPoolExecutor(max_workers=1, mp_context=context,
+                                initializer=_init_member_worker,
+                                initargs=(model_name, backends, index, core_sets[index]))
+            for index in range(members)
+        ]
+
+    def separate(self, waveform: torch.Tensor, tier: Dict) -> torch.Tensor:
+        """
+        Separate a (channels, time) waveform with every member and combine them.
+
+        Returns:
+            Tensor of shape (sources, channels, time)
+        """
+        num_sources = len(self.weights[0])
+        audio = SharedTensor.from_array(waveform.float())
+        results = [SharedTensor.empty((num_sources,) + tuple(waveform.shape)) for _ in self._executors]
+        try:
+            futures = [executor.submit(_separate_member, index, tier, audio, result)
+                       for index, (executor, result) in enumerate(zip(self._executors, results))]
+
+            # Same weighted average as demucs.apply.apply_model, in member order
+            estimates = None
+            totals = [0.0] * num_sources
+            for future, result, member_weights in zip(futures, results, self.weights):
+                future.result()
+                out = result.array()
+                for k, weight in enumerate(member_weights):
+                    out[k] *= weight
+                    totals[k] += weight
+                estimates = out.copy() if estimates is None else estimates + out
+                del out
+        finally:
+            for shared in [audio] + results:
+                shared.release()
+        for k, total in enumerate(totals):
+            estimates[k] /= total
+        return torch.from_numpy(estimates)
+
+    def shutdown(self):
+        for executor in self._executors:
+            executor.shutdown()
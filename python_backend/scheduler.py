@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Job scheduler for the Song Splitter API.
+Separation jobs wait in priority classes and start only when a slot frees up:
+
+    interactive   a user is waiting on the result (default)
+    preview       quick looks: excerpts, preview tier
+    batch         bulk uploads such as whole albums
+
+Higher classes always go first. Within a class the job with the smallest
+expected separation time starts first (shortest-expected-job-first), and no
+client may run more than its quota of jobs at once, so one client's album
+cannot hold every slot while others wait.
+
+Expected times (from cost_model.py) also give every job an ETA and let the
+API predict how long a new job would wait before admitting it. With a
+memory gate (memory_budget.py), a job also needs its working set to fit next
+to the running ones; a long file then waits for memory instead of starting.
+"""
+
+import math
+import time
+import threading
+from collections import deque
+from typing import Callable, Dict, Optional
+
+PRIORITY_CLASSES = ("interactive", "preview", "batch")
+DEFAULT_PRIORITY = "interactive"
+
+def resolve_priority(name: Optional[str]) -> str:
+    """Validate a priority class name (None gives the default class)."""
+    if not name:
+        return DEFAULT_PRIORITY
+    name = name.lower()
+    if name not in PRIORITY_CLASSES:
+        raise ValueError(f"Unknown priority '{name}'. Choose from: {', '.join(PRIORITY_CLASSES)}")
+    return name
+
+class JobScheduler:
+    """Runs submitted jobs on a fixed number of slots in priority order."""
+
+    def __init__(self, max_running: int = 1, client_quota: int = 1, memory=None):
+        self.max_running = max(1, max_running)
+        self.client_quota = max(1, client_quota)
+        self.memory = memory
+        self._lock = threading.Lock()
+        self._waiting: Dict[str, Dict] = {}
+        self._running: Dict[str, Dict] = {}
+        self._sequence = 0
+        # Recent queue waits per class, for the averages shown in job status
+        self._waits = {priority: deque(maxlen=50) for priority in PRIORITY_CLASSES}
+
+    def submit(self, job_id: str, run: Callable[[], None], priority: str = DEFAULT_PRIORITY,
+               client_id: str = "", expected_seconds: float = 0.0, memory_bytes: int = 0):
+        """Queue a job; run() is called on a worker thread once it is scheduled."""
+        with self._lock:
+            self._sequence += 1
+            self._waiting[job_id] = {
+                "run": run,
+                "priority": resolve_priority(priority),
+                "client_id": client_id,
+                "expected_seconds": expected_seconds,
+                "memory_bytes": memory_bytes,
+                "submitted_at": time.time(),
+                "sequence": self._sequence
+            }
+        self._dispatch()
+
+    def cancel(self, job_id: str) -> bool:
+        """Drop a job that has not started yet; False if it is running or unknown."""
+        with self._lock:
+            dropped = self._waiting.pop(job_id, None) is not None
+        # Jobs it held back (e.g. waiting for memory) may fit now
+        self._dispatch()
+        return dropped
+
+    def resize(self, max_running: int):
+        """Change the number of slots, e.g. once memory-based sizing is known."""
+        with self._lock:
+            self.max_running = max(1, max_running)
+        self._dispatch()
+
+    def _order(self, entry: Dict):
+        return (PRIORITY_CLASSES.index(entry["priority"]), entry["expected_seconds"], entry["sequence"])
+
+    def _dispatch(self):
+        """Start waiting jobs while slots and memory are free and their clients are under quota."""
+        started = []
+        with self._lock:
+            for job_id, entry in sorted(self._waiting.items(), key=lambda item: self._order(item[1])):
+                if len(self._running) >= self.max_running:
+                    break
+                running_for_client = sum(1 for other in self._running.values()
+                                         if other["client_id"] == entry["client_id"])
+                if running_for_client >= self.client_quota:
+                    continue
+                if self.memory is not None and not self.memory.try_reserve(entry["memory_bytes"]):
+                    # Hold later jobs back too, so small jobs cannot starve a long one
+                    break
+                del self._waiting[job_id]
+                entry["started_at"] = time.time()
+                entry["queue_wait"] = entry["started_at"] - entry["submitted_at"]
+                self._waits[entry["priority"]].append(entry["queue_wait"])
+                self._running[job_id] = entry
+                started.append((job_id, entry))
+
+        for job_id, entry in started:
+            threading.Thread(target=self._run, args=(job_id, entry), daemon=True).start()
+
+    def _run(self, job_id: str, entry: Dict):
+        try:
+            entry["run"]()
+        finally:
+            with self._lock:
+                self._running.pop(job_id, None)
+            if self.memory is not None:
+                self.memory.release(entry["memory_bytes"])
+            self._dispatch()
+
+    def queue_info(self, job_id: str) -> Dict:
+        """Where a job stands: class, position among waiting jobs and wait so far."""
+        now = time.time()
+        with self._lock:
+            info = {"class_wait_seconds": self._class_waits()}
+            entry = self._waiting.get(job_id)
+            if entry is not None:
+                ahead = sum(1 for other in self._waiting.values() if self._order(other) < self._order(entry))
+                predicted_wait = self._work_ahead(self._order(entry), now)
+                info.update({
+                    "priority": entry["priority"],
+                    "state": "waiting",
+                    "position": ahead + 1,
+                    "wait_seconds": now - entry["submitted_at"],
+                    "predicted_wait_seconds": predicted_wait,
+                    "eta_seconds": predicted_wait + entry["expected_seconds"]
+                })
+                return info
+            entry = self._running.get(job_id)
+            if entry is not None:
+                info.update({
+                    "priority": entry["priority"],
+                    "state": "running",
+                    "wait_seconds": entry["queue_wait"],
+                    "eta_seconds": max(0.0, entry["expected_seconds"] - (now - entry["started_at"]))
+                })
+            return info
+
+    def _work_ahead(self, order, now: float) -> float:
+        """Expected seconds until a job with this order gets a slot (lock held)."""
+        waiting = sum(entry["expected_seconds"] for entry in self._waiting.values()
+                      if self._order(entry) < order)
+        running = sum(max(0.0, entry["expected_seconds"] - (now - entry["started_at"]))
+                      for entry in self._running.values())
+        return (waiting + running) / self.max_running
+
+    def predicted_wait(self, priority: str = DEFAULT_PRIORITY, expected_seconds: float = 0.0) -> float:
+        """How long a job submitted now would wait for a slot."""
+        order = (PRIORITY_CLASSES.index(resolve_priority(priority)), expected_seconds, math.inf)
+        with self._lock:
+            if len(self._running) < self.max_running and not self._waiting:
+                return 0.0
+            return self._work_ahead(order, time.time())
+
+    def _class_waits(self) -> Dict[str, Optional[float]]:
+        return {priority: (sum(waits) / len(waits) if waits else None)
+                for priority, waits in self._waits.items()}
+
+    def stats(self) -> Dict:
+        """Running and waiting counts per class, expected backlog and mean recent queue waits."""
+        with self._lock:
+            return {
+                "backlog_seconds": self._work_ahead((math.inf,), time.time()),
+                "max_running": self.max_running,
+                "client_quota": self.client_quota,
+                "memory_reserved_bytes": self.memory.reserved() if self.memory is not None else None,
+                "memory_capacity_bytes": self.memory.capacity if self.memory is not None else None,
+                "running": {priority: sum(1 for e in self._running.values() if e["priority"] == priority)
+                            for priority in PRIORITY_CLASSES},
+                "waiting": {priority: sum(1 for e in self._waiting.values() if e["priority"] == priority)
+                            for priority in PRIORITY_CLASSES},
+                "class_wait_seconds": self._class_waits()
+            }
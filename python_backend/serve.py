@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Production launcher for the Song Splitter API.
+Starts one inference process (model, jobs, separation threads) and a gunicorn
+pool of HTTP workers that talk to it over a local socket. HTTP workers never
+load a model, so they are cheap to multiply; threaded workers keep slow
+uploads and downloads from holding up other requests.
+
+    python serve.py --port 5000 --http-workers 4
+"""
+
+import os
+import sys
+import time
+import secrets
+import argparse
+import subprocess
+from pathlib import Path
+from multiprocessing.connection import Client
+
+from inference_server import AUTHKEY_ENV, DEFAULT_ADDRESS, parse_address
+from cpu_affinity import affinity_preexec, available_cpus, thread_env
+
+def wait_for_socket(process: subprocess.Popen, address: str, authkey: bytes, timeout: float) -> bool:
+    """Wait until the inference process accepts (authenticated) connections."""
+    deadline = time.time() + timeout
+    target = parse_address(address)
+    while time.time() < deadline:
+        if process.poll() is not None:
+            return False
+        try:
+            Client(target, authkey=authkey).close()
+            return True
+        except (OSError, EOFError):
+            # Not listening yet (no socket file, connection refused)
+            time.sleep(0.2)
+    return False
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Song Splitter API for production")
+    parser.add_argument("--host", default="0.0.0.0", help="HTTP bind address")
+    parser.add_argument("--port", "-p", type=int, default=5000, help="HTTP port")
+    parser.add_argument("--http-workers", "-w", type=int, default=4,
+                       help="gunicorn worker processes (default: 4)")
+    parser.add_argument("--threads", type=int, default=8,
+                       help="Threads per HTTP worker for concurrent uploads/downloads (default: 8)")
+    parser.add_argument("--inference-address", default=DEFAULT_ADDRESS,
+                       help="Unix socket path or host:port of the inference process")
+    parser.add_argument("--http-cores", type=int, default=0,
+                       help="Reserve this many cores for HTTP workers; inference gets the rest (default: share all)")
+    parser.add_argument("--startup-timeout", type=float, default=300.0,
+                       help="Seconds to wait for the inference process to listen")
+    args = parser.parse_args()
+
+    backend_dir = Path(__file__).parent
+    env = dict(os.environ)
+    env.setdefault(AUTHKEY_ENV, secrets.token_hex(16))
+
+    # Optionally keep request handling off the cores that run separations
+    cpus = available_cpus()
+    http_cores = inference_cores = None
+    if 0 < args.http_cores < len(cpus):
+        http_cores, inference_cores = cpus[:args.http_cores], cpus[args.http_cores:]
+        print(f"⚡ Cores: HTTP {http_cores}, inference {inference_cores}")
+
+    print("🤖 Starting inference process...")
+    inference = subprocess.Popen(
+        [sys.executable, str(backend_dir / "inference_server.py"), "--address", args.inference_address],
+        cwd=backend_dir, env=thread_env(inference_cores, env) if inference_cores else env,
+        preexec_fn=affinity_preexec(inference_cores) if inference_cores else None)
+    if not wait_for_socket(inference, args.inference_address, env[AUTHKEY_ENV].encode(), args.startup_timeout):
+        inference.terminate()
+        print("❌ Inference process failed to start")
+        sys.exit(1)
+
+    print(f"🚀 Starting {args.http_workers} HTTP workers on {args.host}:{args.port}")
+    env["SONG_SPLITTER_INFERENCE_ADDRESS"] = args.inference_address
+    http = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn",
+         "--workers", str(args.http_workers),
+         "--worker-class", "gthread",
+         "--threads", str(args.threads),
+         "--bind", f"{args.host}:{args.port}",
+         "--timeout", "120",
+         "flask_api:app"],
+        cwd=backend_dir, env=thread_env(http_cores, env) if http_cores else env,
+        preexec_fn=affinity_preexec(http_cores) if http_cores else None)
+
+    try:
+        while http.poll() is None and inference.poll() is None:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in (http, inference):
+            if process.poll() is None:
+                process.terminate()
+        for process in (http, inference):
+            process.wait()
+
+if __name__ == "__main__":
+    main()
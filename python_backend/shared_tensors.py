@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Zero-copy tensor handoff between Song Splitter processes.
+A SharedTensor is a small picklable handle to an array that lives in a POSIX
+shared memory segment. Sending the handle to another process costs a few
+bytes instead of pickling (and copying) the samples; the receiver maps the
+same memory. Producers can also allocate an empty segment and let a worker
+write its result into it directly.
+
+Each segment starts with a reference count; the process that drops the last
+reference unlinks it. Counts are updated under an fcntl lock on a small lock
+file next to the segment's name, so any process can retain or release.
+
+    bytes 0-7     reference count (int64)
+    bytes 64-     array data (C order)
+"""
+
+import os
+import fcntl
+import secrets
+import tempfile
+from contextlib import contextmanager
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, Tuple
+
+import numpy as np
+
+DATA_OFFSET = 64
+NAME_PREFIX = "songsplit_"
+
+# Segments mapped by this process, by name
+_mapped: Dict[str, SharedMemory] = {}
+
+def _open_segment(name: str, create: bool = False, size: int = 0) -> SharedMemory:
+    """Map a segment without handing its lifetime to the resource tracker."""
+    # The tracker would unlink a segment as soon as any process that attached
+    # it exits; the reference count decides instead
+    try:
+        return SharedMemory(name=name, create=create, size=size, track=False)
+    except TypeError:
+        # Python < 3.13 always registers the segment
+        shm = SharedMemory(name=name, create=create, size=size)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+def _unlink_segment(shm: SharedMemory):
+    if not getattr(shm, "_track", True):
+        shm.unlink()
+        return
+    # Older unlink() unregisters unconditionally; balance it first
+    resource_tracker.register(shm._name, "shared_memory")
+    shm.unlink()
+
+def _lock_path(name: str) -> str:
+    return os.path.join(tempfile.gettempdir(), f"{name}.lock")
+
+@contextmanager
+def _refcount_lock(name: str):
+    with open(_lock_path(name), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+class SharedTensor:
+    """Picklable handle to a numpy array in shared memory."""
+
+    def __init__(self, name: str, shape: Tuple[int, ...], dtype: str):
+        self.name = name
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype).str
+
+    @classmethod
+    def empty(cls, shape: Tuple[int, ...], dtype=np.float32) -> "SharedTensor":
+        """Allocate a zero-filled segment holding one reference (the caller's)."""
+        nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        name = NAME_PREFIX + secrets.token_hex(8)
+        shm = _open_segment(name, create=True, size=DATA_OFFSET + max(nbytes, 1))
+        np.ndarray((1,), dtype=np.int64, buffer=shm.buf)[0] = 1
+        _mapped[name] = shm
+        return cls(name, shape, dtype)
+
+    @classmethod
+    def from_array(cls, array) -> "SharedTensor":
+        """Copy an array (or tensor) into a new segment, once."""
+        if hasattr(array, "detach"):
+            array = array.detach().cpu().numpy()
+        handle = cls.empty(array.shape, array.dtype)
+        handle.array()[...] = array
+        return handle
+
+    def _segment(self) -> SharedMemory:
+        shm = _mapped.get(self.name)
+        if shm is None:
+            shm = _mapped[self.name] = _open_segment(self.name)
+        return shm
+
+    def _counter(self) -> np.ndarray:
+        return np.ndarray((1,), dtype=np.int64, buffer=self._segment().buf)
+
+    def array(self) -> np.ndarray:
+        """Writable numpy view of the shared data (no copy)."""
+        return np.ndarray(self.shape, dtype=self.dtype, buffer=self._segment().buf, offset=DATA_OFFSET)
+
+    def tensor(self):
+        """torch view of the shared data (no copy)."""
+        import torch
+        return torch.from_numpy(self.array())
+
+    def retain(self, count: int = 1) -> "SharedTensor":
+        """Add references, e.g. before handing the tensor to another stage."""
+        with _refcount_lock(self.name):
+            self._counter()[0] += count
+        return self
+
+    def release(self):
+        """Drop one reference; the last one unlinks the segment."""
+        with _refcount_lock(self.name):
+            counter = self._counter()
+            counter[0] -= 1
+            last = counter[0] <= 0
+            del counter
+            shm = self._segment()
+            if last:
+                _unlink_segment(shm)
+        self.close()
+        if last:
+            try:
+                os.remove(_lock_path(self.name))
+            except FileNotFoundError:
+                pass
+
+    def close(self):
+        """Forget the segment in this process; it is unmapped once no views remain."""
+        shm = _mapped.pop(self.name, None)
+        if shm is not None:
+            try:
+                shm.close()
+            except BufferError:
+                # Views are still alive; the mapping goes away with the last one
+                pass
+
+    def refcount(self) -> int:
+        with _refcount_lock(self.name):
+            return int(self._counter()[0])
+
+    def __getstate__(self):
+        return {"name": self.name, "shape": self.shape, "dtype": self.dtype}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    def __repr__(self):
+        return f"SharedTensor({self.name!r}, shape={self.shape}, dtype={self.dtype!r})"
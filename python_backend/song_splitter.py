@@ -2,6 +2,9 @@
 """
 Song Splitter - AI-Powered Audio Source Separation
 Uses Demucs for high-quality audio separation into vocals, drums, bass, and other instruments.
+
+torch, torchaudio, demucs, pydub and mutagen are imported where they
+are used, so importing this module (and --help) stays fast.
 """
 
 import os
@@ -9,53 +12,361 @@ import sys
 import time
 import json
 import shutil
-import librosa
+import struct
+import threading
 import soundfile as sf
 import numpy as np
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import Callable, Dict, List, Tuple, Optional
 import click
-from pydub import AudioSegment
-import torch
-import torchaudio
-from demucs.pretrained import get_model
-from demucs.apply import apply_model
-from mutagen import File as MutagenFile
+from cpu_backend import DEFAULT_BACKEND, parse_backend_spec, prepare_model
+from cancellation import check_cancelled, install_cancel_hook
+from model_cache import ModelCache
+from spectral_analysis import SpectralAnalyzer
+from stem_store import StemStoreWriter, store_path_for, write_stem_store
+
+# Named quality tiers mapped onto the Demucs inference cost knobs.
+# Models run with their own segment length: HTDemucs cannot go past the 7.8s it
+# was trained on and pads shorter segments back up to it.
+# "fine_tuned" swaps in a fine-tuned bag for the model it was trained from;
+# other models (e.g. htdemucs_6s) keep their stems and run as configured.
+QUALITY_TIERS = {
+    "preview": {
+        "shifts": 0,
+        "overlap": 0.1,
+        "fine_tuned": {},
+        "description": "Single pass with minimal overlap for fast interactive results"
+    },
+    "standard": {
+        "shifts": 1,
+        "overlap": 0.25,
+        "fine_tuned": {},
+        "description": "Demucs defaults, balanced quality and speed"
+    },
+    "max": {
+        "shifts": 2,
+        "overlap": 0.5,
+        "fine_tuned": {"htdemucs": "htdemucs_ft"},
+        "description": "Fine-tuned bag (for htdemucs) with shift averaging for batch archival jobs"
+    }
+}
+
+# Names used by existing clients (e.g. the Flutter app sends 'high').
+QUALITY_ALIASES = {"low": "preview", "medium": "standard", "high": "max"}
+DEFAULT_QUALITY = "standard"
+
+# Near-silent stretches (RMS below SILENCE_THRESHOLD_DB in every SILENCE_FRAME_SECONDS
+# frame, for at least SILENCE_MIN_SECONDS) are not run through the model
+SILENCE_THRESHOLD_DB = -60.0
+SILENCE_MIN_SECONDS = 2.0
+SILENCE_FRAME_SECONDS = 0.1
+# Audio kept as model context on both sides of each audible region
+SILENCE_CONTEXT_SECONDS = 2.0
+
+def tier_model(tier: Dict, model_name: str) -> str:
+    """The model a tier runs when model_name is the configured one."""
+    return tier["fine_tuned"].get(model_name, model_name)
+
+def resolve_quality(quality: Optional[str]) -> str:
+    """Map a requested quality name (or alias) to a tier name."""
+    if not quality:
+        return DEFAULT_QUALITY
+    name = QUALITY_ALIASES.get(quality.lower(), quality.lower())
+    if name not in QUALITY_TIERS:
+        raise ValueError(f"Unknown quality tier: {quality}")
+    return name
+
+def load_audio_window(file_path, start: float = 0.0, end: Optional[float] = None):
+    """
+    Decode only the [start, end) seconds of an audio file.
+    
+    Seeks with libsndfile (WAV, FLAC, OGG, MP3) and falls back to torchaudio's
+    seeking decoder for formats it can't open (M4A, AAC), with the sample rate
+    read by mutagen.
+    
+    Returns:
+        Tuple of (channels x time tensor, sample rate)
+    """
+    import torch
+    import torchaudio
+    try:
+        with sf.SoundFile(str(file_path)) as f:
+            sample_rate = f.samplerate
+            f.seek(min(int(start * sample_rate), f.frames))
+            frames = -1 if end is None else int(round((end - start) * sample_rate))
+            audio = f.read(frames, dtype='float32', always_2d=True)
+        return torch.from_numpy(audio.T.copy()), sample_rate
+    except RuntimeError:
+        pass
+    # torchaudio.info is gone in torchaudio 2.9+: take the rate from the header with mutagen
+    from mutagen import File as MutagenFile
+    audio_file = MutagenFile(str(file_path))
+    sample_rate = getattr(getattr(audio_file, 'info', None), 'sample_rate', None)
+    if not sample_rate:
+        # No readable header: decode everything and cut the window out
+        waveform, sample_rate = torchaudio.load(str(file_path))
+        stop = None if end is None else int(round(end * sample_rate))
+        return waveform[:, int(start * sample_rate):stop], sample_rate
+    frames = -1 if end is None else int(round((end - start) * sample_rate))
+    return torchaudio.load(str(file_path), frame_offset=int(start * sample_rate), num_frames=frames)
+
+def find_silence(waveform, sample_rate: int, threshold_db: float = SILENCE_THRESHOLD_DB,
+                 min_seconds: float = SILENCE_MIN_SECONDS) -> List[Tuple[int, int]]:
+    """
+    Frame ranges [start, end) of near-silent regions of a (channels, time)
+    waveform, from the RMS energy of short frames.
+    """
+    import torch
+    frame = max(1, int(SILENCE_FRAME_SECONDS * sample_rate))
+    frames = waveform.shape[-1] // frame
+    if frames == 0:
+        return []
+    power = waveform[:, :frames * frame].reshape(waveform.shape[0], frames, frame).pow(2).mean(dim=(0, 2))
+    silent = (10 * torch.log10(power + 1e-12) < threshold_db).cpu().numpy()
+    
+    regions = []
+    min_frames = max(1, int(round(min_seconds / SILENCE_FRAME_SECONDS)))
+    run_start = None
+    for index, is_silent in enumerate(np.append(silent, False)):
+        if is_silent and run_start is None:
+            run_start = index
+        elif not is_silent and run_start is not None:
+            if index - run_start >= min_frames:
+                regions.append((run_start * frame, index * frame))
+            run_start = None
+    return regions
+
+def audio_duration(file_path) -> float:
+    """Duration in seconds, read from the file header without decoding."""
+    try:
+        return sf.info(str(file_path)).duration
+    except RuntimeError:
+        from mutagen import File as MutagenFile
+        audio_file = MutagenFile(str(file_path))
+        return getattr(getattr(audio_file, 'info', None), 'length', 0.0)
+
+class ProgressiveWavWriter:
+    """
+    32-bit float WAV writer whose header is kept valid after every append,
+    so a stem can be read (or downloaded) while it is still being written.
+    """
+    HEADER_SIZE = 58
+    
+    def __init__(self, path: str, sample_rate: int, channels: int):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.frames = 0
+        self._file = open(path, 'wb')
+        self._write_header()
+    
+    def _write_header(self):
+        data_size = self.frames * self.channels * 4
+        self._file.seek(0)
+        self._file.write(b'RIFF' + struct.pack('<I', self.HEADER_SIZE - 8 + data_size) + b'WAVE')
+        # fmt chunk: WAVE_FORMAT_IEEE_FLOAT with an empty extension
+        self._file.write(b'fmt ' + struct.pack('<IHHIIHHH', 18, 3, self.channels, self.sample_rate,
+                                               self.sample_rate * self.channels * 4,
+                                               self.channels * 4, 32, 0))
+        self._file.write(b'fact' + struct.pack('<II', 4, self.frames))
+        self._file.write(b'data' + struct.pack('<I', data_size))
+    
+    def append(self, audio):
+        """Append a (channels, time) tensor and commit it to the header."""
+        samples = audio.detach().cpu().numpy().T.astype('<f4', copy=False)
+        self._file.seek(0, os.SEEK_END)
+        self._file.write(samples.tobytes())
+        self.frames += samples.shape[0]
+        self._file.flush()
+        # Only advertise the new frames once their data is on disk
+        self._write_header()
+        self._file.flush()
+    
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+    
+    @classmethod
+    def committed_size(cls, path: str) -> int:
+        """Number of bytes (header included) that currently form a valid WAV."""
+        with open(path, 'rb') as f:
+            header = f.read(cls.HEADER_SIZE)
+        if len(header) < cls.HEADER_SIZE:
+            return 0
+        data_size = struct.unpack('<I', header[cls.HEADER_SIZE - 4:])[0]
+        return cls.HEADER_SIZE + data_size
 
 class SongSplitter:
-    def __init__(self, model_name: str = "htdemucs"):
-        """Initialize the Song Splitter with specified model."""
+    def __init__(self, model_name: str = "htdemucs", backends: Optional[Dict[str, str]] = None,
+                 workers: int = 1, parallel_bag: bool = False,
+                 max_chunk_seconds: Optional[float] = None, skip_silence: bool = True,
+                 model_cache: Optional[ModelCache] = None):
+        """
+        Initialize the Song Splitter with specified model.
+        
+        backends maps model names (or "*" for all) to a CPU backend from
+        cpu_backend.CPU_BACKENDS, e.g. {"htdemucs": "quantized"}. With
+        workers > 1, each track is split into segments that are separated in
+        parallel worker processes on CPU; with parallel_bag, the members of
+        bagged models are evaluated concurrently (see parallel_separation.py).
+        With max_chunk_seconds, longer inputs are separated in chunks of at
+        most that length, bounding peak memory (see memory_budget.py). With
+        skip_silence, near-silent regions are written as zeros without running
+        the model on them. Prepared models are loaded from local snapshots
+        (model_cache, by default the one configured by SONG_SPLITTER_MODEL_CACHE).
+        """
         self.model_name = model_name
         self.model = None
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.models = {}
+        self.backends = backends or {}
+        self.backend_reports = {}
+        self.workers = workers
+        self.parallel_bag = parallel_bag
+        self.max_chunk_seconds = max_chunk_seconds
+        self.skip_silence = skip_silence
+        self.model_cache = model_cache if model_cache is not None else ModelCache.from_env()
+        self._parallel = None
+        self._bag_separators = {}
+        self._device = None
+        self._analyzer = None
+        # Measured real-time factor (separation time / audio time) per tier
+        self.tier_timings = {name: {"runs": 0, "rtf": None} for name in QUALITY_TIERS}
+        self._timings_lock = threading.Lock()
+        self._load_lock = threading.Lock()
         self.supported_models = {
             "htdemucs": "High-quality 4-stem separation (vocals, drums, bass, other)",
             "htdemucs_ft": "Fine-tuned version with better vocal separation", 
             "htdemucs_6s": "6-stem separation (vocals, drums, bass, piano, guitar, other)",
             "mdx_extra": "Extra quality model for vocals and accompaniment"
         }
-        print(f"Using device: {self.device}")
-        
-    def load_model(self):
-        """Load the Demucs model."""
-        if self.model is None:
-            print(f"Loading {self.model_name} model...")
-            self.model = get_model(self.model_name)
-            self.model.to(self.device)
-            print("Model loaded successfully!")
     
-    def separate_audio(self, input_path: str, output_dir: str) -> Dict[str, str]:
+    @property
+    def device(self) -> str:
+        """"cuda" when available, else "cpu" (importing torch on first access)."""
+        if self._device is None:
+            import torch
+            self._device = "cuda" if torch.cuda.is_available() else "cpu"
+            print(f"Using device: {self._device}")
+        return self._device
+    
+    @device.setter
+    def device(self, device: str):
+        self._device = device
+    
+    @property
+    def analyzer(self) -> SpectralAnalyzer:
+        """Spectral analysis engine on the splitter's device (configured by SONG_SPLITTER_ANALYSIS_FRAMES)."""
+        if self._analyzer is None:
+            self._analyzer = SpectralAnalyzer.from_env(self.device)
+        return self._analyzer
+        
+    def load_model(self, model_name: Optional[str] = None):
+        """Load a Demucs model (the configured one by default), caching it."""
+        model_name = model_name or self.model_name
+        # One load per model, even when a warm-up and a job ask at once
+        with self._load_lock:
+            if model_name not in self.models:
+                print(f"Loading {model_name} model...")
+                if self.model_cache is None:
+                    model = self._apply_backend(model_name, self._fetch_model(model_name))
+                else:
+                    backend = self.backends.get(model_name, self.backends.get("*", DEFAULT_BACKEND))
+                    model, self.backend_reports[model_name] = self.model_cache.load(
+                        model_name, backend, self.device,
+                        fetch=lambda: self._fetch_model(model_name),
+                        prepare=lambda eager: (self._apply_backend(model_name, eager),
+                                               self.backend_reports[model_name]))
+                # A cancelled job stops before the next segment the model runs
+                self.models[model_name] = install_cancel_hook(model)
+                print("Model loaded successfully!")
+            if model_name == self.model_name:
+                self.model = self.models[model_name]
+            return self.models[model_name]
+    
+    def _fetch_model(self, model_name: str):
+        """Build a pretrained eager model on the device."""
+        from demucs.pretrained import get_model
+        model = get_model(model_name)
+        model.to(self.device)
+        model.eval()
+        return model
+    
+    def warm_up(self, seconds: float = 2.0):
+        """Load the default model and run it once on a short probe, so the first job starts warm."""
+        from cpu_backend import probe_mix
+        model = self.load_model()
+        mix = probe_mix(model.samplerate, seconds).to(self.device)
+        self._apply_tier(model, mix, QUALITY_TIERS["preview"])
+    
+    def _apply_backend(self, model_name: str, model):
+        """Swap in the optimized CPU backend configured for this model, if any."""
+        backend = self.backends.get(model_name, self.backends.get("*", DEFAULT_BACKEND))
+        if backend == DEFAULT_BACKEND:
+            self.backend_reports[model_name] = {"requested": backend, "backend": backend}
+            return model
+        if self.device != "cpu":
+            print(f"Ignoring {backend} backend for {model_name}: only used on CPU")
+            self.backend_reports[model_name] = {"requested": backend, "backend": DEFAULT_BACKEND}
+            return model
+        
+        print(f"Preparing {backend} CPU backend for {model_name}...")
+        model, report = prepare_model(model, backend)
+        self.backend_reports[model_name] = report
+        if "drift" in report:
+            print(f"Backend drift vs eager: {report['drift']['snr_db']:.1f} dB SNR")
+        return model
+    
+    def get_quality_tiers(self) -> Dict[str, Dict]:
+        """Describe each quality tier with its knobs and measured real-time factor."""
+        tiers = {}
+        with self._timings_lock:
+            for name, tier in QUALITY_TIERS.items():
+                tiers[name] = {
+                    **tier,
+                    "model": tier_model(tier, self.model_name),
+                    "runs": self.tier_timings[name]["runs"],
+                    "rtf": self.tier_timings[name]["rtf"]
+                }
+        return tiers
+    
+    def _record_timing(self, tier_name: str, separation_time: float, audio_seconds: float):
+        """Fold one run into the running real-time factor for a tier."""
+        if audio_seconds <= 0:
+            return
+        rtf = separation_time / audio_seconds
+        with self._timings_lock:
+            timing = self.tier_timings[tier_name]
+            runs = timing["runs"] + 1
+            previous = timing["rtf"] or 0.0
+            timing["rtf"] = previous + (rtf - previous) / runs
+            timing["runs"] = runs
+    
+    def separate_audio(self, input_path: str, output_dir: str, quality: Optional[str] = None,
+                       stats: Optional[Dict] = None, store: bool = False) -> Dict[str, str]:
         """
         Separate audio into stems using Demucs.
         
         Args:
             input_path: Path to input audio file
             output_dir: Directory to save separated stems
+            quality: Quality tier name or alias (defaults to "standard")
+            stats: Optional dict filled with per-run timing statistics
+            store: Also write a memory-mapped stem store (path in stats["stem_store"])
             
         Returns:
             Dictionary mapping stem names to file paths
         """
-        self.load_model()
+        tier_name = resolve_quality(quality)
+        tier = QUALITY_TIERS[tier_name]
+        model = self.load_model(tier_model(tier, self.model_name))
+        
+        if self.max_chunk_seconds and audio_duration(input_path) > self.max_chunk_seconds:
+            # Too long to hold in one pass within the memory budget
+            print(f"Long input: separating in {self.max_chunk_seconds:.0f}s chunks to bound memory")
+            return self.separate_progressive(input_path, output_dir, quality=quality,
+                                             preview_seconds=self.max_chunk_seconds,
+                                             chunk_seconds=self.max_chunk_seconds,
+                                             stats=stats, store=store)
         
         input_path = Path(input_path)
         output_dir = Path(output_dir)
@@ -63,41 +374,108 @@ class SongSplitter:
         
         print(f"Processing: {input_path.name}")
         
-        # Load audio
-        waveform, sample_rate = torchaudio.load(input_path)
-        
-        # Convert to the model's expected format
-        if waveform.shape[0] == 1:  # Mono to stereo
-            waveform = waveform.repeat(2, 1)
-        elif waveform.shape[0] > 2:  # Multi-channel to stereo
-            waveform = waveform[:2]
-            
-        # Resample if necessary
-        if sample_rate != self.model.samplerate:
-            resampler = torchaudio.transforms.Resample(sample_rate, self.model.samplerate)
-            waveform = resampler(waveform)
-            sample_rate = self.model.samplerate
-        
-        # Move to device
-        waveform = waveform.to(self.device)
+        waveform, sample_rate = self._load_waveform(input_path, model.samplerate)
         
         # Apply separation
-        print("Separating audio...")
+        print(f"Separating audio ({tier_name} quality)...")
         start_time = time.time()
         
-        with torch.no_grad():
-            sources = apply_model(self.model, waveform.unsqueeze(0), device=self.device)[0]
+        sources, skipped_frames = self._separate_active(model, waveform, tier, 0, waveform.shape[-1],
+                                                        int(SILENCE_CONTEXT_SECONDS * sample_rate))
         
         separation_time = time.time() - start_time
+        audio_seconds = waveform.shape[-1] / sample_rate
         print(f"Separation completed in {separation_time:.2f} seconds")
+        self._record_timing(tier_name, separation_time, audio_seconds)
+        
+        if stats is not None:
+            stats.update({
+                "quality": tier_name,
+                "model": tier_model(tier, self.model_name),
+                "audio_seconds": audio_seconds,
+                "sample_rate": sample_rate,
+                "separation_time": separation_time,
+                "inference_seconds_saved": skipped_frames / sample_rate,
+                "rtf": separation_time / audio_seconds if audio_seconds > 0 else None
+            })
+        
+        stem_paths = self._save_stems(model, sources, output_dir, input_path.stem, sample_rate)
+        
+        if store:
+            store_path = write_stem_store(store_path_for(output_dir, input_path.stem),
+                                          model.sources, sources, sample_rate)
+            if stats is not None:
+                stats["stem_store"] = store_path
+        
+        return stem_paths
+    
+    def separate_window(self, input_path: str, output_dir: str, start: float, end: Optional[float],
+                        quality: Optional[str] = None, context_seconds: float = 2.0,
+                        stats: Optional[Dict] = None) -> Dict[str, str]:
+        """
+        Separate only the [start, end) seconds of a file.
+        
+        Seeks and decodes just that window plus context_seconds of model
+        context on each side (trimmed from the stems afterwards), so a short
+        excerpt of a long file costs only the excerpt.
+        
+        Returns:
+            Dictionary mapping stem names to file paths
+        """
+        tier_name = resolve_quality(quality)
+        tier = QUALITY_TIERS[tier_name]
+        model = self.load_model(tier_model(tier, self.model_name))
+        
+        input_path = Path(input_path)
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        
+        padded_start = max(0.0, start - context_seconds)
+        padded_end = None if end is None else end + context_seconds
+        print(f"Processing {input_path.name} from {start:.2f}s to "
+              f"{'end' if end is None else f'{end:.2f}s'}")
+        
+        waveform, sample_rate = self._load_waveform(input_path, model.samplerate, padded_start, padded_end)
+        
+        print(f"Separating audio ({tier_name} quality)...")
+        start_time = time.time()
+        
+        # The window sits at [start, end) inside the decoded padded range
+        window_start = int(round((start - padded_start) * sample_rate))
+        window_end = waveform.shape[-1] if end is None else min(
+            waveform.shape[-1], window_start + int(round((end - start) * sample_rate)))
+        sources = self._apply_tier(model, waveform, tier)[..., window_start:window_end]
         
-        # Save stems
-        stem_names = ["drums", "bass", "other", "vocals"]
+        separation_time = time.time() - start_time
+        audio_seconds = sources.shape[-1] / sample_rate
+        print(f"Separation completed in {separation_time:.2f} seconds")
+        self._record_timing(tier_name, separation_time, waveform.shape[-1] / sample_rate)
+        
+        if stats is not None:
+            stats.update({
+                "quality": tier_name,
+                "model": tier_model(tier, self.model_name),
+                "window": [start, start + audio_seconds],
+                "audio_seconds": audio_seconds,
+                "decoded_seconds": waveform.shape[-1] / sample_rate,
+                "sample_rate": sample_rate,
+                "separation_time": separation_time,
+                "rtf": separation_time / audio_seconds if audio_seconds > 0 else None
+            })
+        
+        end_label = "end" if end is None else f"{end:g}s"
+        return self._save_stems(model, sources, output_dir,
+                                f"{input_path.stem}_{start:g}s-{end_label}", sample_rate)
+    
+    def _save_stems(self, model, sources, output_dir: Path, prefix: str, sample_rate: int) -> Dict[str, str]:
+        """Save each separated source as a WAV file."""
+        import torchaudio
         stem_paths = {}
         
-        for i, stem_name in enumerate(stem_names):
+        for i, stem_name in enumerate(model.sources):
+            check_cancelled()
             stem_audio = sources[i].cpu()
-            stem_path = output_dir / f"{input_path.stem}_{stem_name}.wav"
+            stem_path = output_dir / f"{prefix}_{stem_name}.wav"
             
             # Save as WAV
             torchaudio.save(str(stem_path), stem_audio, sample_rate)
@@ -107,38 +485,227 @@ class SongSplitter:
         
         return stem_paths
     
-    def analyze_quality(self, original_path: str, stems: Dict[str, str]) -> Dict[str, float]:
+    def separate_progressive(self, input_path: str, output_dir: str, quality: Optional[str] = None,
+                             preview_seconds: float = 15.0, chunk_seconds: float = 60.0,
+                             context_seconds: float = 2.0,
+                             on_progress: Optional[Callable[[float, float, Dict[str, str]], None]] = None,
+                             stats: Optional[Dict] = None, store: bool = False) -> Dict[str, str]:
+        """
+        Separate audio section by section, appending each section to the stems.
+        
+        The first preview_seconds are separated first so the stems become
+        playable almost immediately; the rest follows in chunk_seconds pieces.
+        Each section is separated with context_seconds of surrounding audio on
+        both sides to avoid seams, then trimmed. on_progress is called with
+        (available_seconds, total_seconds, stem_paths) after every section.
+        With store, sections are also written into a memory-mapped stem store.
+        
+        Returns:
+            Dictionary mapping stem names to file paths
+        """
+        tier_name = resolve_quality(quality)
+        tier = QUALITY_TIERS[tier_name]
+        model = self.load_model(tier_model(tier, self.model_name))
+        
+        input_path = Path(input_path)
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        
+        print(f"Processing progressively: {input_path.name}")
+        
+        waveform, sample_rate = self._load_waveform(input_path, model.samplerate)
+        total_frames = waveform.shape[-1]
+        total_seconds = total_frames / sample_rate
+        
+        # Section boundaries: a short preview, then fixed-size chunks
+        boundaries = [0, min(total_frames, int(preview_seconds * sample_rate))]
+        chunk_frames = max(1, int(chunk_seconds * sample_rate))
+        while boundaries[-1] < total_frames:
+            boundaries.append(min(total_frames, boundaries[-1] + chunk_frames))
+        context = int(context_seconds * sample_rate)
+        
+        stem_paths = {}
+        writers = {}
+        for stem_name in model.sources:
+            stem_path = output_dir / f"{input_path.stem}_{stem_name}.wav"
+            writers[stem_name] = ProgressiveWavWriter(str(stem_path), sample_rate, waveform.shape[0])
+            stem_paths[stem_name] = str(stem_path)
+        store_writer = None
+        if store:
+            store_writer = StemStoreWriter(store_path_for(output_dir, input_path.stem), model.sources,
+                                           sample_rate, waveform.shape[0], total_frames)
+        
+        print(f"Separating audio ({tier_name} quality) in {len(boundaries) - 1} sections...")
+        start_time = time.time()
+        first_section_time = None
+        skipped_frames = 0
+        
+        try:
+            for start, end in zip(boundaries[:-1], boundaries[1:]):
+                check_cancelled()
+                sources, skipped = self._separate_active(model, waveform, tier, start, end, context)
+                skipped_frames += skipped
+                for i, stem_name in enumerate(model.sources):
+                    writers[stem_name].append(sources[i])
+                if store_writer is not None:
+                    store_writer.write(start, sources)
+                
+                if first_section_time is None:
+                    first_section_time = time.time() - start_time
+                    print(f"First {end / sample_rate:.1f}s available after {first_section_time:.2f} seconds")
+                if on_progress is not None:
+                    on_progress(end / sample_rate, total_seconds, dict(stem_paths))
+        finally:
+            for writer in writers.values():
+                writer.close()
+            if store_writer is not None:
+                store_writer.close()
+        
+        separation_time = time.time() - start_time
+        print(f"Separation completed in {separation_time:.2f} seconds")
+        self._record_timing(tier_name, separation_time, total_seconds)
+        
+        if stats is not None:
+            stats.update({
+                "quality": tier_name,
+                "model": tier_model(tier, self.model_name),
+                "audio_seconds": total_seconds,
+                "sample_rate": sample_rate,
+                "separation_time": separation_time,
+                "time_to_first_audio": first_section_time,
+                "inference_seconds_saved": skipped_frames / sample_rate,
+                "rtf": separation_time / total_seconds if total_seconds > 0 else None
+            })
+            if store_writer is not None:
+                stats["stem_store"] = store_writer.path
+        
+        return stem_paths
+    
+    def _load_waveform(self, input_path, samplerate: int, start: float = 0.0,
+                       end: Optional[float] = None):
+        """
+        Load audio as a stereo tensor at the model sample rate on the device.
+        With start/end (seconds), only that window is decoded.
+        """
+        import torchaudio
+        if start > 0 or end is not None:
+            waveform, sample_rate = load_audio_window(input_path, start, end)
+        else:
+            waveform, sample_rate = torchaudio.load(input_path)
+        
+        # Convert to the model's expected format
+        if waveform.shape[0] == 1:  # Mono to stereo
+            waveform = waveform.repeat(2, 1)
+        elif waveform.shape[0] > 2:  # Multi-channel to stereo
+            waveform = waveform[:2]
+            
+        # Resample if necessary
+        if sample_rate != samplerate:
+            resampler = torchaudio.transforms.Resample(sample_rate, samplerate)
+            waveform = resampler(waveform)
+            sample_rate = samplerate
+        
+        # Move to device
+        return waveform.to(self.device), sample_rate
+    
+    def _apply_tier(self, model, waveform, tier: Dict):
+        """Run the model on a (channels, time) waveform with the tier's knobs."""
+        check_cancelled()
+        import torch
+        from demucs.apply import apply_model, BagOfModels
+        if self.parallel_bag and self.device == "cpu" and isinstance(model, BagOfModels):
+            return self._bag_separator(tier_model(tier, self.model_name), model).separate(waveform, tier)
+        if self.workers > 1 and self.device == "cpu":
+            return self._parallel_separator().separate(
+                waveform, model.samplerate, len(model.sources), tier, tier_model(tier, self.model_name))
+        with torch.no_grad():
+            return apply_model(model, waveform.unsqueeze(0), device=self.device,
+                               shifts=tier["shifts"], overlap=tier["overlap"])[0]
+    
+    def _parallel_separator(self):
+        """Start the intra-track worker pool on first use."""
+        if self._parallel is None:
+            from parallel_separation import ParallelSeparator
+            self._parallel = ParallelSeparator(self.model_name, self.backends, self.workers)
+            print(f"Started {self.workers} separation workers "
+                  f"({self._parallel.threads_per_worker} threads each)")
+        return self._parallel
+    
+    def close(self):
+        """Stop the worker processes started for parallel separation (the splitter stays usable)."""
+        if self._parallel is not None:
+            self._parallel.shutdown()
+            self._parallel = None
+        for separator in self._bag_separators.values():
+            separator.shutdown()
+        self._bag_separators = {}
+    
+    def _bag_separator(self, model_name: str, bag):
+        """Start one worker process per member of a bagged model on first use."""
+        if model_name not in self._bag_separators:
+            from parallel_separation import BagSeparator
+            separator = BagSeparator(model_name, bag, self.backends)
+            self._bag_separators[model_name] = separator
+            print(f"Started {len(bag.models)} bag member workers for {model_name} "
+                  f"({separator.threads_per_member} threads each)")
+        return self._bag_separators[model_name]
+    
+    def _separate_range(self, model, waveform, tier: Dict, start: int, end: int, context: int):
+        """Separate frames [start, end) using up to context frames of padding on each side."""
+        padded_start = max(0, start - context)
+        padded_end = min(waveform.shape[-1], end + context)
+        sources = self._apply_tier(model, waveform[:, padded_start:padded_end], tier)
+        return sources[..., start - padded_start:end - padded_start]
+    
+    def _separate_active(self, model, waveform, tier: Dict, start: int, end: int, context: int):
+        """
+        Separate frames [start, end), running the model only on the parts
+        that are not near-silent; silent regions are left as zeros.
+        
+        Returns:
+            (sources, number of frames skipped)
+        """
+        import torch
+        silence = find_silence(waveform[:, start:end], model.samplerate) if self.skip_silence else []
+        if not silence:
+            return self._separate_range(model, waveform, tier, start, end, context), 0
+        
+        sources = torch.zeros(len(model.sources), waveform.shape[0], end - start,
+                              dtype=waveform.dtype, device=waveform.device)
+        position = 0
+        for silent_start, silent_end in silence + [(end - start, end - start)]:
+            if silent_start > position:
+                sources[..., position:silent_start] = self._separate_range(
+                    model, waveform, tier, start + position, start + silent_start, context)
+            position = silent_end
+        skipped = sum(silent_end - silent_start for silent_start, silent_end in silence)
+        print(f"Skipped {skipped / model.samplerate:.1f}s of silence in {len(silence)} regions")
+        return sources, skipped
+    
+    def analyze_quality(self, original_path: str, stems: Dict[str, str], offset: float = 0.0,
+                        duration: Optional[float] = None) -> Dict[str, float]:
         """
         Analyze separation quality by measuring spectral energy distribution.
         
+        offset/duration (seconds) select the part of the original the stems cover.
+        The original and all stems are analyzed in one batch (see spectral_analysis.py).
+        
         Returns:
             Dictionary with quality metrics for each stem
         """
         print("Analyzing separation quality...")
-        
-        # Load original audio
-        original, sr = librosa.load(original_path, sr=22050)
-        original_stft = np.abs(librosa.stft(original))
+        features = self.analyzer.analyze_job(stems, original=original_path, offset=offset,
+                                             duration=duration)
         
         quality_metrics = {}
         
-        for stem_name, stem_path in stems.items():
-            # Load stem
-            stem_audio, _ = librosa.load(stem_path, sr=22050)
-            stem_stft = np.abs(librosa.stft(stem_audio))
-            
-            # Calculate energy ratio (stem energy / original energy)
-            stem_energy = np.sum(stem_stft ** 2)
-            original_energy = np.sum(original_stft ** 2)
-            energy_ratio = stem_energy / original_energy if original_energy > 0 else 0
-            
-            # Calculate spectral centroid (brightness measure)
-            spectral_centroid = np.mean(librosa.feature.spectral_centroid(y=stem_audio, sr=sr))
-            
+        for stem_name, stem_features in features.items():
             quality_metrics[stem_name] = {
-                "energy_ratio": float(energy_ratio),
-                "spectral_centroid": float(spectral_centroid),
-                "rms_energy": float(np.sqrt(np.mean(stem_audio ** 2)))
+                # Stem energy / original energy
+                "energy_ratio": stem_features["energy_ratio"],
+                # Spectral centroid (brightness measure)
+                "spectral_centroid": stem_features["spectral_centroid"],
+                "rms_energy": stem_features["rms_energy"]
             }
         
         return quality_metrics
@@ -151,17 +718,14 @@ class SongSplitter:
             Dictionary with bleed analysis for each stem
         """
         print("Detecting audio bleed...")
+        features = self.analyzer.analyze_job(stems)
         
         bleed_analysis = {}
         
-        for stem_name, stem_path in stems.items():
-            # Load stem audio
-            stem_audio, sr = librosa.load(stem_path, sr=22050)
-            
-            # Calculate various quality indicators
-            rms_energy = np.sqrt(np.mean(stem_audio ** 2))
-            spectral_centroid = np.mean(librosa.feature.spectral_centroid(y=stem_audio, sr=sr))
-            zero_crossing_rate = np.mean(librosa.feature.zero_crossing_rate(stem_audio))
+        for stem_name, stem_features in features.items():
+            rms_energy = stem_features["rms_energy"]
+            spectral_centroid = stem_features["spectral_centroid"]
+            zero_crossing_rate = stem_features["zero_crossing_rate"]
             
             # Determine quality based on stem type and characteristics
             if stem_name == "vocals":
@@ -193,7 +757,9 @@ class SongSplitter:
     
     def export_to_mp3(self, wav_path: str, mp3_path: str, bitrate: str = "320k"):
         """Convert WAV to MP3 using pydub."""
+        check_cancelled()
         try:
+            from pydub import AudioSegment
             audio = AudioSegment.from_wav(wav_path)
             audio.export(mp3_path, format="mp3", bitrate=bitrate)
             print(f"Exported MP3: {mp3_path}")
@@ -204,12 +770,14 @@ class SongSplitter:
     
     def convert_to_mp3(self, wav_path: str, mp3_path: str, bitrate: str = "320k"):
         """Convert WAV file to MP3."""
+        from pydub import AudioSegment
         audio = AudioSegment.from_wav(wav_path)
         audio.export(mp3_path, format="mp3", bitrate=bitrate)
     
     def get_audio_info(self, file_path: str) -> Dict:
         """Get audio file metadata."""
         try:
+            from mutagen import File as MutagenFile
             audio_file = MutagenFile(file_path)
             info = {
                 "duration": 0,
@@ -235,8 +803,22 @@ class SongSplitter:
 @click.option('--model', '-m', default='htdemucs', help='Demucs model to use (htdemucs, mdx_extra, etc.)')
 @click.option('--format', '-f', type=click.Choice(['wav', 'mp3', 'both']), default='wav', help='Output format')
 @click.option('--analyze', '-a', is_flag=True, help='Perform quality analysis')
-@click.option('--clip-duration', '-d', type=int, help='Process only first N seconds (for testing)')
-def main(input_file, output_dir, model, format, analyze, clip_duration):
+@click.option('--quality', '-q', type=click.Choice(list(QUALITY_TIERS)), default=DEFAULT_QUALITY,
+              help='Quality tier (preview, standard, max)')
+@click.option('--backend', '-b', default=None,
+              help='CPU backend, optionally per model (e.g. quantized or htdemucs=quantized,htdemucs_ft=eager)')
+@click.option('--workers', '-w', type=int, default=1,
+              help='Separate segments of the track in N parallel worker processes (CPU)')
+@click.option('--parallel-bag', is_flag=True,
+              help='Evaluate the members of bagged models (e.g. htdemucs_ft) in parallel processes')
+@click.option('--max-chunk-seconds', type=float, default=None,
+              help='Separate longer inputs in chunks of at most N seconds to bound memory')
+@click.option('--no-skip-silence', is_flag=True,
+              help='Run the model on near-silent regions too instead of writing zeros')
+@click.option('--clip-duration', '-d', type=float, help='Process only N seconds (for testing)')
+@click.option('--clip-start', type=float, default=0.0, help='Start of the clip in seconds (default: 0)')
+def main(input_file, output_dir, model, format, analyze, quality, backend, workers, parallel_bag,
+         max_chunk_seconds, no_skip_silence, clip_duration, clip_start):
     """
     Song Splitter - Separate audio into vocals, drums, bass, and other instruments.
     
@@ -247,19 +829,14 @@ def main(input_file, output_dir, model, format, analyze, clip_duration):
     input_path = Path(input_file)
     output_path = Path(output_dir)
     
-    # Create clip if duration specified
-    if clip_duration:
-        clip_path = output_path / f"{input_path.stem}_clip.wav"
-        output_path.mkdir(parents=True, exist_ok=True)
-        
-        print(f"Creating {clip_duration}s clip...")
-        audio = AudioSegment.from_file(str(input_path))
-        clip = audio[:clip_duration * 1000]  # Convert to milliseconds
-        clip.export(str(clip_path), format="wav")
-        input_path = clip_path
-    
     # Initialize splitter
-    splitter = SongSplitter(model_name=model)
+    try:
+        backends = parse_backend_spec(backend)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--backend')
+    splitter = SongSplitter(model_name=model, backends=backends, workers=workers,
+                            parallel_bag=parallel_bag, max_chunk_seconds=max_chunk_seconds,
+                            skip_silence=not no_skip_silence)
     
     try:
         # Get original audio info
@@ -268,7 +845,14 @@ def main(input_file, output_dir, model, format, analyze, clip_duration):
         print(f"Duration: {original_info['duration']:.2f}s, Sample Rate: {original_info['sample_rate']}Hz")
         
         # Separate audio
-        stems = splitter.separate_audio(str(input_path), str(output_path))
+        run_stats = {}
+        if clip_duration or clip_start:
+            # Only the clip is decoded and separated, not the whole file
+            clip_end = clip_start + clip_duration if clip_duration else None
+            stems = splitter.separate_window(str(input_path), str(output_path), clip_start, clip_end,
+                                             quality=quality, stats=run_stats)
+        else:
+            stems = splitter.separate_audio(str(input_path), str(output_path), quality=quality, stats=run_stats)
         
         # Convert to MP3 if requested
         if format in ['mp3', 'both']:
@@ -282,7 +866,8 @@ def main(input_file, output_dir, model, format, analyze, clip_duration):
         
         # Quality analysis
         if analyze:
-            quality_metrics = splitter.analyze_quality(str(input_path), stems)
+            quality_metrics = splitter.analyze_quality(str(input_path), stems, offset=clip_start,
+                                                       duration=clip_duration)
             
             print("\n=== QUALITY ANALYSIS ===")
             for stem_name, metrics in quality_metrics.items():
@@ -311,7 +896,10 @@ def main(input_file, output_dir, model, format, analyze, clip_duration):
         # Save metadata
         metadata = {
             "input_file": str(input_path),
-            "model_used": model,
+            "model_used": run_stats["model"],
+            "quality": quality,
+            "separation_stats": run_stats,
+            "cpu_backends": splitter.backend_reports,
             "stems": stems,
             "original_info": original_info,
             "processing_time": time.time()
@@ -329,6 +917,8 @@ def main(input_file, output_dir, model, format, analyze, clip_duration):
     except Exception as e:
         print(f"Error: {e}")
         sys.exit(1)
+    finally:
+        splitter.close()
 
 if __name__ == "__main__":
     main()
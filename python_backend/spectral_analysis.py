@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Batched spectral analysis of separated stems on the inference device.
+Signals are decoded and resampled as librosa.load does them, then all signals
+of a call (the original and every stem, and optionally those of several jobs)
+are laid into one padded buffer on the device, framed, transformed with one
+batched FFT and reduced to energy, spectral centroid, zero-crossing rate
+and RMS per signal. The analysis follows librosa's defaults (22.05 kHz mono,
+n_fft 2048, hop 512, centered frames), so the numbers match librosa.stft,
+librosa.feature.spectral_centroid and zero_crossing_rate; compare them with
+tools/validate_analysis.py.
+
+With max_frames (SONG_SPLITTER_ANALYSIS_FRAMES), only that many evenly spaced
+frames of each signal are transformed: approximate metrics at a fraction of
+the cost, for large catalogs.
+"""
+
+import os
+import math
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from cancellation import check_cancelled
+
+ANALYSIS_SAMPLE_RATE = 22050
+N_FFT = 2048
+HOP_LENGTH = 512
+# Frames transformed at once (~16 MB each of windowed frames and spectra)
+CHUNK_FRAMES = 2048
+# Samples this close to zero count as positive for zero crossings, as in librosa
+ZERO_THRESHOLD = 1e-10
+
+class SpectralAnalyzer:
+    """Computes per-signal spectral features of many signals in one batched pass."""
+
+    def __init__(self, device: str = "cpu", max_frames: Optional[int] = None,
+                 sample_rate: int = ANALYSIS_SAMPLE_RATE, n_fft: int = N_FFT,
+                 hop_length: int = HOP_LENGTH):
+        self.device = device
+        self.max_frames = max_frames
+        self.sample_rate = sample_rate
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+
+    @classmethod
+    def from_env(cls, device: str = "cpu") -> "SpectralAnalyzer":
+        """Analyzer sampling SONG_SPLITTER_ANALYSIS_FRAMES frames per signal (0: all)."""
+        max_frames = int(os.environ.get("SONG_SPLITTER_ANALYSIS_FRAMES", "0"))
+        return cls(device, max_frames=max_frames or None)
+
+    def load(self, paths: List[str], offsets: Optional[List[float]] = None,
+             durations: Optional[List[Optional[float]]] = None) -> List:
+        """
+        Decode files as mono signals at the analysis rate on the device, the
+        way librosa.load does (soxr "hq" resampling). Files with the same rate
+        and length (the stems of a job) are resampled together as channels.
+        """
+        import soxr
+        import torch
+        from song_splitter import load_audio_window
+        offsets = offsets or [0.0] * len(paths)
+        durations = durations or [None] * len(paths)
+        groups = {}
+        for index, (path, offset, duration) in enumerate(zip(paths, offsets, durations)):
+            end = None if duration is None else offset + duration
+            waveform, sample_rate = load_audio_window(path, offset, end)
+            signal = waveform.mean(dim=0).numpy()
+            groups.setdefault((sample_rate, signal.shape[0]), []).append((index, signal))
+        signals = [None] * len(paths)
+        for (sample_rate, length), members in groups.items():
+            batch = np.stack([signal for _, signal in members], axis=1)
+            if sample_rate != self.sample_rate:
+                resampled = soxr.resample(batch, sample_rate, self.sample_rate, quality="hq")
+                # Same length as librosa's fix_length
+                batch = np.zeros((math.ceil(length * self.sample_rate / sample_rate), len(members)), dtype=np.float32)
+                batch[:len(resampled)] = resampled[:len(batch)]
+            batch = torch.from_numpy(np.ascontiguousarray(batch.T)).to(self.device)
+            for (index, _), signal in zip(members, batch):
+                signals[index] = signal
+        return signals
+
+    def features(self, signals: List) -> List[Dict[str, float]]:
+        """
+        Energy (sum of squared STFT magnitudes), mean spectral centroid, mean
+        zero-crossing rate and RMS of each 1-D signal tensor. With max_frames,
+        the frame means and the energy are estimated from the sampled frames.
+        """
+        import torch
+        pad = self.n_fft // 2
+        hop = self.hop_length
+        # Signals laid end to end, each centered with pad samples on both sides and
+        # rounded up to whole hops: zero padding for the STFT, edge padding for
+        # zero crossings. Frame t of a signal is frame first_frame + t of the buffer.
+        zero_parts, edge_parts, first_frames, lengths = [], [], [], []
+        position = 0
+        for signal in signals:
+            length = signal.shape[0]
+            size = -(-(length + 2 * pad) // hop) * hop
+            ends = signal[[0, -1]] if length else signal.new_zeros(2)
+            zero_parts += [signal.new_zeros(pad), signal, signal.new_zeros(size - pad - length)]
+            edge_parts += [ends[0].expand(pad), signal, ends[1].expand(size - pad - length)]
+            first_frames.append(position // hop)
+            lengths.append(length)
+            position += size
+        padded = torch.cat(zero_parts).to(self.device, torch.float32)
+        edge = torch.cat(edge_parts).to(self.device, torch.float32)
+        negative = edge < -ZERO_THRESHOLD
+        crossings = torch.nn.functional.pad(
+            torch.cumsum(negative[1:] != negative[:-1], dim=0, dtype=torch.int32), (1, 0))
+        del edge, negative
+        frames_view = padded.unfold(0, self.n_fft, hop)
+
+        # Frames per signal: all of them, or max_frames spread evenly over the signal
+        lengths = torch.tensor(lengths, device=self.device)
+        n_frames = 1 + lengths // hop
+        counts = n_frames if self.max_frames is None else n_frames.clamp(max=self.max_frames)
+        rows = torch.repeat_interleave(torch.arange(len(signals), device=self.device), counts)
+        steps = torch.arange(rows.shape[0], device=self.device) - (torch.cumsum(counts, 0) - counts)[rows]
+        selected = torch.tensor(first_frames, device=self.device)[rows] + steps * n_frames[rows] // counts[rows]
+
+        window = torch.hann_window(self.n_fft, device=self.device)
+        freqs = torch.linspace(0, self.sample_rate / 2, self.n_fft // 2 + 1, device=self.device)
+        tiny = torch.finfo(torch.float32).tiny
+        energy = torch.zeros(len(signals), dtype=torch.float64, device=self.device)
+        centroid = torch.zeros_like(energy)
+        zcr = torch.zeros_like(energy)
+        with torch.no_grad():
+            for start in range(0, rows.shape[0], CHUNK_FRAMES):
+                check_cancelled()
+                row = rows[start:start + CHUNK_FRAMES]
+                index = selected[start:start + CHUNK_FRAMES]
+                magnitude = torch.fft.rfft(frames_view[index] * window).abs()
+                total = magnitude.sum(dim=-1)
+                # librosa leaves all-but-silent frames unnormalized
+                total = torch.where(total < tiny, torch.ones_like(total), total)
+                first = index * hop
+                frame_zcr = (crossings[first + self.n_fft - 1] - crossings[first]) / self.n_fft
+                energy.index_add_(0, row, (magnitude ** 2).sum(dim=-1).double())
+                centroid.index_add_(0, row, ((magnitude * freqs).sum(dim=-1) / total).double())
+                zcr.index_add_(0, row, frame_zcr.double())
+            rms = torch.stack([(signal.double() ** 2).sum() for signal in signals]).to(self.device)
+            rms = torch.sqrt(rms / lengths.clamp(min=1))
+
+        scale = n_frames.double() / counts.double()
+        return [{
+            "energy": float(e),
+            "spectral_centroid": float(c),
+            "zero_crossing_rate": float(z),
+            "rms_energy": float(r)
+        } for e, c, z, r in zip((energy * scale).tolist(), (centroid / counts).tolist(),
+                                (zcr / counts).tolist(), rms.tolist())]
+
+    def analyze(self, jobs: List[Dict]) -> List[Dict[str, Dict[str, float]]]:
+        """
+        Stem features of several jobs in one batched pass.
+
+        Each job is {"stems": {name: path}, "original": path (optional),
+        "offset": seconds, "duration": seconds}; offset/duration select the part
+        of the original the stems cover. With an original, every stem also gets
+        its energy_ratio (stem energy / original energy).
+
+        Returns:
+            Per job, stem name -> features
+        """
+        paths, offsets, durations = [], [], []
+        for job in jobs:
+            if job.get("original"):
+                paths.append(job["original"])
+                offsets.append(job.get("offset", 0.0))
+                durations.append(job.get("duration"))
+            for stem_path in job["stems"].values():
+                paths.append(stem_path)
+                offsets.append(0.0)
+                durations.append(None)
+        features = iter(self.features(self.load(paths, offsets, durations)))
+
+        results = []
+        for job in jobs:
+            original = next(features) if job.get("original") else None
+            stems = {}
+            for stem_name in job["stems"]:
+                stems[stem_name] = next(features)
+                if original is not None:
+                    stems[stem_name]["energy_ratio"] = (stems[stem_name]["energy"] / original["energy"]
+                                                        if original["energy"] > 0 else 0.0)
+            results.append(stems)
+        return results
+
+    def analyze_job(self, stems: Dict[str, str], original: Optional[str] = None, offset: float = 0.0,
+                    duration: Optional[float] = None) -> Dict[str, Dict[str, float]]:
+        """Stem features of one job (see analyze)."""
+        return self.analyze([{"stems": stems, "original": original, "offset": offset,
+                              "duration": duration}])[0]
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Memory-mapped stem store for Song Splitter.
+All stems of a job live in one file with a small fixed-size header followed by
+a float32 sample array laid out stem-major as (stems, frames, channels). Any
+time range of any stem is then a contiguous region of the file, so readers get
+zero-copy numpy views of exactly the samples they ask for.
+
+    bytes 0-7        magic b"SSTEMS01"
+    bytes 8-11       header JSON length (little-endian uint32)
+    bytes 12-4095    header JSON (sample_rate, channels, frames, stems, dtype)
+    bytes 4096-      samples
+"""
+
+import json
+import struct
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+MAGIC = b"SSTEMS01"
+HEADER_SIZE = 4096
+DTYPE = "<f4"
+STORE_SUFFIX = ".stems"
+
+class StemStoreWriter:
+    """Creates a stem store of known size and fills it section by section."""
+
+    def __init__(self, path: str, stems: List[str], sample_rate: int, channels: int, frames: int):
+        self.path = str(path)
+        self.stems = list(stems)
+        header = json.dumps({
+            "sample_rate": sample_rate,
+            "channels": channels,
+            "frames": frames,
+            "stems": self.stems,
+            "dtype": DTYPE
+        }).encode()
+        if len(header) > HEADER_SIZE - 12:
+            raise ValueError("Stem store header too large")
+        with open(self.path, 'wb') as f:
+            f.write(MAGIC + struct.pack('<I', len(header)) + header)
+            f.write(b'\0' * (HEADER_SIZE - 12 - len(header)))
+        self._data = np.memmap(self.path, dtype=DTYPE, mode='r+', offset=HEADER_SIZE,
+                               shape=(len(self.stems), frames, channels))
+
+    def write(self, start_frame: int, sources):
+        """Write (stems, channels, time) sources starting at start_frame."""
+        if hasattr(sources, "detach"):
+            sources = sources.detach().cpu().numpy()
+        end_frame = start_frame + sources.shape[-1]
+        for index in range(len(self.stems)):
+            self._data[index, start_frame:end_frame] = sources[index].T
+
+    def close(self):
+        if self._data is not None:
+            self._data.flush()
+            self._data = None
+
+def write_stem_store(path: str, stems: List[str], sources, sample_rate: int) -> str:
+    """Write (stems, channels, time) sources to a new stem store in one go."""
+    writer = StemStoreWriter(path, stems, sample_rate, sources.shape[1], sources.shape[2])
+    writer.write(0, sources)
+    writer.close()
+    return str(path)
+
+class StemStore:
+    """Read-only, memory-mapped access to a stem store."""
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        with open(self.path, 'rb') as f:
+            prefix = f.read(12)
+            if prefix[:8] != MAGIC:
+                raise ValueError(f"Not a stem store: {path}")
+            header_length = struct.unpack('<I', prefix[8:])[0]
+            header = json.loads(f.read(header_length))
+        self.sample_rate = header["sample_rate"]
+        self.channels = header["channels"]
+        self.frames = header["frames"]
+        self.stems = header["stems"]
+        self._data = np.memmap(self.path, dtype=header["dtype"], mode='r', offset=HEADER_SIZE,
+                               shape=(len(self.stems), self.frames, self.channels))
+
+    @property
+    def duration(self) -> float:
+        return self.frames / self.sample_rate
+
+    def read_frames(self, stem: str, start_frame: int = 0, end_frame: Optional[int] = None) -> np.ndarray:
+        """Zero-copy (frames, channels) view of frames [start_frame, end_frame) of a stem."""
+        if stem not in self.stems:
+            raise KeyError(f"Stem not found: {stem}")
+        end_frame = self.frames if end_frame is None else min(end_frame, self.frames)
+        start_frame = max(0, min(start_frame, end_frame))
+        return self._data[self.stems.index(stem), start_frame:end_frame]
+
+    def read(self, stem: str, start: float = 0.0, end: Optional[float] = None) -> np.ndarray:
+        """Zero-copy (frames, channels) view of the [start, end) seconds of a stem."""
+        end_frame = None if end is None else int(round(end * self.sample_rate))
+        return self.read_frames(stem, int(round(start * self.sample_rate)), end_frame)
+
+    def info(self) -> Dict:
+        return {
+            "sample_rate": self.sample_rate,
+            "channels": self.channels,
+            "frames": self.frames,
+            "duration": self.duration,
+            "stems": self.stems
+        }
+
+def store_path_for(output_dir: str, prefix: str) -> str:
+    """Conventional location of a job's stem store."""
+    return str(Path(output_dir) / f"{prefix}{STORE_SUFFIX}")
@@ -0,0 +1,26 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# The backend modules import each other as top-level modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+@pytest.fixture(scope="session")
+def api(tmp_path_factory):
+    """flask_api in local mode, without warm-up, working in a temporary directory."""
+    # The API keeps uploads and outputs relative to the working directory
+    cwd, environ = os.getcwd(), dict(os.environ)
+    os.chdir(tmp_path_factory.mktemp("api"))
+    os.environ["SONG_SPLITTER_WARMUP_SECONDS"] = "0"
+    os.environ.pop("SONG_SPLITTER_INFERENCE_ADDRESS", None)
+    import flask_api
+    yield flask_api
+    os.chdir(cwd)
+    os.environ.clear()
+    os.environ.update(environ)
+
+@pytest.fixture
+def client(api):
+    return api.app.test_client()
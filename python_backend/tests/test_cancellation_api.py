@@ -0,0 +1,122 @@
+import io
+import os
+import time
+import threading
+from pathlib import Path
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from cancellation import check_cancelled
+
+SAMPLE_RATE = 44100
+
+class StubSplitter:
+    """Stands in for SongSplitter: writes a partial stem, then runs until released or cancelled."""
+
+    model_name = "htdemucs"
+    max_chunk_seconds = None
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def separate_audio(self, input_path, output_dir, quality=None, stats=None, store=False):
+        stem_path = str(Path(output_dir) / "vocals.wav")
+        sf.write(stem_path, np.zeros((SAMPLE_RATE // 10, 2), dtype=np.float32), SAMPLE_RATE)
+        self.started.set()
+        while not self.release.wait(0.01):
+            check_cancelled()
+        stats.update({"audio_seconds": 1.0, "separation_time": 0.1, "sample_rate": SAMPLE_RATE})
+        return {"vocals": stem_path}
+
+    def analyze_quality(self, original_path, stems, offset=0.0, duration=None):
+        return {}
+
+@pytest.fixture
+def splitter(api, monkeypatch):
+    stub = StubSplitter()
+    monkeypatch.setattr(api, "splitter", stub)
+    yield stub
+    stub.release.set()
+
+def upload(client, client_id="tester"):
+    # Different noise every time, so no upload is deduplicated against an earlier one
+    audio = io.BytesIO()
+    signal = np.random.default_rng().uniform(-0.5, 0.5, (SAMPLE_RATE, 2)).astype(np.float32)
+    sf.write(audio, signal, SAMPLE_RATE, format="WAV")
+    audio.seek(0)
+    response = client.post("/api/upload", data={"file": (audio, "song.wav")},
+                           content_type="multipart/form-data", headers={"X-Client-Id": client_id})
+    assert response.status_code == 200
+    return response.get_json()["job_id"]
+
+def separate(client, job_id, client_id="tester", **options):
+    return client.post(f"/api/separate/{job_id}", json=options, headers={"X-Client-Id": client_id})
+
+def wait_for_status(client, job_id, status, timeout=10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(f"/api/status/{job_id}").get_json()
+        if job["status"] == status:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} is {job['status']}, expected {status}")
+
+def test_completed_job(api, client, splitter):
+    job_id = upload(client)
+    assert separate(client, job_id).status_code == 200
+    assert splitter.started.wait(10)
+    splitter.release.set()
+    job = wait_for_status(client, job_id, "completed")
+    assert os.path.exists(job["stems"]["vocals"])
+
+def test_cancel_uploaded_job_removes_upload(api, client, splitter):
+    job_id = upload(client)
+    upload_path = api.processing_jobs[job_id]["file_path"]
+    assert os.path.exists(upload_path)
+
+    assert client.post(f"/api/cancel/{job_id}").get_json()["status"] == "cancelled"
+    assert not os.path.exists(upload_path)
+    assert client.post(f"/api/cancel/{job_id}").status_code == 409
+
+def test_cancel_queued_and_running_jobs(api, client, splitter):
+    running_id, queued_id = upload(client), upload(client)
+    assert separate(client, running_id).status_code == 200
+    assert splitter.started.wait(10)
+    # One slot and a quota of one job per client: the second job waits
+    assert separate(client, queued_id).status_code == 200
+    assert client.get(f"/api/status/{queued_id}").get_json()["status"] == "queued"
+    running_upload = api.processing_jobs[running_id]["file_path"]
+    queued_upload = api.processing_jobs[queued_id]["file_path"]
+
+    assert client.post(f"/api/cancel/{queued_id}").get_json()["status"] == "cancelled"
+    assert not os.path.exists(queued_upload)
+    assert not (api.OUTPUT_FOLDER / queued_id).exists()
+
+    assert (api.OUTPUT_FOLDER / running_id / "vocals.wav").exists()
+    assert client.post(f"/api/cancel/{running_id}").get_json()["status"] == "cancelling"
+    job = wait_for_status(client, running_id, "cancelled")
+    assert job["error"] == "cancelled" and job["stems"] == {}
+    assert not os.path.exists(running_upload)
+    assert not (api.OUTPUT_FOLDER / running_id).exists()
+
+def test_deadline_stops_running_job(api, client, splitter):
+    job_id = upload(client)
+    upload_path = api.processing_jobs[job_id]["file_path"]
+    assert separate(client, job_id, deadline_seconds=0.3).status_code == 200
+    assert splitter.started.wait(10)
+
+    job = wait_for_status(client, job_id, "cancelled")
+    assert job["error"] == "deadline exceeded"
+    assert not os.path.exists(upload_path)
+    assert not (api.OUTPUT_FOLDER / job_id).exists()
+
+@pytest.mark.parametrize("deadline", [0, -5, "0", "-1.5", "nan", "soon"])
+def test_non_positive_deadline_rejected(api, client, splitter, deadline):
+    job_id = upload(client)
+    response = separate(client, job_id, deadline_seconds=deadline)
+    assert response.status_code == 400
+    assert "deadline_seconds" in response.get_json()["error"]
+    assert api.processing_jobs[job_id]["status"] == "uploaded"
@@ -0,0 +1,59 @@
+import io
+
+import numpy as np
+import soundfile as sf
+
+from hls_stream import HlsStemWriter, read_manifest
+
+SAMPLE_RATE = 44100
+STEMS = ["vocals", "drums"]
+
+def playlist(directory, stem):
+    return (directory / f"{stem}.m3u8").read_text().splitlines()
+
+def test_playlist_stays_event_and_ends(tmp_path):
+    writer = HlsStemWriter(str(tmp_path), STEMS, SAMPLE_RATE, 2)
+    audio = np.random.default_rng(0).uniform(-0.5, 0.5, (len(STEMS), 2, SAMPLE_RATE)).astype(np.float32)
+    for _ in range(5):
+        writer.append(audio)
+
+    live = playlist(tmp_path, "vocals")
+    assert "#EXT-X-PLAYLIST-TYPE:EVENT" in live
+    assert "#EXT-X-ENDLIST" not in live
+    assert 0 < read_manifest(str(tmp_path))["segments"] < 3
+
+    writer.close()
+    for stem in STEMS:
+        final = playlist(tmp_path, stem)
+        # RFC 8216: an EVENT playlist keeps its type; completion only appends ENDLIST
+        assert [line for line in final if line.startswith("#EXT-X-PLAYLIST-TYPE")] == ["#EXT-X-PLAYLIST-TYPE:EVENT"]
+        assert final[-1] == "#EXT-X-ENDLIST"
+    # Published segments stay listed
+    assert set(line for line in live if line.endswith(".mp3")) <= set(playlist(tmp_path, "vocals"))
+    manifest = read_manifest(str(tmp_path))
+    assert manifest["complete"]
+    assert abs(manifest["available_seconds"] - 5.0) < 0.1
+
+def upload(client):
+    audio = io.BytesIO()
+    sf.write(audio, np.zeros((SAMPLE_RATE, 2), dtype=np.float32), SAMPLE_RATE, format="WAV")
+    audio.seek(0)
+    response = client.post("/api/upload", data={"file": (audio, "song.wav")},
+                           content_type="multipart/form-data")
+    return response.get_json()["job_id"]
+
+def test_stream_is_separated_progressively(api, client, monkeypatch):
+    submitted = {}
+    monkeypatch.setattr(api, "submit_job", lambda job_id, **options: submitted.update(options))
+    job_id = upload(client)
+
+    assert client.post(f"/api/separate/{job_id}", json={"stream": True}).status_code == 200
+    assert submitted["stream"] and submitted["progressive"]
+
+def test_stream_of_excerpt_rejected(api, client, monkeypatch):
+    monkeypatch.setattr(api, "submit_job", lambda job_id, **options: None)
+    job_id = upload(client)
+
+    response = client.post(f"/api/separate/{job_id}", json={"stream": True, "start": 5, "end": 10})
+    assert response.status_code == 400
+    assert api.processing_jobs[job_id]["status"] == "uploaded"
@@ -0,0 +1,116 @@
+import time
+import threading
+
+import pytest
+
+from memory_budget import MemoryGate
+from scheduler import JobScheduler, resolve_priority
+
+class Jobs:
+    """Jobs that record when they start and run until finished by the test."""
+
+    def __init__(self):
+        self.started = []
+        self._finish = {}
+        self._changed = threading.Condition()
+
+    def run(self, job_id):
+        self._finish[job_id] = threading.Event()
+
+        def run():
+            with self._changed:
+                self.started.append(job_id)
+                self._changed.notify_all()
+            self._finish[job_id].wait(10)
+        return run
+
+    def wait_started(self, count):
+        with self._changed:
+            assert self._changed.wait_for(lambda: len(self.started) >= count, timeout=10)
+        # Give the scheduler a moment to (wrongly) start more
+        time.sleep(0.05)
+        return list(self.started)
+
+    def finish(self, job_id):
+        self._finish[job_id].set()
+
+    def drain(self, job_ids):
+        """Finish jobs one at a time; returns the order they started in."""
+        for count, job_id in enumerate(job_ids, 1):
+            started = self.wait_started(count)
+            self.finish(started[-1])
+        return self.started
+
+def submit(scheduler, jobs, job_id, **kwargs):
+    scheduler.submit(job_id, jobs.run(job_id), **kwargs)
+
+def test_priority_then_shortest_job_first():
+    scheduler, jobs = JobScheduler(max_running=1, client_quota=10), Jobs()
+    submit(scheduler, jobs, "blocker", expected_seconds=1)
+    jobs.wait_started(1)
+    submit(scheduler, jobs, "batch-short", priority="batch", expected_seconds=1)
+    submit(scheduler, jobs, "interactive-long", expected_seconds=100)
+    submit(scheduler, jobs, "preview", priority="preview", expected_seconds=1)
+    submit(scheduler, jobs, "interactive-short", expected_seconds=10)
+    submit(scheduler, jobs, "interactive-short-later", expected_seconds=10)
+
+    order = jobs.drain(["blocker", "interactive-short", "interactive-short-later",
+                        "interactive-long", "preview", "batch-short"])
+    assert order == ["blocker", "interactive-short", "interactive-short-later",
+                     "interactive-long", "preview", "batch-short"]
+
+def test_client_quota_lets_other_clients_through():
+    scheduler, jobs = JobScheduler(max_running=2, client_quota=1), Jobs()
+    submit(scheduler, jobs, "album-1", client_id="album", expected_seconds=1)
+    submit(scheduler, jobs, "album-2", client_id="album", expected_seconds=1)
+    submit(scheduler, jobs, "single", client_id="other", expected_seconds=50)
+
+    assert sorted(jobs.wait_started(2)) == ["album-1", "single"]
+    assert scheduler.queue_info("album-2")["state"] == "waiting"
+    jobs.finish("single")
+    # A free slot alone is not enough: the album client is still at its quota
+    assert jobs.wait_started(2) == ["album-1", "single"]
+    jobs.finish("album-1")
+    assert jobs.wait_started(3)[-1] == "album-2"
+    jobs.finish("album-2")
+
+def test_memory_gate_holds_later_jobs_back():
+    scheduler = JobScheduler(max_running=3, client_quota=10, memory=MemoryGate(100))
+    jobs = Jobs()
+    submit(scheduler, jobs, "running", expected_seconds=1, memory_bytes=60)
+    jobs.wait_started(1)
+    submit(scheduler, jobs, "long", expected_seconds=5, memory_bytes=80)
+    submit(scheduler, jobs, "small", expected_seconds=10, memory_bytes=10)
+
+    # "small" would fit, but starting it ahead of "long" could starve it
+    assert jobs.wait_started(1) == ["running"]
+    jobs.finish("running")
+    assert jobs.wait_started(3)[1:] == ["long", "small"]
+    jobs.finish("long")
+    jobs.finish("small")
+
+def test_predicted_wait():
+    scheduler, jobs = JobScheduler(max_running=2, client_quota=10), Jobs()
+    assert scheduler.predicted_wait("interactive", 30) == 0.0
+    submit(scheduler, jobs, "a", expected_seconds=100)
+    submit(scheduler, jobs, "b", expected_seconds=60)
+    jobs.wait_started(2)
+    submit(scheduler, jobs, "waiting-interactive", expected_seconds=40)
+    submit(scheduler, jobs, "waiting-batch", priority="batch", expected_seconds=10)
+
+    # Running work left (160 s) plus waiting jobs ordered ahead, over two slots
+    assert scheduler.predicted_wait("interactive", 50) == pytest.approx((160 + 40) / 2, abs=0.5)
+    assert scheduler.predicted_wait("interactive", 20) == pytest.approx(160 / 2, abs=0.5)
+    assert scheduler.predicted_wait("batch", 20) == pytest.approx((160 + 40 + 10) / 2, abs=0.5)
+    info = scheduler.queue_info("waiting-batch")
+    assert info["position"] == 2
+    assert info["eta_seconds"] == pytest.approx((160 + 40) / 2 + 10, abs=0.5)
+
+    for job_id in ("a", "b", "waiting-interactive", "waiting-batch"):
+        jobs.finish(job_id)
+
+def test_resolve_priority():
+    assert resolve_priority(None) == "interactive"
+    assert resolve_priority("BATCH") == "batch"
+    with pytest.raises(ValueError):
+        resolve_priority("urgent")
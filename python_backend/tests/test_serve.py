@@ -0,0 +1,67 @@
+import sys
+import time
+import socket
+import subprocess
+
+import pytest
+
+from serve import wait_for_socket
+
+AUTHKEY = b"test-key"
+
+# Listens only after a delay, like an inference process importing its modules
+LATE_LISTENER = """
+import sys, time
+from multiprocessing.connection import Listener
+time.sleep(float(sys.argv[2]))
+host, _, port = sys.argv[1].rpartition(':')
+address = (host, int(port)) if port.isdigit() else sys.argv[1]
+listener = Listener(address, authkey=b"test-key")
+while True:
+    try:
+        listener.accept().close()
+    except Exception:
+        pass
+"""
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+@pytest.fixture
+def listener():
+    processes = []
+
+    def start(address, delay):
+        process = subprocess.Popen([sys.executable, "-c", LATE_LISTENER, address, str(delay)])
+        processes.append(process)
+        return process
+
+    yield start
+    for process in processes:
+        process.kill()
+        process.wait()
+
+@pytest.mark.parametrize("kind", ["tcp", "unix"])
+def test_waits_until_listening(listener, tmp_path, kind):
+    address = f"127.0.0.1:{free_port()}" if kind == "tcp" else str(tmp_path / "inference.sock")
+    process = listener(address, 1.0)
+    started = time.time()
+    assert wait_for_socket(process, address, AUTHKEY, timeout=30)
+    assert time.time() - started >= 1.0
+
+def test_gives_up_when_process_exits():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    assert not wait_for_socket(process, f"127.0.0.1:{free_port()}", AUTHKEY, timeout=30)
+
+def test_gives_up_after_timeout(listener):
+    address = f"127.0.0.1:{free_port()}"
+    process = listener(address, 60)
+    assert not wait_for_socket(process, address, AUTHKEY, timeout=0.5)
+
+def test_health_reports_variant_cache_of_http_process(api, client, monkeypatch):
+    monkeypatch.setattr(api.variant_cache, "stats", lambda: {"hits": 7})
+    assert client.get("/api/health").get_json()["variant_cache"] == {"hits": 7}
+    # The inference process never serves downloads, so it does not report them
+    assert "variant_cache" not in api.health_info()
@@ -0,0 +1,71 @@
+import os
+import multiprocessing
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pytest
+
+from shared_tensors import SharedTensor, _lock_path
+
+def segment_exists(name):
+    try:
+        SharedMemory(name=name).close()
+    except FileNotFoundError:
+        return False
+    return True
+
+def double_and_release(handle):
+    """Worker side: write through the mapping, then drop the reference it was given."""
+    handle.array()[...] *= 2
+    handle.release()
+
+def attach_and_exit(handle, replies):
+    replies.put(float(handle.array().sum()))
+
+@pytest.fixture
+def spawn():
+    context = multiprocessing.get_context("spawn")
+
+    def run(target, *args):
+        process = context.Process(target=target, args=args)
+        process.start()
+        process.join(60)
+        assert process.exitcode == 0
+
+    run.context = context
+    return run
+
+def test_spawned_process_writes_and_releases(spawn):
+    handle = SharedTensor.from_array(np.arange(6, dtype=np.float32).reshape(2, 3))
+    handle.retain()
+    assert handle.refcount() == 2
+
+    spawn(double_and_release, handle)
+    assert handle.refcount() == 1
+    np.testing.assert_array_equal(handle.array(), np.arange(6, dtype=np.float32).reshape(2, 3) * 2)
+    handle.release()
+
+def test_last_release_unlinks(spawn):
+    handle = SharedTensor.empty((4,))
+    name = handle.name
+    handle.retain()
+
+    spawn(double_and_release, handle)
+    assert segment_exists(name)
+    assert os.path.exists(_lock_path(name))
+
+    handle.release()
+    assert not segment_exists(name)
+    assert not os.path.exists(_lock_path(name))
+
+def test_attached_process_exit_keeps_segment(spawn):
+    handle = SharedTensor.from_array(np.ones(8, dtype=np.float32))
+    replies = spawn.context.Queue()
+
+    spawn(attach_and_exit, handle, replies)
+    assert replies.get(timeout=10) == 8.0
+    # Only the reference count decides when the segment goes away
+    assert segment_exists(handle.name)
+    assert handle.refcount() == 1
+    handle.release()
+    assert not segment_exists(handle.name)
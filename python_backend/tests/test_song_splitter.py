@@ -0,0 +1,23 @@
+from song_splitter import SongSplitter
+
+class Pool:
+    """Stands in for a separator's worker processes."""
+
+    def __init__(self):
+        self.running = True
+
+    def shutdown(self):
+        assert self.running, "shut down twice"
+        self.running = False
+
+def test_close_stops_worker_pools():
+    splitter = SongSplitter(workers=2, parallel_bag=True)
+    pool = splitter._parallel = Pool()
+    bags = splitter._bag_separators = {"htdemucs_ft": Pool(), "other_bag": Pool()}
+
+    splitter.close()
+    assert not pool.running
+    assert not any(bag.running for bag in bags.values())
+    assert splitter._parallel is None and splitter._bag_separators == {}
+    # Closing again (e.g. from atexit after an explicit close) does nothing
+    splitter.close()
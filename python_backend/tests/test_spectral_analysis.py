@@ -0,0 +1,63 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+pytest.importorskip("librosa")
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "tools"))
+
+from spectral_analysis import SpectralAnalyzer
+from validate_analysis import compare, librosa_metrics
+
+SAMPLE_RATE = 44100
+SECONDS = 8
+# Largest relative difference from librosa: full analysis matches to float32
+# precision; sampling 50 frames per signal estimates the means to a few percent
+FULL_TOLERANCE = 1e-5
+SAMPLED_FRAMES = 50
+SAMPLED_TOLERANCE = 0.02
+
+@pytest.fixture(scope="module")
+def job(tmp_path_factory):
+    """A synthetic mix and its four stems, as separated WAV files."""
+    directory = tmp_path_factory.mktemp("analysis")
+    t = np.arange(SAMPLE_RATE * SECONDS) / SAMPLE_RATE
+    rng = np.random.default_rng(0)
+    stems = {
+        "vocals": 0.3 * (0.6 + 0.4 * np.sin(2 * np.pi * 0.25 * t)) * np.sin(2 * np.pi * 440 * t + 3 * np.sin(2 * np.pi * 5 * t)),
+        "bass": 0.4 * np.sin(2 * np.pi * 55 * t),
+        "drums": 0.3 * rng.standard_normal(t.size) * (0.7 + 0.3 * np.sin(2 * np.pi * 0.7 * t)),
+        "other": 0.1 * rng.standard_normal(t.size)
+    }
+    paths = {}
+    for name, signal in list(stems.items()) + [("mix", sum(stems.values()))]:
+        paths[name] = str(directory / f"{name}.wav")
+        sf.write(paths[name], np.stack([signal, 0.9 * signal], axis=1).astype(np.float32), SAMPLE_RATE)
+    original = paths.pop("mix")
+    return {"original": original, "stems": paths,
+            "reference": librosa_metrics(original, paths)}
+
+def test_full_analysis_matches_librosa(job):
+    result = SpectralAnalyzer().analyze_job(job["stems"], job["original"])
+    errors = compare([job["reference"]], [result])
+    assert max(errors.values()) < FULL_TOLERANCE, errors
+
+def test_sampled_analysis_close_to_librosa(job):
+    result = SpectralAnalyzer(max_frames=SAMPLED_FRAMES).analyze_job(job["stems"], job["original"])
+    errors = compare([job["reference"]], [result])
+    assert max(errors.values()) < SAMPLED_TOLERANCE, errors
+
+def test_batched_jobs_match_single_jobs(job):
+    analyzer = SpectralAnalyzer()
+    excerpt = {"stems": {"vocals": job["stems"]["vocals"]}, "original": job["original"],
+               "offset": 1.0, "duration": 2.0}
+    batched = analyzer.analyze([{"stems": job["stems"], "original": job["original"]}, excerpt])
+    single = [analyzer.analyze_job(job["stems"], job["original"]),
+              analyzer.analyze_job(excerpt["stems"], excerpt["original"], 1.0, 2.0)]
+    for batched_job, single_job in zip(batched, single):
+        for stem, metrics in single_job.items():
+            for name, value in metrics.items():
+                assert batched_job[stem][name] == pytest.approx(value, rel=1e-9)
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+import soundfile as sf
+
+from stem_pack import StemPack, StemPackWriter, pack_stems
+
+SAMPLE_RATE = 8000
+STEMS = ["vocals", "drums", "bass"]
+
+def sources(frames, channels=2, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(-0.9, 0.9, (len(STEMS), channels, frames)).astype(np.float32)
+
+def write_pack(path, audio, block_frames=1000, sample_format="float32", chunk=777, metadata=None):
+    writer = StemPackWriter(str(path), STEMS, SAMPLE_RATE, audio.shape[1], block_frames, sample_format)
+    # Appends that do not line up with blocks
+    for start in range(0, audio.shape[2], chunk):
+        writer.append(audio[:, :, start:start + chunk])
+    return writer.close(metadata)
+
+def test_round_trip(tmp_path):
+    audio = sources(4321)
+    pack = StemPack(write_pack(tmp_path / "song.sspack", audio, metadata={"title": "Song"}))
+
+    assert (pack.sample_rate, pack.channels, pack.stems, pack.frames) == (SAMPLE_RATE, 2, STEMS, 4321)
+    assert pack.metadata == {"title": "Song"}
+    np.testing.assert_array_equal(pack.read_range(), audio.transpose(0, 2, 1))
+    np.testing.assert_array_equal(pack.read("drums"), audio[1].T)
+
+@pytest.mark.parametrize("start_frame, end_frame", [(0, 1), (999, 1001), (1000, 2000), (2500, 4321), (4000, None)])
+def test_range_reads(tmp_path, start_frame, end_frame):
+    audio = sources(4321)
+    pack = StemPack(write_pack(tmp_path / "song.sspack", audio))
+    end = None if end_frame is None else end_frame / SAMPLE_RATE
+
+    expected = audio[:, :, start_frame:end_frame].transpose(0, 2, 1)
+    np.testing.assert_array_equal(pack.read_range(start_frame / SAMPLE_RATE, end), expected)
+
+    # The byte range alone (what an HTTP Range request returns) holds the samples
+    offset, length, first_frame = pack.byte_range(start_frame / SAMPLE_RATE, end)
+    with open(pack.path, "rb") as f:
+        f.seek(offset)
+        data = f.read(length)
+    blocks = np.frombuffer(data, dtype=pack.dtype).reshape(-1, len(STEMS), pack.block_frames, 2)
+    audio_range = blocks.transpose(1, 0, 2, 3).reshape(len(STEMS), -1, 2)
+    stop = pack.frames if end_frame is None else end_frame
+    np.testing.assert_array_equal(audio_range[:, start_frame - first_frame:stop - first_frame], expected)
+
+def test_empty_and_out_of_bounds_ranges(tmp_path):
+    pack = StemPack(write_pack(tmp_path / "song.sspack", sources(2000)))
+    assert pack.read_range(0.1, 0.1).shape == (len(STEMS), 0, 2)
+    assert pack.read_range(10.0, 20.0).shape == (len(STEMS), 0, 2)
+    assert pack.read_range(0.2, 10.0).shape == (len(STEMS), 400, 2)
+
+def test_pcm16_round_trip(tmp_path):
+    audio = sources(3000, channels=1)
+    pack = StemPack(write_pack(tmp_path / "song.sspack", audio, sample_format="pcm16"))
+    np.testing.assert_allclose(pack.read("bass", 0.1, 0.3), audio[2, :, 800:2400].T, atol=1 / 32767)
+
+def test_pack_stems_from_files(tmp_path):
+    audio = sources(5000)
+    stem_paths = {}
+    for name, stem in zip(STEMS, audio):
+        stem_paths[name] = str(tmp_path / f"{name}.wav")
+        sf.write(stem_paths[name], stem.T, SAMPLE_RATE, subtype="FLOAT")
+    pack = StemPack(pack_stems(stem_paths, str(tmp_path / "song.sspack"), block_frames=1024))
+    np.testing.assert_array_equal(pack.read_range(), audio.transpose(0, 2, 1))
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "song.wav"
+    sf.write(str(path), np.zeros((100, 2), dtype=np.float32), SAMPLE_RATE)
+    with pytest.raises(ValueError):
+        StemPack(str(path))
+    truncated = tmp_path / "truncated.sspack"
+    truncated.write_bytes(open(write_pack(tmp_path / "song.sspack", sources(2000)), "rb").read()[:-10])
+    with pytest.raises(ValueError):
+        StemPack(str(truncated))
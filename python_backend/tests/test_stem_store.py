@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from stem_store import StemStore, StemStoreWriter, write_stem_store
+
+SAMPLE_RATE = 8000
+STEMS = ["vocals", "drums", "bass", "other"]
+
+def sources(frames, channels=2, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(-1, 1, (len(STEMS), channels, frames)).astype(np.float32)
+
+def test_round_trip(tmp_path):
+    audio = sources(3000)
+    store = StemStore(write_stem_store(str(tmp_path / "song.stems"), STEMS, audio, SAMPLE_RATE))
+
+    assert (store.sample_rate, store.channels, store.frames, store.stems) == (SAMPLE_RATE, 2, 3000, STEMS)
+    for index, stem in enumerate(STEMS):
+        np.testing.assert_array_equal(store.read(stem), audio[index].T)
+
+def test_sections_written_out_of_order(tmp_path):
+    audio = sources(2500, channels=1)
+    writer = StemStoreWriter(str(tmp_path / "song.stems"), STEMS, SAMPLE_RATE, 1, 2500)
+    for start in (2000, 0, 1000):
+        writer.write(start, audio[:, :, start:start + 1000])
+    writer.close()
+    np.testing.assert_array_equal(StemStore(str(tmp_path / "song.stems")).read("other"), audio[3].T)
+
+@pytest.mark.parametrize("start, end, start_frame, end_frame", [
+    (0.0, 0.125, 0, 1000),
+    (0.1, 0.2, 800, 1600),
+    (0.3, None, 2400, 3000),
+    (0.3, 10.0, 2400, 3000),
+    (0.2, 0.2, 1600, 1600),
+    (10.0, None, 3000, 3000)
+])
+def test_slices(tmp_path, start, end, start_frame, end_frame):
+    audio = sources(3000)
+    store = StemStore(write_stem_store(str(tmp_path / "song.stems"), STEMS, audio, SAMPLE_RATE))
+    np.testing.assert_array_equal(store.read("drums", start, end), audio[1, :, start_frame:end_frame].T)
+    np.testing.assert_array_equal(store.read_frames("bass", start_frame, end_frame),
+                                  audio[2, :, start_frame:end_frame].T)
+
+def test_unknown_stem_and_file(tmp_path):
+    path = write_stem_store(str(tmp_path / "song.stems"), STEMS, sources(100), SAMPLE_RATE)
+    with pytest.raises(KeyError):
+        StemStore(path).read("piano")
+    other = tmp_path / "other.bin"
+    other.write_bytes(b"\0" * 5000)
+    with pytest.raises(ValueError):
+        StemStore(str(other))
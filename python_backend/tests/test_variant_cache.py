@@ -0,0 +1,63 @@
+import os
+import time
+import multiprocessing
+
+import numpy as np
+import soundfile as sf
+
+import variant_cache
+from variant_cache import VariantCache, parse_variant
+
+def write_stem(path, seconds=1.0, sample_rate=44100):
+    sf.write(str(path), np.zeros((int(seconds * sample_rate), 2), dtype=np.float32), sample_rate)
+    return str(path)
+
+def request_variant(cache_dir, stem_path, start, results):
+    """One HTTP worker process asking for a variant; encodes are made slow to force overlap."""
+    transcode = variant_cache.transcode
+
+    def slow_transcode(*args):
+        time.sleep(0.5)
+        transcode(*args)
+
+    variant_cache.transcode = slow_transcode
+    cache = VariantCache(cache_dir, 1 << 30)
+    start.wait()
+    path = cache.get(stem_path, parse_variant("flac", sample_rate=22050))
+    results.put((path, cache.stats()["encodes"]))
+
+def test_two_processes_encode_once(tmp_path):
+    stem_path = write_stem(tmp_path / "vocals.wav")
+    context = multiprocessing.get_context("spawn")
+    start = context.Event()
+    results = context.Queue()
+    workers = [context.Process(target=request_variant,
+                               args=(str(tmp_path / "variants"), stem_path, start, results))
+               for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    start.set()
+    replies = [results.get(timeout=60) for _ in workers]
+    for worker in workers:
+        worker.join()
+
+    assert sum(encodes for _, encodes in replies) == 1
+    assert replies[0][0] == replies[1][0]
+    assert sf.info(replies[0][0]).samplerate == 22050
+
+def test_eviction_keeps_locks_and_recent_variants(tmp_path):
+    cache = VariantCache(tmp_path / "variants", max_bytes=0)
+    old_stem = write_stem(tmp_path / "old.wav")
+    new_stem = write_stem(tmp_path / "new.wav")
+    old_path = cache.get(old_stem, parse_variant("wav", sample_rate=8000))
+    # Last used well before the grace period
+    past = time.time() - 2 * variant_cache.EVICTION_GRACE_SECONDS
+    os.utime(old_path, (past, past))
+    recent_path = cache.get(old_stem, parse_variant("wav", sample_rate=16000))
+
+    cache.get(new_stem, parse_variant("wav", sample_rate=8000))
+    assert not os.path.exists(old_path)
+    assert os.path.exists(f"{old_path}.lock")
+    # Over the bound, but used too recently to evict
+    assert os.path.exists(recent_path)
+    assert cache.stats()["evictions"] == 1
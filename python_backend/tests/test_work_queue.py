@@ -0,0 +1,84 @@
+import time
+import threading
+
+from work_queue import WorkQueue
+
+LEASE = 0.2
+
+def make_nodes(tmp_path, count=3, lease_timeout=LEASE):
+    return [WorkQueue(str(tmp_path), node_id=f"node{i}", lease_timeout=lease_timeout)
+            for i in range(count)]
+
+def claim_all(nodes):
+    """Claim from every node at once; returns what each got."""
+    results = [None] * len(nodes)
+    barrier = threading.Barrier(len(nodes))
+
+    def run(index):
+        barrier.wait()
+        results[index] = nodes[index].claim()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(nodes))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_task_claimed_by_exactly_one_node(tmp_path):
+    nodes = make_nodes(tmp_path, 3, lease_timeout=60)
+    assert nodes[0].enqueue([{"input_file": "song.wav"}]) == 1
+    assert nodes[1].enqueue([{"input_file": "song.wav"}]) == 0
+
+    claims = [claim for claim in claim_all(nodes) if claim is not None]
+    assert len(claims) == 1
+    assert claims[0][1]["input_file"] == "song.wav"
+    assert all(node.claim() is None for node in nodes)
+
+def test_expired_lease_taken_over_once(tmp_path):
+    dead, *nodes = make_nodes(tmp_path, 3)
+    dead.enqueue([{"input_file": "song.wav"}])
+    task_id, _ = dead.claim()
+    time.sleep(LEASE * 1.5)
+
+    claims = [claim for claim in claim_all(nodes) if claim is not None]
+    assert [claim[0] for claim in claims] == [task_id]
+    assert all(node.claim() is None for node in nodes)
+
+def test_complete_records_once(tmp_path):
+    first, second = make_nodes(tmp_path, 2)
+    first.enqueue([{"input_file": "song.wav"}])
+    task_id, _ = first.claim()
+    time.sleep(LEASE * 1.5)
+    assert second.claim()[0] == task_id
+
+    assert second.complete(task_id, {"ok": True})
+    assert not first.complete(task_id, {"ok": True})
+    assert first.status() == {"total": 1, "done": 1, "leased": 0, "waiting": 0}
+
+def test_renew_fails_after_takeover(tmp_path):
+    first, second = make_nodes(tmp_path, 2)
+    first.enqueue([{"input_file": "song.wav"}])
+    task_id, _ = first.claim()
+    assert first.renew(task_id)
+    time.sleep(LEASE * 1.5)
+    assert second.claim()[0] == task_id
+
+    assert not first.renew(task_id)
+    assert second.renew(task_id)
+
+def test_claim_moves_on_after_losing_a_task(tmp_path, monkeypatch):
+    node, = make_nodes(tmp_path, 1, lease_timeout=60)
+    node.enqueue([{"input_file": "a.wav"}, {"input_file": "b.wav"}])
+    claimed = node._claimed
+    lost = []
+
+    def lose_first(task_id):
+        if not lost:
+            lost.append(task_id)
+            return None
+        return claimed(task_id)
+
+    monkeypatch.setattr(node, "_claimed", lose_first)
+    task_id, _ = node.claim()
+    assert task_id != lost[0]
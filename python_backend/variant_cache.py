@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+On-demand download variants of separated stems.
+Stems are stored once, as float WAV. A download may ask for another format,
+bitrate or sample rate; that variant is transcoded from the stem the first time
+it is requested and kept in a size-bounded cache directory (least recently
+used variants are evicted first, but never one used in the last
+EVICTION_GRACE_SECONDS, so a variant is not deleted between being returned and
+being opened for sending). Concurrent first requests for one variant, from
+threads or from other HTTP worker processes, wait on a file lock so the variant
+is encoded only once; lock files are kept when a variant is evicted, so every
+process always locks the same file.
+"""
+
+import os
+import math
+import time
+import fcntl
+import hashlib
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import numpy as np
+import soundfile as sf
+
+VARIANT_FORMATS = {
+    "wav": "audio/wav",
+    "flac": "audio/flac",
+    "mp3": "audio/mpeg"
+}
+DEFAULT_MP3_BITRATE = 320
+MIN_SAMPLE_RATE = 8000
+MAX_SAMPLE_RATE = 192000
+# MPEG-1 Layer III tops out at 48 kHz
+MAX_MP3_SAMPLE_RATE = 48000
+# Variants used this recently are never evicted
+EVICTION_GRACE_SECONDS = 60.0
+
+def parse_variant(format: Optional[str], bitrate=None, sample_rate=None) -> Optional[Dict]:
+    """
+    Validate download query parameters; None when no variant was asked for.
+
+    bitrate is in kbps ("192" or "192k", MP3 only); sample_rate in Hz.
+    """
+    if format is None and bitrate is None and sample_rate is None:
+        return None
+    format = (format or "wav").lower()
+    if format not in VARIANT_FORMATS:
+        raise ValueError(f"Unknown format '{format}'. Choose from: {', '.join(VARIANT_FORMATS)}")
+    if bitrate is not None:
+        if format != "mp3":
+            raise ValueError("bitrate only applies to mp3")
+        try:
+            bitrate = int(str(bitrate).lower().rstrip("k"))
+        except ValueError:
+            raise ValueError(f"Invalid bitrate: {bitrate}")
+        if not 32 <= bitrate <= 320:
+            raise ValueError("bitrate must be between 32 and 320 kbps")
+    elif format == "mp3":
+        bitrate = DEFAULT_MP3_BITRATE
+    if sample_rate is not None:
+        try:
+            sample_rate = int(sample_rate)
+        except ValueError:
+            raise ValueError(f"Invalid sample_rate: {sample_rate}")
+        if not MIN_SAMPLE_RATE <= sample_rate <= MAX_SAMPLE_RATE:
+            raise ValueError(f"sample_rate must be between {MIN_SAMPLE_RATE} and {MAX_SAMPLE_RATE} Hz")
+        if format == "mp3" and sample_rate > MAX_MP3_SAMPLE_RATE:
+            raise ValueError(f"mp3 sample_rate must be at most {MAX_MP3_SAMPLE_RATE} Hz")
+    return {"format": format, "bitrate": bitrate, "sample_rate": sample_rate}
+
+def variant_name(source_path: str, variant: Dict) -> str:
+    """Download file name of a variant, e.g. song_vocals_192k_22050hz.mp3."""
+    parts = [Path(source_path).stem]
+    if variant["bitrate"]:
+        parts.append(f"{variant['bitrate']}k")
+    if variant["sample_rate"]:
+        parts.append(f"{variant['sample_rate']}hz")
+    return "_".join(parts) + f".{variant['format']}"
+
+def transcode(source_path: str, target_path: str, variant: Dict):
+    """Encode a stem into the requested format, bitrate and sample rate."""
+    audio, sample_rate = sf.read(source_path, dtype='float32', always_2d=True)
+    target_rate = variant["sample_rate"]
+    if variant["format"] == "mp3" and not target_rate and sample_rate > MAX_MP3_SAMPLE_RATE:
+        # High-rate stems are brought down to what MP3 can hold
+        target_rate = MAX_MP3_SAMPLE_RATE
+    if target_rate and target_rate != sample_rate:
+        from scipy.signal import resample_poly
+        divisor = math.gcd(target_rate, sample_rate)
+        audio = resample_poly(audio, target_rate // divisor, sample_rate // divisor,
+                              axis=0).astype(np.float32)
+        sample_rate = target_rate
+    audio = np.clip(audio, -1.0, 1.0)
+
+    if variant["format"] != "mp3":
+        sf.write(target_path, audio, sample_rate, format=variant["format"].upper(), subtype='PCM_16')
+        return
+    try:
+        from pydub import AudioSegment
+        pcm = (audio * 32767).astype('<i2')
+        segment = AudioSegment(data=pcm.tobytes(), sample_width=2, frame_rate=sample_rate,
+                               channels=audio.shape[1])
+        segment.export(target_path, format="mp3", bitrate=f"{variant['bitrate']}k")
+    except (OSError, RuntimeError) as e:
+        # No ffmpeg: libsndfile's own MP3 encoder, its compression level scaled from the bitrate
+        print(f"pydub MP3 export unavailable ({e}); encoding with libsndfile")
+        level = (320 - variant["bitrate"]) / (320 - 32)
+        with sf.SoundFile(target_path, 'w', sample_rate, audio.shape[1], format='MP3',
+                          subtype='MPEG_LAYER_III', compression_level=level,
+                          bitrate_mode='CONSTANT') as f:
+            f.write(audio)
+
+@contextmanager
+def _encode_lock(path: Path):
+    with open(f"{path}.lock", 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+class VariantCache:
+    """Size-bounded directory of transcoded stems, shared by every process that serves downloads."""
+
+    def __init__(self, directory, max_bytes: int):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._counts = {"hits": 0, "encodes": 0, "evictions": 0}
+
+    def _path(self, source_path: str, variant: Dict) -> Path:
+        # The stem's size and mtime are part of the key, so a re-separated stem gets new variants
+        source = os.stat(source_path)
+        key = f"{os.path.abspath(source_path)}|{source.st_size}|{source.st_mtime_ns}|" \
+              f"{variant['format']}|{variant['bitrate']}|{variant['sample_rate']}"
+        return self.directory / f"{hashlib.sha1(key.encode()).hexdigest()}.{variant['format']}"
+
+    def get(self, source_path: str, variant: Dict) -> str:
+        """Path of the variant, transcoding it on first request."""
+        path = self._path(source_path, variant)
+        if not path.exists():
+            with _encode_lock(path):
+                if not path.exists():
+                    tmp_path = path.with_name(f".{path.stem}.{os.getpid()}.{threading.get_ident()}{path.suffix}")
+                    try:
+                        transcode(source_path, str(tmp_path), variant)
+                        os.replace(tmp_path, path)
+                    finally:
+                        if tmp_path.exists():
+                            tmp_path.unlink()
+                    self._count("encodes")
+                    self._evict(keep=path)
+                    return str(path)
+        # Mark as recently used for eviction
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return self.get(source_path, variant)
+        self._count("hits")
+        return str(path)
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counts[name] += 1
+
+    def _entries(self):
+        entries = []
+        for path in self.directory.iterdir():
+            if path.name.startswith(".") or path.suffix == ".lock":
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self, keep: Path):
+        """Delete least recently used variants until the cache fits its size bound."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        recent = time.time() - EVICTION_GRACE_SECONDS
+        for used, size, path in entries:
+            if total <= self.max_bytes or used > recent:
+                break
+            if path == keep:
+                continue
+            # The lock file stays: removing it would let two processes lock different files
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+            self._count("evictions")
+
+    def stats(self) -> Dict:
+        """Size and hit/encode/eviction counts of this process."""
+        entries = self._entries()
+        with self._lock:
+            return {
+                **self._counts,
+                "variants": len(entries),
+                "bytes": sum(size for _, size, _ in entries),
+                "max_bytes": self.max_bytes
+            }
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Shared-directory work queue for multi-node batch separation.
+Nodes that mount the same directory pull tasks from it with no external broker:
+
+    <queue_dir>/tasks/<task_id>.json    task payload (written once by enqueue)
+    <queue_dir>/leases/<task_id>.lease  claim: owner node and expiry time
+    <queue_dir>/done/<task_id>.json     result (task finished)
+
+A claim is an exclusive create of the lease file, so only one node wins it.
+Owners renew their lease while working; when a node crashes its lease expires
+and another node takes the task over by atomically renaming the stale lease
+away before claiming it; a claimer re-reads the lease afterwards and backs off
+unless it holds it. Completion is an exclusive create as well, so a task
+that was taken over can never be recorded twice. Lease expiry uses wall-clock
+time, so node clocks should agree to well within the lease timeout.
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_LEASE_TIMEOUT = 600.0
+
+def _write_atomic(path: Path, data: Dict):
+    """Write JSON to a temp file and rename it into place."""
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+def _read_json(path: Path) -> Optional[Dict]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def task_id_for(input_file: str) -> str:
+    """Stable task id for an input file, so enqueueing twice is harmless."""
+    return hashlib.sha1(str(Path(input_file).resolve()).encode()).hexdigest()[:16]
+
+class WorkQueue:
+    """A task queue living in a directory shared by all nodes."""
+
+    def __init__(self, queue_dir: str, node_id: Optional[str] = None,
+                 lease_timeout: float = DEFAULT_LEASE_TIMEOUT):
+        self.queue_dir = Path(queue_dir)
+        self.node_id = node_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_timeout = lease_timeout
+        self.tasks_dir = self.queue_dir / "tasks"
+        self.leases_dir = self.queue_dir / "leases"
+        self.done_dir = self.queue_dir / "done"
+        for directory in (self.tasks_dir, self.leases_dir, self.done_dir):
+            directory.mkdir(parents=True, exist_ok=True)
+
+    def enqueue(self, payloads: List[Dict]) -> int:
+        """Add tasks (each payload needs an "input_file"); returns how many were new."""
+        added = 0
+        for payload in payloads:
+            task_id = task_id_for(payload["input_file"])
+            task_path = self.tasks_dir / f"{task_id}.json"
+            if task_path.exists():
+                continue
+            _write_atomic(task_path, {"task_id": task_id, **payload})
+            added += 1
+        return added
+
+    def _lease_path(self, task_id: str) -> Path:
+        return self.leases_dir / f"{task_id}.lease"
+
+    def _try_lease(self, task_id: str) -> bool:
+        """Exclusively create the lease file for a task."""
+        lease = {"node": self.node_id, "expires": time.time() + self.lease_timeout}
+        try:
+            fd = os.open(self._lease_path(task_id), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, 'w') as f:
+            json.dump(lease, f)
+        return True
+
+    def _take_over_expired(self, task_id: str) -> bool:
+        """Claim a task whose owner stopped renewing its lease."""
+        lease_path = self._lease_path(task_id)
+        lease = _read_json(lease_path)
+        if lease is None or lease["expires"] > time.time():
+            return False
+        # Only one node can rename the stale lease away; it then claims afresh
+        stale_path = lease_path.with_name(f"{lease_path.name}.stale-{uuid.uuid4().hex}")
+        try:
+            os.rename(lease_path, stale_path)
+        except FileNotFoundError:
+            return False
+        if _read_json(stale_path) != lease:
+            # Another node replaced the stale lease first; put its fresh one back
+            try:
+                os.link(stale_path, lease_path)
+            except FileExistsError:
+                pass
+            os.remove(stale_path)
+            return False
+        os.remove(stale_path)
+        print(f"♻️ Taking over task {task_id} from {lease['node']} (lease expired)")
+        return self._try_lease(task_id)
+
+    def claim(self) -> Optional[Tuple[str, Dict]]:
+        """
+        Claim the next task: unleased tasks first, then ones with expired leases.
+
+        Returns:
+            (task_id, payload), or None if nothing is claimable right now
+        """
+        task_ids = sorted(path.stem for path in self.tasks_dir.glob("*.json"))
+        # Start at a node-specific offset so nodes don't all race for the same file
+        if task_ids:
+            offset = int(hashlib.sha1(self.node_id.encode()).hexdigest(), 16) % len(task_ids)
+            task_ids = task_ids[offset:] + task_ids[:offset]
+        pending = [task_id for task_id in task_ids if not (self.done_dir / f"{task_id}.json").exists()]
+
+        for take in (self._try_lease, self._take_over_expired):
+            for task_id in pending:
+                # A task lost right after claiming just moves us on to the next one
+                claimed = self._claimed(task_id) if take(task_id) else None
+                if claimed is not None:
+                    return claimed
+        return None
+
+    def _claimed(self, task_id: str) -> Optional[Tuple[str, Dict]]:
+        # A node that read the same stale lease can still rename our fresh one away
+        # and link it back, letting a third node claim in between: keep the task
+        # only if the lease on disk is ours
+        lease = _read_json(self._lease_path(task_id))
+        if lease is None or lease["node"] != self.node_id:
+            return None
+        # The task may have finished between listing and claiming
+        if (self.done_dir / f"{task_id}.json").exists():
+            self.release(task_id)
+            return None
+        return task_id, _read_json(self.tasks_dir / f"{task_id}.json")
+
+    def renew(self, task_id: str) -> bool:
+        """Extend our lease; returns False if another node has taken the task over."""
+        lease_path = self._lease_path(task_id)
+        lease = _read_json(lease_path)
+        if lease is None or lease["node"] != self.node_id:
+            return False
+        _write_atomic(lease_path, {"node": self.node_id, "expires": time.time() + self.lease_timeout})
+        return True
+
+    def complete(self, task_id: str, result: Dict) -> bool:
+        """Record a task's result exactly once; returns False if it was already done."""
+        try:
+            fd = os.open(self.done_dir / f"{task_id}.json", os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            self.release(task_id)
+            return False
+        with os.fdopen(fd, 'w') as f:
+            json.dump({"task_id": task_id, "node": self.node_id, **result}, f, indent=2)
+        self.release(task_id)
+        return True
+
+    def release(self, task_id: str):
+        """Drop our lease on a task (without completing it)."""
+        lease = _read_json(self._lease_path(task_id))
+        if lease is not None and lease["node"] == self.node_id:
+            try:
+                os.remove(self._lease_path(task_id))
+            except FileNotFoundError:
+                pass
+
+    def keep_alive(self, task_id: str) -> threading.Event:
+        """Renew a lease in the background until the returned event is set."""
+        stop = threading.Event()
+
+        def renew_loop():
+            while not stop.wait(self.lease_timeout / 3):
+                if not self.renew(task_id):
+                    print(f"⚠️ Lost lease on task {task_id}")
+                    return
+
+        threading.Thread(target=renew_loop, daemon=True).start()
+        return stop
+
+    def status(self) -> Dict[str, int]:
+        """Counts of total, done, leased and waiting tasks."""
+        task_ids = {path.stem for path in self.tasks_dir.glob("*.json")}
+        done = {path.stem for path in self.done_dir.glob("*.json")}
+        leased = {path.stem for path in self.leases_dir.glob("*.lease")} - done
+        return {
+            "total": len(task_ids),
+            "done": len(task_ids & done),
+            "leased": len(task_ids & leased),
+            "waiting": len(task_ids - done - leased)
+        }
+
+    def results(self) -> List[Dict]:
+        """Results of all finished tasks."""
+        return [result for result in (_read_json(path) for path in sorted(self.done_dir.glob("*.json")))
+                if result is not None]
@@ -11,10 +11,17 @@ from pathlib import Path
 import subprocess
 import json
 import time
+import queue
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
-def process_single_file(input_file, output_base_dir, args):
-    """Process a single audio file."""
+# Add the python_backend directory to the path
+sys.path.append(str(Path(__file__).parent.parent / "python_backend"))
+
+from cpu_affinity import affinity_preexec, available_cpus, split_cores, thread_env
+from memory_budget import GB, MemoryGate, default_budget, job_bytes, memory_profile, plan_workers
+
+def process_single_file(input_file, output_base_dir, args, cores=None):
+    """Process a single audio file, pinned to cores if given."""
     try:
         # Create output directory for this file
         file_stem = Path(input_file).stem
@@ -25,7 +32,8 @@ def process_single_file(input_file, output_base_dir, args):
             sys.executable, 'song_splitter.py',
             str(input_file),
             '--output-dir', str(output_dir),
-            '--format', args.format
+            '--format', args.format,
+            '--quality', args.quality
         ]
         
         if args.analyze:
@@ -34,11 +42,16 @@ def process_single_file(input_file, output_base_dir, args):
         if args.clip_duration:
             cmd.extend(['--clip-duration', str(args.clip_duration)])
         
+        if getattr(args, 'max_chunk_seconds', None):
+            cmd.extend(['--max-chunk-seconds', str(args.max_chunk_seconds)])
+        
         print(f"🎵 Processing: {Path(input_file).name}")
         start_time = time.time()
         
         # Run processing
-        result = subprocess.run(cmd, capture_output=True, text=True, cwd='python_backend')
+        result = subprocess.run(cmd, capture_output=True, text=True, cwd='python_backend',
+                                env=thread_env(cores) if cores else None,
+                                preexec_fn=affinity_preexec(cores) if cores else None)
         
         processing_time = time.time() - start_time
         
@@ -76,10 +89,14 @@ def main():
                        default='wav', help='Output format')
     parser.add_argument('--analyze', '-a', action='store_true', 
                        help='Perform quality analysis')
+    parser.add_argument('--quality', '-q', choices=['preview', 'standard', 'max'],
+                       default='standard', help='Quality tier')
     parser.add_argument('--clip-duration', '-d', type=int, 
                        help='Process only first N seconds')
-    parser.add_argument('--parallel', '-p', type=int, default=1, 
-                       help='Number of parallel processes')
+    parser.add_argument('--parallel', '-p', default='1', 
+                       help="Number of parallel processes, or 'auto' to fit the memory budget")
+    parser.add_argument('--memory-budget', type=float,
+                       help='RAM budget in GB for --parallel auto (default: 80%% of available memory)')
     parser.add_argument('--extensions', nargs='+', 
                        default=['mp3', 'wav', 'm4a', 'flac'],
                        help='File extensions to process')
@@ -104,6 +121,24 @@ def main():
         print(f"Looking for extensions: {args.extensions}")
         sys.exit(1)
     
+    # Size the pool from measured model and per-second footprints
+    gate = profile = None
+    args.max_chunk_seconds = None
+    if args.parallel == 'auto':
+        from song_splitter import audio_duration
+        budget = int(args.memory_budget * GB) if args.memory_budget else default_budget()
+        profile = memory_profile(quality=args.quality)
+        durations = {f: min(audio_duration(f), args.clip_duration or float('inf')) for f in audio_files}
+        args.parallel, args.max_chunk_seconds = plan_workers(profile, budget, list(durations.values()),
+                                                             len(available_cpus()))
+        gate = MemoryGate(budget - args.parallel * (profile['process_bytes'] + profile['model_bytes']))
+        print(f"🧠 Memory budget {budget / GB:.1f} GB: chunks of up to {args.max_chunk_seconds:.0f}s")
+    else:
+        try:
+            args.parallel = max(1, int(args.parallel))
+        except ValueError:
+            parser.error(f"--parallel: expected a number or 'auto', got {args.parallel!r}")
+    
     print(f"🎵 Found {len(audio_files)} audio files")
     print(f"📁 Output directory: {output_dir}")
     print(f"⚡ Parallel processes: {args.parallel}")
@@ -122,10 +157,29 @@ def main():
             result = process_single_file(audio_file, output_dir, args)
             results.append(result)
     else:
-        # Parallel processing
+        # Parallel processing; each running file holds one disjoint set of cores
+        core_sets = queue.Queue()
+        for cores in split_cores(args.parallel):
+            core_sets.put(cores)
+        
+        def process_pinned(audio_file):
+            # Long files reserve more of the budget, holding back other files
+            reservation = 0
+            if gate is not None:
+                held_seconds = min(durations[audio_file], args.max_chunk_seconds)
+                reservation = job_bytes(profile, held_seconds)
+                gate.reserve(reservation)
+            cores = core_sets.get()
+            try:
+                return process_single_file(audio_file, output_dir, args, cores)
+            finally:
+                core_sets.put(cores)
+                if reservation:
+                    gate.release(reservation)
+        
         with ThreadPoolExecutor(max_workers=args.parallel) as executor:
             futures = {
-                executor.submit(process_single_file, audio_file, output_dir, args): audio_file
+                executor.submit(process_pinned, audio_file): audio_file
                 for audio_file in audio_files
             }
             
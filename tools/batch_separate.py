@@ -15,28 +15,41 @@ import concurrent.futures
 from datetime import datetime
 
 # Add the python_backend directory to the path
-sys.path.append(str(Path(__file__).parent / "python_backend"))
+sys.path.append(str(Path(__file__).parent.parent / "python_backend"))
 
-from song_splitter import SongSplitter
+from song_splitter import SongSplitter, QUALITY_TIERS, DEFAULT_QUALITY, audio_duration, load_audio_window
+from cpu_backend import parse_backend_spec
+from work_queue import WorkQueue, DEFAULT_LEASE_TIMEOUT
+from cpu_affinity import available_cpus, core_slots, pin_from_slots, split_cores
+from memory_budget import GB, MemoryGate, default_budget, job_bytes, memory_profile, plan_workers
+from stem_pack import pack_path_for, pack_stems
+
+# Shared memory gate and model footprint of pool workers (--parallel auto)
+_memory_gate = None
+_memory_profile = None
+
+def _init_worker(slots, gate: MemoryGate = None, profile: Dict = None):
+    """Pool initializer: pin to a core set and keep the memory gate."""
+    global _memory_gate, _memory_profile
+    pin_from_slots(slots)
+    _memory_gate, _memory_profile = gate, profile
 
 def create_test_clip(input_file: str, output_file: str, start_time: int = 30, duration: int = 30):
-    """Create a test clip from the original audio."""
+    """Create a test clip from the original audio, decoding only the clip itself."""
     from pydub import AudioSegment
+    import numpy as np
     
     try:
-        audio = AudioSegment.from_file(input_file)
-        
-        # Extract clip (start_time to start_time + duration seconds)
-        start_ms = start_time * 1000
-        end_ms = (start_time + duration) * 1000
-        
         # Ensure we don't exceed audio length
-        if end_ms > len(audio):
-            end_ms = len(audio)
-            start_ms = max(0, end_ms - (duration * 1000))
+        total = audio_duration(input_file)
+        end_time = min(start_time + duration, total) if total else start_time + duration
+        start_time = max(0, end_time - duration)
         
-        clip = audio[start_ms:end_ms]
-        clip.export(output_file, format="mp3", bitrate="320k")
+        clip, sample_rate = load_audio_window(input_file, start_time, end_time)
+        samples = (np.clip(clip.numpy().T, -1.0, 1.0) * 32767).astype(np.int16)
+        audio = AudioSegment(samples.tobytes(), frame_rate=sample_rate,
+                             sample_width=2, channels=samples.shape[1])
+        audio.export(output_file, format="mp3", bitrate="320k")
         
         print(f"✅ Created test clip: {output_file}")
         return True
@@ -45,16 +58,27 @@ def create_test_clip(input_file: str, output_file: str, start_time: int = 30, du
         return False
 
 def process_single_file(input_file: str, output_dir: str, model_name: str = "htdemucs", 
-                       export_mp3: bool = True, create_clip: bool = True) -> Dict:
-    """Process a single audio file."""
+                       export_mp3: bool = True, create_clip: bool = True,
+                       quality: str = DEFAULT_QUALITY, backends: Dict = None,
+                       splitter: SongSplitter = None, max_chunk_seconds: float = None,
+                       pack: bool = False) -> Dict:
+    """
+    Process a single audio file (with an already loaded splitter, if given).
+    Inputs longer than max_chunk_seconds are separated in chunks; under a
+    memory gate, the file's working set is reserved while it is separated.
+    With pack, all stems and the results are also written to one stem pack.
+    """
     
     print(f"\n🎵 Processing: {Path(input_file).name}")
     print("=" * 50)
     
     start_time = time.time()
     
-    # Initialize splitter
-    splitter = SongSplitter(model_name=model_name)
+    # Initialize splitter (closed again below if it is our own)
+    own_splitter = splitter is None
+    if own_splitter:
+        splitter = SongSplitter(model_name=model_name, backends=backends,
+                                max_chunk_seconds=max_chunk_seconds)
     
     # Create output directory for this file
     file_output_dir = Path(output_dir) / Path(input_file).stem
@@ -62,7 +86,20 @@ def process_single_file(input_file: str, output_dir: str, model_name: str = "htd
     
     try:
         # Separate audio
-        stems = splitter.separate_audio(input_file, str(file_output_dir))
+        separation_stats = {}
+        reservation = 0
+        if _memory_gate is not None:
+            held_seconds = audio_duration(input_file)
+            if max_chunk_seconds:
+                held_seconds = min(held_seconds, max_chunk_seconds)
+            reservation = job_bytes(_memory_profile, held_seconds)
+            _memory_gate.reserve(reservation)
+        try:
+            stems = splitter.separate_audio(input_file, str(file_output_dir), quality=quality,
+                                            stats=separation_stats)
+        finally:
+            if reservation:
+                _memory_gate.release(reservation)
         
         # Analyze quality
         quality_metrics = splitter.analyze_quality(input_file, stems)
@@ -94,8 +131,11 @@ def process_single_file(input_file: str, output_dir: str, model_name: str = "htd
         results = {
             "input_file": input_file,
             "output_directory": str(file_output_dir),
-            "model_used": model_name,
+            "model_used": separation_stats["model"],
+            "quality": quality,
             "processing_time_seconds": round(processing_time, 2),
+            "separation_stats": separation_stats,
+            "cpu_backends": splitter.backend_reports,
             "timestamp": datetime.now().isoformat(),
             "stems": {
                 "wav": stems,
@@ -107,6 +147,12 @@ def process_single_file(input_file: str, output_dir: str, model_name: str = "htd
             "quality_report": quality_report
         }
         
+        # Single-file multitrack container with the results as its metadata
+        if pack:
+            results["pack"] = pack_stems(stems, pack_path_for(str(file_output_dir), Path(input_file).stem),
+                                         metadata=dict(results))
+            print(f"📦 Stem pack: {results['pack']}")
+        
         # Save metadata
         metadata_path = file_output_dir / "separation_results.json"
         with open(metadata_path, 'w') as f:
@@ -121,6 +167,9 @@ def process_single_file(input_file: str, output_dir: str, model_name: str = "htd
     except Exception as e:
         print(f"❌ Error processing {input_file}: {e}")
         return {"error": str(e), "input_file": input_file}
+    finally:
+        if own_splitter:
+            splitter.close()
 
 def generate_quality_report(bleed_analysis: Dict, quality_metrics: Dict) -> str:
     """Generate a concise quality report."""
@@ -140,14 +189,46 @@ def generate_quality_report(bleed_analysis: Dict, quality_metrics: Dict) -> str:
     
     return report
 
+def plan_memory(parallel, input_paths: List[str], model_name: str, backends: Dict,
+                quality: str, memory_budget: float = None):
+    """
+    Resolve parallel="auto" against the memory budget (GB).
+    
+    Returns:
+        (workers, max_chunk_seconds, gate, profile); the last three are None
+        when an explicit worker count was given.
+    """
+    if parallel != "auto":
+        return parallel, None, None, None
+    budget = int(memory_budget * GB) if memory_budget else default_budget()
+    profile = memory_profile(model_name, backends, quality)
+    workers, max_chunk_seconds = plan_workers(profile, budget, [audio_duration(f) for f in input_paths],
+                                              len(available_cpus()))
+    worker_bytes = profile["process_bytes"] + profile["model_bytes"]
+    gate = MemoryGate.for_processes(budget - workers * worker_bytes)
+    print(f"🧠 Memory budget {budget / GB:.1f} GB: {workers} workers, "
+          f"chunks of up to {max_chunk_seconds:.0f}s")
+    return workers, max_chunk_seconds, gate, profile
+
 def batch_process(input_paths: List[str], output_dir: str, model_name: str = "htdemucs",
-                 parallel: int = 1, export_mp3: bool = True, create_clips: bool = True) -> List[Dict]:
-    """Process multiple files in batch."""
+                 parallel: int = 1, export_mp3: bool = True, create_clips: bool = True,
+                 quality: str = DEFAULT_QUALITY, backends: Dict = None,
+                 memory_budget: float = None, pack: bool = False) -> List[Dict]:
+    """
+    Process multiple files in batch.
+    With parallel="auto", the worker count and chunk length are chosen to fit
+    memory_budget (GB; default: most of the available memory).
+    """
+    
+    parallel, max_chunk_seconds, gate, profile = plan_memory(parallel, input_paths, model_name,
+                                                             backends, quality, memory_budget)
     
     print(f"🚀 Starting batch processing of {len(input_paths)} files")
     print(f"📁 Output directory: {output_dir}")
     print(f"🤖 Model: {model_name}")
-    print(f"⚡ Parallel processes: {parallel}")
+    print(f"🎚️ Quality: {quality}")
+    print(f"⚡ Parallel processes: {parallel}" +
+          (f" ({len(split_cores(parallel)[0])} cores each)" if parallel > 1 else ""))
     print("=" * 60)
     
     # Create output directory
@@ -156,12 +237,14 @@ def batch_process(input_paths: List[str], output_dir: str, model_name: str = "ht
     results = []
     
     if parallel > 1:
-        # Parallel processing
-        with concurrent.futures.ProcessPoolExecutor(max_workers=parallel) as executor:
+        # Parallel processing, each worker pinned to its own cores
+        with concurrent.futures.ProcessPoolExecutor(max_workers=parallel, initializer=_init_worker,
+                                                    initargs=(core_slots(parallel), gate, profile)) as executor:
             futures = []
             for input_file in input_paths:
                 future = executor.submit(process_single_file, input_file, output_dir, 
-                                       model_name, export_mp3, create_clips)
+                                       model_name, export_mp3, create_clips, quality, backends,
+                                       None, max_chunk_seconds, pack)
                 futures.append(future)
             
             for future in concurrent.futures.as_completed(futures):
@@ -169,7 +252,9 @@ def batch_process(input_paths: List[str], output_dir: str, model_name: str = "ht
     else:
         # Sequential processing
         for input_file in input_paths:
-            result = process_single_file(input_file, output_dir, model_name, export_mp3, create_clips)
+            result = process_single_file(input_file, output_dir, model_name, export_mp3, create_clips,
+                                         quality, backends, max_chunk_seconds=max_chunk_seconds,
+                                         pack=pack)
             results.append(result)
     
     # Generate batch summary
@@ -177,6 +262,85 @@ def batch_process(input_paths: List[str], output_dir: str, model_name: str = "ht
     
     return results
 
+def queue_worker(queue_dir: str, output_dir: str, model_name: str = "htdemucs",
+                 export_mp3: bool = True, create_clips: bool = True,
+                 quality: str = DEFAULT_QUALITY, backends: Dict = None,
+                 lease_timeout: float = DEFAULT_LEASE_TIMEOUT, poll_interval: float = 5.0,
+                 max_chunk_seconds: float = None, pack: bool = False) -> int:
+    """
+    Pull files from a shared work queue until every task is done.
+    
+    Keeps polling while other nodes still hold leases, so it can take over
+    their files if they crash. Returns the number of files this worker processed.
+    """
+    queue = WorkQueue(queue_dir, lease_timeout=lease_timeout)
+    processed = 0
+    
+    while True:
+        claimed = queue.claim()
+        if claimed is None:
+            status = queue.status()
+            if status["done"] >= status["total"]:
+                return processed
+            time.sleep(poll_interval)
+            continue
+        
+        task_id, task = claimed
+        print(f"📥 {queue.node_id} claimed {Path(task['input_file']).name}")
+        stop_renewing = queue.keep_alive(task_id)
+        try:
+            result = process_single_file(task["input_file"], output_dir, model_name,
+                                         export_mp3, create_clips, quality, backends,
+                                         max_chunk_seconds=max_chunk_seconds, pack=pack)
+        except Exception as e:
+            result = {"error": str(e), "input_file": task["input_file"]}
+        finally:
+            stop_renewing.set()
+        
+        if queue.complete(task_id, result):
+            processed += 1
+
+def distributed_batch_process(input_paths: List[str], queue_dir: str, output_dir: str,
+                              model_name: str = "htdemucs", parallel: int = 1,
+                              export_mp3: bool = True, create_clips: bool = True,
+                              quality: str = DEFAULT_QUALITY, backends: Dict = None,
+                              lease_timeout: float = DEFAULT_LEASE_TIMEOUT,
+                              memory_budget: float = None, pack: bool = False) -> List[Dict]:
+    """Enqueue files on a shared queue and work on it with this node's processes."""
+    
+    # Planned from this node's inputs (a typical song length when joining)
+    parallel, max_chunk_seconds, gate, profile = plan_memory(parallel, input_paths, model_name,
+                                                             backends, quality, memory_budget)
+    
+    queue = WorkQueue(queue_dir, lease_timeout=lease_timeout)
+    added = queue.enqueue([{"input_file": str(Path(f).resolve())} for f in input_paths])
+    status = queue.status()
+    
+    print(f"🌐 Shared queue: {queue_dir}")
+    print(f"📥 Enqueued {added} new files ({status['total']} total, {status['done']} done)")
+    print(f"⚡ Local workers: {parallel}")
+    print("=" * 60)
+    
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    
+    worker_args = (queue_dir, output_dir, model_name, export_mp3, create_clips, quality,
+                   backends, lease_timeout, 5.0, max_chunk_seconds, pack)
+    if parallel > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=parallel, initializer=_init_worker,
+                                                    initargs=(core_slots(parallel), gate, profile)) as executor:
+            futures = [executor.submit(queue_worker, *worker_args) for _ in range(parallel)]
+            processed = sum(future.result() for future in futures)
+    else:
+        processed = queue_worker(*worker_args)
+    
+    print(f"\n🖥️ This node processed {processed} files")
+    
+    # Every node sees all results once the queue is drained
+    results = queue.results()
+    generate_batch_summary(results, output_dir)
+    
+    return results
+
 def generate_batch_summary(results: List[Dict], output_dir: str):
     """Generate a summary report for the batch processing."""
     
@@ -274,21 +438,44 @@ Each result includes:
     
     print(f"📖 README generated: {readme_path}")
 
+def parse_parallel(value: str):
+    """--parallel: a process count or "auto"."""
+    if value == "auto":
+        return value
+    try:
+        return max(1, int(value))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a number or 'auto', got {value!r}")
+
 def main():
     parser = argparse.ArgumentParser(description="Batch Audio Separation Tool")
-    parser.add_argument("input", nargs="+", help="Input audio files or directories")
+    parser.add_argument("input", nargs="*", help="Input audio files or directories")
     parser.add_argument("--output-dir", "-o", default="./separated_audio", 
                        help="Output directory (default: ./separated_audio)")
     parser.add_argument("--model", "-m", default="htdemucs", 
                        choices=["htdemucs", "htdemucs_ft", "htdemucs_6s", "mdx_extra"],
                        help="Demucs model to use (default: htdemucs)")
-    parser.add_argument("--parallel", "-p", type=int, default=1,
-                       help="Number of parallel processes (default: 1)")
+    parser.add_argument("--quality", "-q", default=DEFAULT_QUALITY, choices=list(QUALITY_TIERS),
+                       help=f"Quality tier (default: {DEFAULT_QUALITY})")
+    parser.add_argument("--backend", "-b", type=parse_backend_spec, default={},
+                       help="CPU backend, optionally per model (e.g. quantized or htdemucs=quantized)")
+    parser.add_argument("--parallel", "-p", type=parse_parallel, default=1,
+                       help="Number of parallel processes, or 'auto' to fit the memory budget (default: 1)")
+    parser.add_argument("--memory-budget", type=float,
+                       help="RAM budget in GB for --parallel auto (default: 80%% of available memory)")
     parser.add_argument("--no-mp3", action="store_true", help="Skip MP3 export")
     parser.add_argument("--no-clips", action="store_true", help="Skip test clip creation")
+    parser.add_argument("--pack", action="store_true",
+                       help="Also write each file's stems and results to one seekable stem pack (.sspack)")
     parser.add_argument("--analyze", "-a", action="store_true", help="Perform detailed quality analysis")
+    parser.add_argument("--queue-dir", help="Shared queue directory for multi-node processing "
+                       "(nodes without inputs join an existing queue)")
+    parser.add_argument("--lease-timeout", type=float, default=DEFAULT_LEASE_TIMEOUT,
+                       help=f"Seconds before a silent node's files are taken over (default: {DEFAULT_LEASE_TIMEOUT:.0f})")
     
     args = parser.parse_args()
+    if not args.input and not args.queue_dir:
+        parser.error("input files are required unless joining a --queue-dir")
     
     # Collect input files
     input_files = []
@@ -303,6 +490,25 @@ def main():
         else:
             print(f"Warning: {input_path} not found")
     
+    if args.queue_dir:
+        distributed_batch_process(
+            input_files,
+            args.queue_dir,
+            args.output_dir,
+            args.model,
+            args.parallel,
+            not args.no_mp3,
+            not args.no_clips,
+            args.quality,
+            args.backend,
+            args.lease_timeout,
+            args.memory_budget,
+            args.pack
+        )
+        print(f"\n🎉 Distributed batch processing completed!")
+        print(f"📁 Results available in: {args.output_dir}")
+        return
+    
     if not input_files:
         print("No audio files found!")
         return
@@ -316,7 +522,11 @@ def main():
         args.model,
         args.parallel,
         not args.no_mp3,
-        not args.no_clips
+        not args.no_clips,
+        args.quality,
+        args.backend,
+        args.memory_budget,
+        args.pack
     )
     
     print(f"\n🎉 Batch processing completed!")
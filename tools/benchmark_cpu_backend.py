@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+CPU backend benchmark for Song Splitter
+Compares optimized CPU backends against the eager fp32 model: speed and accuracy drift.
+"""
+
+import sys
+import json
+import argparse
+from pathlib import Path
+
+# Add the python_backend directory to the path
+sys.path.append(str(Path(__file__).parent.parent / "python_backend"))
+
+from cpu_backend import CPU_BACKENDS, DEFAULT_MIN_SNR_DB, benchmark
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark optimized CPU inference backends")
+    parser.add_argument("input", nargs="?", help="Audio file to benchmark on (default: synthetic probe)")
+    parser.add_argument("--model", "-m", default="htdemucs", help="Demucs model to benchmark")
+    parser.add_argument("--backends", nargs="+", default=[b for b in CPU_BACKENDS if b != "eager"],
+                       choices=list(CPU_BACKENDS), help="Backends to compare against eager")
+    parser.add_argument("--seconds", "-s", type=float, default=10.0,
+                       help="Seconds of audio to separate per run (default: 10)")
+    parser.add_argument("--repeats", "-r", type=int, default=3, help="Timed runs per backend")
+    parser.add_argument("--json", help="Write results to this JSON file")
+
+    args = parser.parse_args()
+
+    import torch
+    import torchaudio
+    from demucs.pretrained import get_model
+    from cpu_backend import probe_mix
+
+    print(f"🤖 Loading {args.model}...")
+    model = get_model(args.model).cpu().eval()
+
+    if args.input:
+        mix, sample_rate = torchaudio.load(args.input)
+        if mix.shape[0] == 1:
+            mix = mix.repeat(2, 1)
+        mix = mix[:2]
+        if sample_rate != model.samplerate:
+            mix = torchaudio.transforms.Resample(sample_rate, model.samplerate)(mix)
+        mix = mix[:, :int(args.seconds * model.samplerate)]
+    else:
+        mix = probe_mix(model.samplerate, args.seconds)
+
+    print(f"⚡ Threads: {torch.get_num_threads()}, audio: {mix.shape[-1] / model.samplerate:.1f}s")
+    results = benchmark(model, args.backends, mix, args.repeats)
+
+    print(f"\n{'Backend':<15}{'Time (s)':>10}{'RTF':>8}{'Speedup':>10}{'SNR (dB)':>10}")
+    for backend, result in results.items():
+        drift = result["drift"]
+        snr = f"{drift['snr_db']:.1f}" if drift else "-"
+        flag = " ⚠️" if drift and drift["snr_db"] < DEFAULT_MIN_SNR_DB else ""
+        print(f"{backend:<15}{result['seconds']:>10.2f}{result['rtf']:>8.2f}"
+              f"{result['speedup']:>9.2f}x{snr:>10}{flag}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({"model": args.model, "results": results}, f, indent=2)
+        print(f"📝 Results saved to: {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Worker placement benchmark for Song Splitter
+Separates the same batch of clips with different worker/core splits and
+compares throughput, pinned (disjoint core sets) versus unpinned (every worker
+starts a full set of threads).
+"""
+
+import sys
+import time
+import json
+import argparse
+import multiprocessing
+import concurrent.futures
+from pathlib import Path
+
+# Add the python_backend directory to the path
+sys.path.append(str(Path(__file__).parent.parent / "python_backend"))
+
+from cpu_affinity import available_cpus, core_slots, pin_from_slots, split_cores
+
+# Per-process state of a pool worker
+_model = None
+
+def _init_worker(slots, model_name: str):
+    """Pin (if slots are given) and load the model once."""
+    global _model
+    if slots is not None:
+        pin_from_slots(slots)
+    from demucs.pretrained import get_model
+    _model = get_model(model_name).cpu().eval()
+
+def _separate(seconds: float) -> float:
+    """Separate a synthetic clip; returns the worker-side time."""
+    import torch
+    from demucs.apply import apply_model
+    from cpu_backend import probe_mix
+
+    mix = probe_mix(_model.samplerate, seconds)
+    start = time.time()
+    with torch.no_grad():
+        apply_model(_model, mix.unsqueeze(0), shifts=0, overlap=0.25)
+    return time.time() - start
+
+def run_split(model_name: str, workers: int, pinned: bool, jobs: int, seconds: float) -> dict:
+    """Throughput (audio seconds per wall second) of one placement."""
+    context = multiprocessing.get_context("spawn")
+    slots = core_slots(workers, context) if pinned else None
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                                initializer=_init_worker,
+                                                initargs=(slots, model_name)) as executor:
+        # Warm-up round, so model loading is not timed
+        list(executor.map(_separate, [1.0] * workers))
+        start = time.time()
+        list(executor.map(_separate, [seconds] * jobs))
+        wall = time.time() - start
+    return {
+        "workers": workers,
+        "threads_per_worker": len(split_cores(workers)[0]) if pinned else len(available_cpus()),
+        "pinned": pinned,
+        "wall_seconds": wall,
+        "throughput": jobs * seconds / wall
+    }
+
+def main():
+    cores = len(available_cpus())
+    default_splits = [n for n in (1, 2, 4, 8, 16, 32) if n <= cores] or [1]
+
+    parser = argparse.ArgumentParser(description="Benchmark worker/core splits for batch separation")
+    parser.add_argument("--model", "-m", default="htdemucs", help="Demucs model to benchmark")
+    parser.add_argument("--workers", nargs="+", type=int, default=default_splits,
+                       help=f"Worker counts to try (default: {' '.join(map(str, default_splits))})")
+    parser.add_argument("--jobs", "-j", type=int, default=8, help="Clips per run (default: 8)")
+    parser.add_argument("--seconds", "-s", type=float, default=10.0, help="Seconds per clip (default: 10)")
+    parser.add_argument("--no-unpinned", action="store_true", help="Skip the unpinned comparison runs")
+    parser.add_argument("--json", help="Write results to this JSON file")
+
+    args = parser.parse_args()
+
+    print(f"⚡ {cores} cores, {args.jobs} clips x {args.seconds:.0f}s, model {args.model}")
+    results = []
+    for workers in args.workers:
+        for pinned in ([True] if args.no_unpinned else [True, False]):
+            if workers == 1 and not pinned:
+                continue
+            result = run_split(args.model, workers, pinned, args.jobs, args.seconds)
+            results.append(result)
+            print(f"  {workers:>3} workers x {result['threads_per_worker']:>3} threads "
+                  f"{'pinned  ' if pinned else 'unpinned'}  {result['wall_seconds']:7.1f}s  "
+                  f"{result['throughput']:6.2f} audio s/s")
+
+    best = max(results, key=lambda result: result["throughput"])
+    print(f"\n🏆 Best: {best['workers']} workers x {best['threads_per_worker']} threads "
+          f"({'pinned' if best['pinned'] else 'unpinned'}), {best['throughput']:.2f} audio s/s")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({"model": args.model, "cores": cores, "results": results}, f, indent=2)
+        print(f"📝 Results saved to: {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for Song Splitter
+Times cold starts in fresh processes: importing song_splitter, the CLI's --help,
+and the API from import to first served request and to readiness (model warm).
+Results can be appended to a history file to track startup across changes.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent / "python_backend"
+
+# Runs inside a fresh interpreter (in a scratch directory, so the API's
+# upload/output folders do not touch the real ones)
+API_PROBE = """
+import sys, time, json
+started = time.time()
+sys.path.insert(0, {backend!r})
+import flask_api
+client = flask_api.app.test_client()
+client.get('/api/health/live')
+first_request = time.time() - started
+while client.get('/api/health/ready').status_code == 503 and flask_api.startup['state'] != 'failed':
+    time.sleep(0.05)
+print(json.dumps({{"first_request_seconds": first_request, **flask_api.readiness_info()}}))
+"""
+
+def time_command(cmd, cwd, env=None) -> float:
+    """Wall time of a command run to completion."""
+    start = time.time()
+    subprocess.run(cmd, cwd=cwd, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.time() - start
+
+def time_api(warmup_seconds: float) -> dict:
+    """Import, first-request and ready times of the API in local mode."""
+    env = dict(os.environ, SONG_SPLITTER_WARMUP_SECONDS=str(warmup_seconds))
+    env.pop("SONG_SPLITTER_INFERENCE_ADDRESS", None)
+    with tempfile.TemporaryDirectory() as scratch:
+        result = subprocess.run([sys.executable, "-c", API_PROBE.format(backend=str(BACKEND_DIR.resolve()))],
+                                cwd=scratch, env=env, check=True, capture_output=True, text=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold-start times of the CLI and API")
+    parser.add_argument("--repeats", "-r", type=int, default=3, help="Cold starts per measurement (default: 3)")
+    parser.add_argument("--warmup-seconds", type=float, default=2.0,
+                       help="Probe audio the API warms the model on (default: 2)")
+    parser.add_argument("--no-api", action="store_true", help="Only time the module import and CLI")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    parser.add_argument("--history", help="Append results as one JSON line to this file")
+
+    args = parser.parse_args()
+
+    runs = {"import_song_splitter": [], "cli_help": []}
+    for _ in range(args.repeats):
+        runs["import_song_splitter"].append(
+            time_command([sys.executable, "-c", "import song_splitter"], BACKEND_DIR))
+        runs["cli_help"].append(
+            time_command([sys.executable, "song_splitter.py", "--help"], BACKEND_DIR))
+        if not args.no_api:
+            api = time_api(args.warmup_seconds)
+            if api["state"] == "failed":
+                print(f"❌ API warm-up failed: {api['error']}")
+                sys.exit(1)
+            for key in ("import_seconds", "first_request_seconds", "ready_seconds"):
+                runs.setdefault(f"api_{key}", []).append(api[key])
+
+    results = {name: statistics.median(values) for name, values in runs.items()}
+    print(f"⏱️ Median of {args.repeats} cold starts:")
+    for name, seconds in results.items():
+        print(f"  {name:<28}{seconds:8.2f}s")
+
+    record = {"timestamp": time.time(), "python": sys.version.split()[0], "results": results, "runs": runs}
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(record, f, indent=2)
+        print(f"📝 Results saved to: {args.json}")
+    if args.history:
+        with open(args.history, 'a') as f:
+            f.write(json.dumps(record) + "\n")
+        print(f"📈 Appended to: {args.history}")
+
+if __name__ == "__main__":
+    main()
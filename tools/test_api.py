@@ -3,25 +3,31 @@
 Test script to verify the Flask API is working correctly
 """
 
-import requests
-import json
+import sys
+from pathlib import Path
 
-API_BASE = 'http://localhost:5000/api'
+# Add the python_backend directory to the path
+sys.path.append(str(Path(__file__).parent.parent / "python_backend"))
+
+from api_client import ApiError, SongSplitterClient
+
+client = SongSplitterClient('http://localhost:5000')
 
 def test_health():
     """Test the health endpoint"""
     try:
-        response = requests.get(f'{API_BASE}/health')
-        if response.status_code == 200:
-            data = response.json()
-            print("✅ Health check passed")
-            print(f"   Status: {data['status']}")
-            print(f"   Device: {data['device']}")
-            print(f"   Model loaded: {data['model_loaded']}")
-            return True
-        else:
-            print(f"❌ Health check failed: {response.status_code}")
-            return False
+        data = client.health()
+        print("✅ Health check passed")
+        print(f"   Status: {data['status']}")
+        print(f"   Device: {data['device']}")
+        print(f"   Model loaded: {data['model_loaded']}")
+        for tier, info in data.get('quality_tiers', {}).items():
+            rtf = f"{info['rtf']:.2f}x" if info.get('rtf') is not None else "not measured"
+            print(f"   Tier {tier}: {info['model']}, RTF {rtf}")
+        return True
+    except ApiError as e:
+        print(f"❌ Health check failed: {e.status_code}")
+        return False
     except Exception as e:
         print(f"❌ Health check error: {e}")
         return False
@@ -29,15 +35,13 @@ def test_health():
 def test_jobs():
     """Test the jobs endpoint"""
     try:
-        response = requests.get(f'{API_BASE}/jobs')
-        if response.status_code == 200:
-            data = response.json()
-            print("✅ Jobs endpoint working")
-            print(f"   Current jobs: {len(data['jobs'])}")
-            return True
-        else:
-            print(f"❌ Jobs endpoint failed: {response.status_code}")
-            return False
+        jobs = client.jobs()
+        print("✅ Jobs endpoint working")
+        print(f"   Current jobs: {len(jobs)}")
+        return True
+    except ApiError as e:
+        print(f"❌ Jobs endpoint failed: {e.status_code}")
+        return False
     except Exception as e:
         print(f"❌ Jobs endpoint error: {e}")
         return False
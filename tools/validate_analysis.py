@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Spectral analysis validation for Song Splitter
+Compares the batched torch analysis (python_backend/spectral_analysis.py) with
+the per-stem librosa computation it replaced, on separated jobs: the
+separation_results.json files batch_separate.py writes under the given
+directories. Reports the largest relative difference of every metric and the
+time each takes, for full analysis and (with --frames) for frame sampling.
+"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent / "python_backend"))
+
+from spectral_analysis import SpectralAnalyzer
+
+METRICS = ["energy_ratio", "spectral_centroid", "zero_crossing_rate", "rms_energy"]
+
+def librosa_metrics(original_path: str, stems: Dict[str, str]) -> Dict[str, Dict[str, float]]:
+    """The reference: librosa on NumPy, one stem at a time."""
+    import librosa
+    original, sr = librosa.load(original_path, sr=22050)
+    original_energy = np.sum(np.abs(librosa.stft(original)) ** 2)
+    metrics = {}
+    for stem_name, stem_path in stems.items():
+        stem_audio, _ = librosa.load(stem_path, sr=22050)
+        stem_energy = np.sum(np.abs(librosa.stft(stem_audio)) ** 2)
+        metrics[stem_name] = {
+            "energy_ratio": float(stem_energy / original_energy if original_energy > 0 else 0),
+            "spectral_centroid": float(np.mean(librosa.feature.spectral_centroid(y=stem_audio, sr=sr))),
+            "zero_crossing_rate": float(np.mean(librosa.feature.zero_crossing_rate(stem_audio))),
+            "rms_energy": float(np.sqrt(np.mean(stem_audio ** 2)))
+        }
+    return metrics
+
+def find_jobs(directories: List[str]) -> List[Dict]:
+    """Original and WAV stems of every separation_results.json under the directories."""
+    jobs = []
+    for directory in directories:
+        for results_path in sorted(Path(directory).rglob("separation_results.json")):
+            with open(results_path) as f:
+                results = json.load(f)
+            if "error" not in results:
+                jobs.append({"original": results["input_file"], "stems": results["stems"]["wav"]})
+    return jobs
+
+def compare(reference: List[Dict], candidate: List[Dict]) -> Dict[str, float]:
+    """Largest relative difference per metric over all stems of all jobs."""
+    errors = {metric: 0.0 for metric in METRICS}
+    for expected_job, actual_job in zip(reference, candidate):
+        for stem_name, expected in expected_job.items():
+            for metric in METRICS:
+                scale = max(abs(expected[metric]), 1e-9)
+                errors[metric] = max(errors[metric], abs(actual_job[stem_name][metric] - expected[metric]) / scale)
+    return errors
+
+def timed(function, *args):
+    start = time.time()
+    result = function(*args)
+    return result, time.time() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate the batched spectral analysis against librosa")
+    parser.add_argument("directories", nargs="+", help="Output directories of batch_separate.py")
+    parser.add_argument("--device", default="cpu", help="Device of the torch analysis (default: cpu)")
+    parser.add_argument("--frames", type=int, action="append", default=[],
+                       help="Also validate sampling this many frames per signal (repeatable)")
+    parser.add_argument("--tolerance", type=float, default=0.01,
+                       help="Largest relative difference accepted for full analysis (default: 0.01)")
+    parser.add_argument("--json", help="Write results to this JSON file")
+
+    args = parser.parse_args()
+
+    jobs = find_jobs(args.directories)
+    if not jobs:
+        print("❌ No separation_results.json found")
+        sys.exit(1)
+    print(f"🔍 Validating on {len(jobs)} jobs, {sum(len(job['stems']) for job in jobs)} stems")
+
+    reference, reference_time = timed(lambda: [librosa_metrics(job["original"], job["stems"]) for job in jobs])
+    analyzer = SpectralAnalyzer(args.device)
+    # Warm up the device before timing
+    analyzer.analyze(jobs[:1])
+    per_job, per_job_time = timed(lambda: [analyzer.analyze_job(job["stems"], job["original"]) for job in jobs])
+    batched, batched_time = timed(analyzer.analyze, jobs)
+
+    runs = {
+        "librosa": {"seconds": reference_time},
+        "torch_per_job": {"seconds": per_job_time, "max_relative_error": compare(reference, per_job)},
+        "torch_batched": {"seconds": batched_time, "max_relative_error": compare(reference, batched)}
+    }
+    for frames in args.frames:
+        sampled, sampled_time = timed(SpectralAnalyzer(args.device, max_frames=frames).analyze, jobs)
+        runs[f"torch_{frames}_frames"] = {"seconds": sampled_time,
+                                          "max_relative_error": compare(reference, sampled)}
+
+    print(f"\n{'run':<22}{'seconds':>9}  " + "  ".join(f"{metric:>18}" for metric in METRICS))
+    for name, run in runs.items():
+        errors = run.get("max_relative_error", {})
+        print(f"{name:<22}{run['seconds']:9.2f}  " +
+              "  ".join(f"{errors[metric]:18.2e}" if errors else f"{'-':>18}" for metric in METRICS))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({"jobs": jobs, "reference": reference, "runs": runs}, f, indent=2)
+        print(f"📝 Results saved to: {args.json}")
+
+    worst = max(max(runs[name]["max_relative_error"].values()) for name in ("torch_per_job", "torch_batched"))
+    if worst > args.tolerance:
+        print(f"❌ Largest relative difference {worst:.2e} exceeds {args.tolerance:.2e}")
+        sys.exit(1)
+    print(f"✅ Full analysis within {args.tolerance:.2e} of librosa")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Hot-folder watcher for Song Splitter
+Watches an ingest directory and separates every audio file dropped into it,
+exactly once, on a pool of workers that keep their model loaded.
+
+- Only directories whose modification time changed are listed again, so an
+  idle folder with thousands of finished files costs one stat per directory.
+- A new file is queued once its size and modification time have stayed the
+  same for --settle seconds (i.e. the copy into the folder has finished).
+- Progress lives in a small JSON state file that is replaced atomically after
+  every change. A file counts as done only after its results are written; on
+  restart, finished files are skipped and interrupted ones are queued again.
+  Files are identified by path, size and modification time, so replacing a
+  file with a new version processes it again.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import multiprocessing
+import concurrent.futures
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Add the python_backend directory to the path
+sys.path.append(str(Path(__file__).parent.parent / "python_backend"))
+
+from song_splitter import QUALITY_TIERS, DEFAULT_QUALITY
+from cpu_backend import parse_backend_spec
+from cpu_affinity import core_slots, pin_from_slots
+
+DEFAULT_EXTENSIONS = ['.mp3', '.wav', '.flac', '.m4a', '.aac']
+STATE_VERSION = 1
+# Worker crashes a file may be caught in before it is recorded as failed
+MAX_WORKER_CRASHES = 3
+
+# Per-process state of a pool worker
+_worker_splitter = None
+_worker_options = None
+
+def _init_worker(slots, model_name: str, backends: Optional[Dict], options: Dict):
+    """Pool initializer: pin to a core set and load the model once per worker."""
+    global _worker_splitter, _worker_options
+    pin_from_slots(slots)
+    from song_splitter import SongSplitter
+    _worker_splitter = SongSplitter(model_name=model_name, backends=backends)
+    _worker_splitter.load_model()
+    _worker_options = options
+
+def _process_file(input_file: str) -> Dict:
+    """Separate one file in a pool worker."""
+    from batch_separate import process_single_file
+    options = _worker_options
+    return process_single_file(input_file, options["output_dir"], _worker_splitter.model_name,
+                               options["export_mp3"], options["create_clips"], options["quality"],
+                               splitter=_worker_splitter)
+
+class FolderState:
+    """The watcher's on-disk memory: scanned directories and per-file status."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.dirs: Dict[str, int] = {}
+        self.files: Dict[str, Dict] = {}
+        if path.exists():
+            with open(path) as f:
+                data = json.load(f)
+            if data.get("version") == STATE_VERSION:
+                self.dirs = data["dirs"]
+                self.files = data["files"]
+
+    def save(self):
+        tmp_path = self.path.with_name(f".{self.path.name}.{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump({"version": STATE_VERSION, "dirs": self.dirs, "files": self.files}, f)
+        os.replace(tmp_path, self.path)
+
+class FolderWatcher:
+    """Finds new, fully written audio files under a directory."""
+
+    def __init__(self, watch_dir: str, state: FolderState, extensions, settle: float):
+        self.watch_dir = Path(watch_dir).resolve()
+        self.state = state
+        self.extensions = {ext.lower() for ext in extensions}
+        self.settle = settle
+        # Candidates waiting to settle: path -> (size, mtime_ns, unchanged since)
+        self._settling: Dict[str, tuple] = {}
+        for path, entry in state.files.items():
+            if entry["status"] in ("seen", "queued"):
+                self._settling[path] = (entry["size"], entry["mtime_ns"], time.time())
+        state.dirs.setdefault(str(self.watch_dir), -1)
+
+    def _scan_changed_dirs(self) -> bool:
+        """List directories whose mtime moved; returns whether state changed."""
+        changed = False
+        now_ns = time.time_ns()
+        pending = list(self.state.dirs)
+        while pending:
+            directory = pending.pop()
+            try:
+                mtime_ns = os.stat(directory).st_mtime_ns
+            except FileNotFoundError:
+                del self.state.dirs[directory]
+                changed = True
+                continue
+            if mtime_ns == self.state.dirs[directory]:
+                continue
+            try:
+                entries = list(os.scandir(directory))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.path not in self.state.dirs:
+                        self.state.dirs[entry.path] = -1
+                        pending.append(entry.path)
+                elif entry.is_file() and Path(entry.name).suffix.lower() in self.extensions:
+                    self._observe(entry.path)
+            # A change within the same timestamp tick could still be missed,
+            # so only remember mtimes that are safely in the past
+            if now_ns - mtime_ns > self.settle * 1e9:
+                self.state.dirs[directory] = mtime_ns
+            changed = True
+        return changed
+
+    def _observe(self, path: str):
+        """Start settling a file unless this version of it is already known."""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return
+        known = self.state.files.get(path)
+        if known and (known["size"], known["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+            return
+        if path not in self._settling:
+            self._settling[path] = (stat.st_size, stat.st_mtime_ns, time.time())
+            self.state.files[path] = {"status": "seen", "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def settling(self) -> int:
+        """Number of files still waiting to settle."""
+        return len(self._settling)
+
+    def poll(self):
+        """Scan for changes; returns (stable files ready to queue, whether state changed)."""
+        changed = self._scan_changed_dirs()
+        ready = []
+        now = time.time()
+        for path, (size, mtime_ns, since) in list(self._settling.items()):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                del self._settling[path]
+                self.state.files.pop(path, None)
+                changed = True
+                continue
+            if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns):
+                # Still being written
+                self._settling[path] = (stat.st_size, stat.st_mtime_ns, now)
+                self.state.files[path].update({"size": stat.st_size, "mtime_ns": stat.st_mtime_ns})
+                changed = True
+            elif now - since >= self.settle and stat.st_size > 0:
+                del self._settling[path]
+                ready.append(path)
+        return ready, changed
+
+def watch(watch_dir: str, output_dir: str, model_name: str = "htdemucs", workers: int = 1,
+          export_mp3: bool = True, create_clips: bool = True, quality: str = DEFAULT_QUALITY,
+          backends: Optional[Dict] = None, extensions=None, settle: float = 5.0,
+          poll_interval: float = 2.0, state_file: Optional[str] = None, once: bool = False):
+    """Watch a folder and separate new files until interrupted (or, with once, until idle)."""
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    state = FolderState(Path(state_file) if state_file else Path(output_dir) / ".watch_state.json")
+    watcher = FolderWatcher(watch_dir, state, extensions or DEFAULT_EXTENSIONS, settle)
+    done = sum(1 for entry in state.files.values() if entry["status"] == "done")
+
+    print(f"👀 Watching: {watcher.watch_dir}")
+    print(f"📁 Output directory: {output_dir}")
+    print(f"🤖 Model: {model_name} ({quality}), {workers} warm worker(s)")
+    print(f"📝 State: {state.path} ({done} files already done)")
+    print("=" * 60)
+
+    options = {"output_dir": output_dir, "export_mp3": export_mp3,
+               "create_clips": create_clips, "quality": quality}
+
+    def start_pool():
+        # spawn, not fork: forking after torch has started its thread pools can deadlock
+        context = multiprocessing.get_context("spawn")
+        return concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, mp_context=context, initializer=_init_worker,
+            initargs=(core_slots(workers, context), model_name, backends, options))
+
+    executor = start_pool()
+    in_flight: Dict[concurrent.futures.Future, str] = {}
+    backlog: List[str] = []
+    # Files that were in flight when a worker died; each is retried alone, so
+    # a crash is only counted against the file that caused it
+    suspects: List[str] = []
+
+    try:
+        while True:
+            ready, changed = watcher.poll()
+            for path in ready:
+                state.files[path]["status"] = "queued"
+                backlog.append(path)
+                print(f"📥 Queued: {path}")
+                changed = True
+            if suspects:
+                if not in_flight:
+                    path = suspects.pop(0)
+                    in_flight[executor.submit(_process_file, path)] = path
+            else:
+                for path in backlog:
+                    in_flight[executor.submit(_process_file, path)] = path
+                backlog = []
+
+            for future in [future for future in in_flight if future.done()]:
+                path = in_flight.pop(future)
+                try:
+                    result = future.result()
+                except concurrent.futures.process.BrokenProcessPool:
+                    # A worker died (e.g. out of memory or a decoder crash); retry the
+                    # files it may have taken down on a fresh pool, up to MAX_WORKER_CRASHES
+                    print(f"⚠️ Worker pool broke while processing {path}; restarting it")
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    executor = start_pool()
+                    for other in [path] + list(in_flight.values()):
+                        entry = state.files.get(other)
+                        if entry is None:
+                            continue
+                        entry["crashes"] = entry.get("crashes", 0) + 1
+                        if entry["crashes"] >= MAX_WORKER_CRASHES:
+                            entry.update({"status": "failed",
+                                          "error": f"Worker crashed {entry['crashes']} times"})
+                            print(f"❌ Failed: {other}: worker crashed {entry['crashes']} times")
+                        else:
+                            suspects.append(other)
+                    in_flight = {}
+                    changed = True
+                    break
+                except Exception as e:
+                    result = {"error": str(e), "input_file": path}
+                entry = state.files.get(path)
+                if entry is None:
+                    continue
+                if "error" in result:
+                    entry.update({"status": "failed", "error": result["error"]})
+                    print(f"❌ Failed: {path}: {result['error']}")
+                else:
+                    entry.update({"status": "done", "output_directory": result["output_directory"]})
+                    print(f"✅ Done: {path}")
+                changed = True
+
+            if changed:
+                state.save()
+            if once and not (in_flight or backlog or suspects or watcher.settling()):
+                return state
+            time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping; unfinished files will be picked up on the next start")
+        return state
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Separate audio files as they arrive in a folder")
+    parser.add_argument("watch_dir", help="Directory to watch (recursively)")
+    parser.add_argument("--output-dir", "-o", default="./separated_audio",
+                       help="Output directory (default: ./separated_audio)")
+    parser.add_argument("--model", "-m", default="htdemucs", help="Demucs model to use (default: htdemucs)")
+    parser.add_argument("--quality", "-q", default=DEFAULT_QUALITY, choices=list(QUALITY_TIERS),
+                       help=f"Quality tier (default: {DEFAULT_QUALITY})")
+    parser.add_argument("--backend", "-b", type=parse_backend_spec, default={},
+                       help="CPU backend, e.g. 'quantized' or 'htdemucs=quantized'")
+    parser.add_argument("--workers", "-w", type=int, default=1,
+                       help="Warm worker processes, each with its own model (default: 1)")
+    parser.add_argument("--settle", type=float, default=5.0,
+                       help="Seconds a file must stay unchanged before it is processed (default: 5)")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="Seconds between scans (default: 2)")
+    parser.add_argument("--state-file", help="State file (default: <output-dir>/.watch_state.json)")
+    parser.add_argument("--extensions", nargs="+", default=DEFAULT_EXTENSIONS,
+                       help="Audio file extensions to pick up")
+    parser.add_argument("--no-mp3", action="store_true", help="Skip MP3 export")
+    parser.add_argument("--no-clips", action="store_true", help="Skip test clip creation")
+    parser.add_argument("--once", action="store_true",
+                       help="Exit once everything currently in the folder is processed")
+
+    args = parser.parse_args()
+
+    if not Path(args.watch_dir).is_dir():
+        print(f"❌ Not a directory: {args.watch_dir}")
+        sys.exit(1)
+
+    watch(args.watch_dir, args.output_dir, args.model, args.workers,
+          not args.no_mp3, not args.no_clips, args.quality, args.backend,
+          args.extensions, args.settle, args.poll_interval, args.state_file, args.once)
+
+if __name__ == "__main__":
+    main()